@@ -0,0 +1,72 @@
+"""organization_facets
+
+Revision ID: b2d6f9a3c8e1
+Revises: a1c5e8f2b7d9
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b2d6f9a3c8e1"
+down_revision: Union[str, None] = "a1c5e8f2b7d9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Организации вида деятельности с учётом всех потомков. Материализованный
+    # путь вида ("1.5.12.") перечисляет всех его предков, поэтому пары
+    # (предок, потомок) получаются разбором пути каждой записи, а не
+    # сравнением путей всех пар: объём работы растёт линейно с числом видов и
+    # связей. Организация, связанная с несколькими видами одного поддерева,
+    # считается один раз
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW activity_organization_counts AS
+        WITH closure AS (
+            SELECT ancestor::integer AS ancestor_id, d.id AS descendant_id
+            FROM activities d
+            CROSS JOIN unnest(string_to_array(rtrim(d.path, '.'), '.')) AS ancestor
+        )
+        SELECT a.id AS activity_id,
+            count(DISTINCT oa.organization_id) AS organizations
+        FROM activities a
+        LEFT JOIN closure c ON c.ancestor_id = a.id
+        LEFT JOIN organization_activity oa ON oa.activity_id = c.descendant_id
+        GROUP BY a.id
+        """
+    )
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW building_organization_counts AS
+        SELECT b.id AS building_id, count(o.id) AS organizations
+        FROM buildings b
+        LEFT JOIN organizations o ON o.building_id = b.id
+        GROUP BY b.id
+        """
+    )
+    # Уникальные индексы нужны для REFRESH MATERIALIZED VIEW CONCURRENTLY
+    op.create_index(
+        "ix_activity_organization_counts_activity_id",
+        "activity_organization_counts",
+        ["activity_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_building_organization_counts_building_id",
+        "building_organization_counts",
+        ["building_id"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW building_organization_counts")
+    op.execute("DROP MATERIALIZED VIEW activity_organization_counts")
+    op.execute("DELETE FROM data_versions WHERE name = 'facets'")
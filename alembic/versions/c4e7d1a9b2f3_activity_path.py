@@ -0,0 +1,79 @@
+"""activity_path
+
+Revision ID: c4e7d1a9b2f3
+Revises: a9df412723d8
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e7d1a9b2f3"
+down_revision: Union[str, None] = "a9df412723d8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("activities", sa.Column("path", sa.String(), nullable=True))
+
+    # Заполняем материализованные пути для существующего дерева
+    op.execute(
+        """
+        WITH RECURSIVE tree AS (
+            SELECT id, id::text || '.' AS path
+            FROM activities
+            WHERE parent_id IS NULL
+            UNION ALL
+            SELECT a.id, tree.path || a.id::text || '.'
+            FROM activities a
+            JOIN tree ON a.parent_id = tree.id
+        )
+        UPDATE activities SET path = tree.path
+        FROM tree
+        WHERE activities.id = tree.id
+        """
+    )
+
+    # varchar_pattern_ops позволяет использовать индекс для LIKE 'префикс%'
+    op.create_index(
+        "ix_activities_path",
+        "activities",
+        ["path"],
+        unique=False,
+        postgresql_ops={"path": "varchar_pattern_ops"},
+    )
+
+    # Индексы для выборки организаций по видам деятельности и обратно
+    op.create_index(
+        op.f("ix_organization_activity_activity_id"),
+        "organization_activity",
+        ["activity_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_organization_activity_organization_id"),
+        "organization_activity",
+        ["organization_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f("ix_organization_activity_organization_id"),
+        table_name="organization_activity",
+    )
+    op.drop_index(
+        op.f("ix_organization_activity_activity_id"),
+        table_name="organization_activity",
+    )
+    op.drop_index("ix_activities_path", table_name="activities")
+    op.drop_column("activities", "path")
@@ -0,0 +1,35 @@
+"""data_versions
+
+Revision ID: d5f8e2b0c3a4
+Revises: c4e7d1a9b2f3
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d5f8e2b0c3a4"
+down_revision: Union[str, None] = "c4e7d1a9b2f3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "data_versions",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("name"),
+    )
+    op.execute("INSERT INTO data_versions (name, version) VALUES ('activities', 1)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("data_versions")
@@ -0,0 +1,46 @@
+"""trigram_indexes
+
+Revision ID: e6a9f3c1d4b5
+Revises: d5f8e2b0c3a4
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e6a9f3c1d4b5"
+down_revision: Union[str, None] = "d5f8e2b0c3a4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # GIN-индексы по триграммам обслуживают ILIKE '%...%' и оператор схожести %
+    op.create_index(
+        "ix_organizations_name_trgm",
+        "organizations",
+        ["name"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"name": "gin_trgm_ops"},
+    )
+    op.create_index(
+        "ix_buildings_address_trgm",
+        "buildings",
+        ["address"],
+        unique=False,
+        postgresql_using="gin",
+        postgresql_ops={"address": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_buildings_address_trgm", table_name="buildings")
+    op.drop_index("ix_organizations_name_trgm", table_name="organizations")
@@ -0,0 +1,51 @@
+"""spatial_indexes
+
+Revision ID: f7b0a4d2e5c6
+Revises: e6a9f3c1d4b5
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f7b0a4d2e5c6"
+down_revision: Union[str, None] = "e6a9f3c1d4b5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # GiST по geography: ST_DWithin в радиусе и KNN-сортировка оператором <->.
+    # Имя совпадает с тем, что создаёт geoalchemy2, поэтому индекс не дублируется
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_buildings_location "
+        "ON buildings USING gist (location)"
+    )
+    # GiST по geometry: поиск в прямоугольной области (ST_Intersects с envelope)
+    op.execute(
+        "CREATE INDEX ix_buildings_location_geometry_gist "
+        "ON buildings USING gist ((location::geometry(POINT,4326)))"
+    )
+
+    # Внешние ключи, по которым соединяются здания, организации и телефоны
+    op.create_index(
+        op.f("ix_organizations_building_id"),
+        "organizations",
+        ["building_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_phones_organization_id"), "phones", ["organization_id"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_phones_organization_id"), table_name="phones")
+    op.drop_index(op.f("ix_organizations_building_id"), table_name="organizations")
+    op.drop_index("ix_buildings_location_geometry_gist", table_name="buildings")
+    # idx_buildings_location не удаляем: он мог существовать до этой миграции
@@ -0,0 +1,76 @@
+"""Условные GET-запросы (ETag / If-None-Match) по версиям данных.
+
+ETag ответа вычисляется из пути, строки запроса и версий таблиц, от которых
+зависит ответ (app.database.versions). Версии читаются одним запросом к
+data_versions, и при совпадении с If-None-Match ответ 304 отдаётся до
+выполнения основного запроса и сериализации.
+"""
+
+import hashlib
+from typing import Dict, Tuple
+
+from fastapi import Depends, HTTPException, Request, Response
+
+from app.database.executor import Executor
+from app.database.session import get_executor
+from app.database.versions import (
+    ACTIVITIES_VERSION,
+    BUILDINGS_VERSION,
+    ORGANIZATIONS_VERSION,
+    get_data_versions,
+)
+
+# Наборы версий, от которых зависят ответы эндпоинтов. Организации
+# отдаются вместе со зданием и видами деятельности
+BUILDINGS_SCOPE = (BUILDINGS_VERSION,)
+ACTIVITIES_SCOPE = (ACTIVITIES_VERSION,)
+ORGANIZATIONS_SCOPE = (ORGANIZATIONS_VERSION, BUILDINGS_VERSION, ACTIVITIES_VERSION)
+
+
+def compute_etag(request: Request, versions: Dict[str, int]) -> str:
+    parts = [request.url.path, request.url.query]
+    parts.extend(f"{name}={version}" for name, version in sorted(versions.items()))
+    digest = hashlib.blake2b(":".join(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    """Сравнение по правилам If-None-Match (слабое, поддерживает список и *)."""
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return any(
+        candidate == "*" or candidate.removeprefix("W/") == etag
+        for candidate in candidates
+    )
+
+
+def check_etag(request: Request, response: Response, versions: Dict[str, int]) -> str:
+    """Проставляет ETag ответу или прерывает запрос ответом 304.
+
+    Версии сохраняются в request.state.data_versions: по ним эндпоинт может
+    сверять свои кэши без повторного запроса.
+    """
+    request.state.data_versions = versions
+    etag = compute_etag(request, versions)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(etag, if_none_match):
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return etag
+
+
+def activities_version(request: Request) -> int:
+    """Версия видов деятельности, по которой построен ETag ответа: снимок
+    дерева должен быть не старше неё."""
+    return request.state.data_versions[ACTIVITIES_VERSION]
+
+
+def conditional_get(scope: Tuple[str, ...]):
+    """Зависимость эндпоинтов: ETag по версиям scope."""
+
+    async def dependency(
+        request: Request, response: Response, db: Executor = Depends(get_executor)
+    ) -> str:
+        versions = await db.run(get_data_versions, scope)
+        return check_etag(request, response, versions)
+
+    return dependency
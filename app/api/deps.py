@@ -1,14 +1,33 @@
+import math
+
 from fastapi import HTTPException, Security, status
 from fastapi.security.api_key import APIKeyHeader
+from starlette.concurrency import run_in_threadpool
 
+from app.auth.keys import api_key_store
+from app.auth.rate_limit import rate_limiter
 from app.core.config import settings
 
 api_key_header = APIKeyHeader(name=settings.API_KEY_NAME, auto_error=False)
 
 
-def verify_api_key(api_key_header: str = Security(api_key_header)) -> str:
-    if api_key_header == settings.API_KEY:
-        return api_key_header
-    raise HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API Key"
-    )
+async def verify_api_key(api_key_header: str = Security(api_key_header)) -> str:
+    # Асинхронная зависимость: проверка по снимку ключей в памяти не требует
+    # потока из пула. В пул уходит только периодическое обновление снимка
+    if api_key_store.needs_refresh():
+        await run_in_threadpool(api_key_store.refresh)
+
+    record = api_key_store.lookup(api_key_header) if api_key_header else None
+    if record is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid API Key"
+        )
+
+    retry_after = rate_limiter.acquire(record.name, record.rate_limit, record.burst)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    return api_key_header
@@ -1,13 +1,102 @@
-from typing import List, Optional
-
-from fastapi import APIRouter, Depends, HTTPException, Query, Security
+import io
+from operator import itemgetter
+from typing import Dict, Hashable, List, Literal, Optional, Union
+
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    File,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+    Security,
+    UploadFile,
+)
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from geoalchemy2 import WKTElement
-from geoalchemy2.functions import ST_DWithin, ST_MakeEnvelope, ST_MakePoint
-from sqlalchemy import func
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from app.api.conditional import (
+    ACTIVITIES_SCOPE,
+    BUILDINGS_SCOPE,
+    ORGANIZATIONS_SCOPE,
+    activities_version,
+    check_etag,
+    conditional_get,
+)
 from app.api.deps import verify_api_key
-from app.database.session import get_db
+from app.api.pagination import Page, get_page
+from app.api.queries import (
+    OrganizationFilters,
+    Projection,
+    Viewport,
+    activities_page,
+    buildings_statement,
+    cached_organizations,
+    child_activity_level,
+    cluster_cell_size,
+    cluster_statements,
+    fuzzy_threshold_statement,
+    geo_cache_lookup,
+    geo_filters_region,
+    geo_result_response,
+    geo_result_statement,
+    get_organization_filters,
+    get_projection,
+    get_viewport,
+    nearest_organizations_statement,
+    new_organization,
+    organization_clusters,
+    organization_columns_statement,
+    organization_details_statements,
+    organization_payloads,
+    organization_rows_statement,
+    organization_statement,
+    organizations_batch,
+    organizations_batch_response,
+    organizations_page_statement,
+    organizations_response,
+    organizations_statement,
+    projected_payloads,
+    projection_details_statements,
+    projection_response,
+    quantize_geo_filters,
+    unique_ids,
+    with_distances,
+)
+from app.bulk.batch import (
+    batch_errors,
+    create_activities,
+    create_buildings,
+    create_organizations,
+)
+from app.bulk.exporter import NDJSON_MEDIA_TYPE, export_organizations
+from app.bulk.importer import import_stream
+from app.cache.activity_tree import ActivityTree, activity_tree_cache
+from app.cache.geo import CachedResult, geo_result_cache
+from app.cache.tiles import tile_cache
+from app.core.config import settings
+from app.database.executor import Executor
+from app.database.facets import (
+    activity_facets_statement,
+    building_facets_statement,
+    facet_refresher,
+)
+from app.database.session import get_db, get_executor, get_pool_stats
+from app.database.tiles import MVT_MEDIA_TYPE, TILES_SCOPE, tile_statement
+from app.database.versions import (
+    ACTIVITIES_VERSION,
+    BUILDINGS_VERSION,
+    ORGANIZATIONS_VERSION,
+    bump_data_version,
+    get_data_versions,
+)
+from app.metrics.instrumentation import collect_runtime_metrics
+from app.metrics.instrumentation import registry as metrics_registry
 from app.models import models
 from app.schemas import schemas
 
@@ -17,41 +106,108 @@ router = APIRouter()
 
 
 @router.get("/buildings/", response_model=List[schemas.Building], tags=["buildings"])
-def get_buildings(
-    db: Session = Depends(get_db), api_key: str = Security(verify_api_key)
+async def get_buildings(
+    request: Request,
+    response: Response,
+    address: Optional[str] = Query(None, description="Поиск по адресу"),
+    page: Page = Depends(get_page),
+    executor: Executor = Depends(get_executor),
+    api_key: str = Security(verify_api_key),
+    etag: str = Depends(conditional_get(BUILDINGS_SCOPE)),
 ):
-    """Получить список всех зданий."""
-    return db.query(models.Building).all()
+    """Получить страницу списка зданий."""
+
+    def read(db: Session):
+        statement = page.apply(buildings_statement(address), models.Building.id)
+        return page.finalize(db.scalars(statement).all(), request, response)
+
+    return await executor.run(read)
 
 
 @router.post(
     "/buildings/", response_model=schemas.Building, status_code=201, tags=["buildings"]
 )
-def create_building(
+async def create_building(
     building: schemas.BuildingCreate,
-    db: Session = Depends(get_db),
+    executor: Executor = Depends(get_executor),
     api_key: str = Security(verify_api_key),
 ):
     """Создать новое здание."""
-    # Создаем WKT точку для координат
-    point = WKTElement(f"POINT({building.longitude} {building.latitude})", srid=4326)
 
-    db_building = models.Building(address=building.address, location=point)
-    db.add(db_building)
-    db.commit()
-    db.refresh(db_building)
-    return db_building
+    def write(db: Session):
+        # Создаем WKT точку для координат
+        point = WKTElement(
+            f"POINT({building.longitude} {building.latitude})", srid=4326
+        )
+
+        db_building = models.Building(address=building.address, location=point)
+        db.add(db_building)
+        versions = bump_data_version(db, BUILDINGS_VERSION)
+        db.commit()
+        location = (building.longitude, building.latitude)
+        geo_result_cache.invalidate_point(*location, versions)
+        tile_cache.invalidate_points([location], versions)
+        db.refresh(db_building)
+        return db_building
+
+    return await executor.run(write)
+
+
+@router.post(
+    "/buildings/batch",
+    response_model=schemas.BuildingBatchResult,
+    status_code=201,
+    tags=["buildings"],
+)
+async def create_buildings_batch(
+    items: List[schemas.BuildingCreate] = Body(
+        ..., min_length=1, max_length=settings.MAX_BATCH_SIZE
+    ),
+    executor: Executor = Depends(get_executor),
+    api_key: str = Security(verify_api_key),
+):
+    """Создать пачку зданий (не больше MAX_BATCH_SIZE) в одной транзакции."""
+
+    def write(db: Session):
+        result = create_buildings(db, items)
+        db.commit()
+        return result
+
+    result = await executor.run(write)
+    for item in items:
+        geo_result_cache.invalidate_point(
+            item.longitude, item.latitude, result.versions
+        )
+    tile_cache.invalidate_points(
+        [(item.longitude, item.latitude) for item in items], result.versions
+    )
+    return {"created": result.created, "errors": batch_errors(result.errors)}
 
 
 # === ACTIVITIES ENDPOINTS ===
 
 
-@router.get("/activities/", response_model=List[schemas.Activity], tags=["activities"])
-def get_activities(
-    db: Session = Depends(get_db), api_key: str = Security(verify_api_key)
+@router.get(
+    "/activities/",
+    response_model=Union[List[schemas.ActivityFlat], List[schemas.Activity]],
+    tags=["activities"],
+)
+async def get_activities(
+    request: Request,
+    response: Response,
+    tree: bool = Query(
+        False,
+        description="Вернуть дерево: только корневые категории с вложенными "
+        "дочерними. По умолчанию - плоский список без children",
+    ),
+    page: Page = Depends(get_page),
+    executor: Executor = Depends(get_executor),
+    api_key: str = Security(verify_api_key),
+    etag: str = Depends(conditional_get(ACTIVITIES_SCOPE)),
 ):
-    """Получить список всех видов деятельности."""
-    return db.query(models.Activity).all()
+    """Получить страницу списка видов деятельности (плоским списком или деревом)."""
+    snapshot = await executor.run(activity_tree_cache.get, activities_version(request))
+    return page.finalize(activities_page(snapshot, tree, page), request, response)
 
 
 @router.post(
@@ -60,150 +216,424 @@ def get_activities(
     status_code=201,
     tags=["activities"],
 )
-def create_activity(
+async def create_activity(
     activity: schemas.ActivityCreate,
-    db: Session = Depends(get_db),
+    executor: Executor = Depends(get_executor),
     api_key: str = Security(verify_api_key),
 ):
     """Создать новый вид деятельности."""
-    # Проверяем ограничение на уровень вложенности (максимум 3)
-    if activity.parent_id:
-        parent = (
-            db.query(models.Activity)
-            .filter(models.Activity.id == activity.parent_id)
-            .first()
+
+    def write(db: Session):
+        parent = None
+        if activity.parent_id:
+            parent = db.get(models.Activity, activity.parent_id)
+            if not parent:
+                raise HTTPException(
+                    status_code=404, detail="Родительская категория не найдена"
+                )
+        # Проверяем ограничение на уровень вложенности (максимум 3)
+        level, parent_path = child_activity_level(parent)
+
+        db_activity = models.Activity(
+            name=activity.name, parent_id=activity.parent_id, level=level
+        )
+        db.add(db_activity)
+        # Путь включает собственный id записи, поэтому сначала получаем его
+        db.flush()
+        db_activity.path = models.Activity.build_path(db_activity.id, parent_path)
+        bump_data_version(db, ACTIVITIES_VERSION)
+        db.commit()
+        activity_tree_cache.invalidate()
+        geo_result_cache.clear()
+        # Новая запись не имеет дочерних категорий
+        return schemas.Activity(
+            id=db_activity.id,
+            name=db_activity.name,
+            parent_id=db_activity.parent_id,
+            level=db_activity.level,
         )
-        if not parent:
-            raise HTTPException(
-                status_code=404, detail="Родительская категория не найдена"
-            )
-        if parent.level >= 3:
-            raise HTTPException(
-                status_code=400,
-                detail="Превышен максимальный уровень вложенности (3 уровня)",
-            )
-        level = parent.level + 1
-    else:
-        level = 1
 
-    db_activity = models.Activity(
-        name=activity.name, parent_id=activity.parent_id, level=level
-    )
-    db.add(db_activity)
-    db.commit()
-    db.refresh(db_activity)
-    return db_activity
+    return await executor.run(write)
+
+
+@router.post(
+    "/activities/batch",
+    response_model=schemas.ActivityBatchResult,
+    status_code=201,
+    tags=["activities"],
+)
+async def create_activities_batch(
+    items: List[schemas.ActivityCreate] = Body(
+        ..., min_length=1, max_length=settings.MAX_BATCH_SIZE
+    ),
+    executor: Executor = Depends(get_executor),
+    api_key: str = Security(verify_api_key),
+):
+    """Создать пачку видов деятельности в одной транзакции.
+
+    Родительские категории должны существовать до запроса. Записи с
+    несуществующим родителем или превышением вложенности не создаются и
+    перечисляются в errors по индексу в теле запроса.
+    """
+
+    def write(db: Session):
+        result = create_activities(db, items)
+        db.commit()
+        return result
+
+    result = await executor.run(write)
+    if result.created:
+        activity_tree_cache.invalidate()
+        geo_result_cache.clear()
+    return {"created": result.created, "errors": batch_errors(result.errors)}
 
 
 # === ORGANIZATIONS ENDPOINTS ===
 
 
+def activity_tree(db: Session, links, version: Optional[int] = None) -> ActivityTree:
+    """Снимок дерева, в котором есть все виды деятельности связей links.
+
+    Связь с видом деятельности, созданным после чтения версий запроса, может
+    попасть в выдачу раньше, чем он попадёт в снимок: тогда снимок
+    перестраивается.
+    """
+    tree = activity_tree_cache.get(db, version)
+    if any(activity_id not in tree.nodes for _, activity_id in links):
+        tree = activity_tree_cache.get(db, tree.version + 1)
+    return tree
+
+
+def organization_row_payloads(
+    db: Session,
+    rows: List,
+    projection: Optional[Projection] = None,
+    version: Optional[int] = None,
+) -> List[dict]:
+    """Собирает ответы из строк: проекции или быстрого пути сериализации.
+
+    version - версия видов деятельности ответа (activities_version).
+    """
+    if not rows:
+        return []
+    if projection is not None:
+        details = {
+            name: db.execute(statement).all()
+            for name, statement in projection_details_statements(
+                projection, rows
+            ).items()
+        }
+        tree = None
+        if "activities" in details:
+            tree = activity_tree(db, details["activities"], version)
+        return projected_payloads(projection, rows, details, tree)
+    buildings, phones, links = [
+        db.execute(details_statement).all()
+        for details_statement in organization_details_statements(rows)
+    ]
+    tree = activity_tree(db, links, version)
+    return organization_payloads(rows, buildings, phones, links, tree)
+
+
+def read_organizations(
+    db: Session,
+    filters: OrganizationFilters,
+    projection: Optional[Projection],
+    page: Page,
+    request: Request,
+    response: Response,
+) -> List:
+    """Страница организаций: ORM-объекты или, для проекции и быстрого пути
+    сериализации, готовые ответы."""
+    version = activities_version(request)
+    activity_ids = None
+    if filters.activity_id:
+        tree = activity_tree_cache.get(db, version)
+        activity_ids = tree.subtree_ids(filters.activity_id)
+    if filters.fuzzy_search:
+        db.execute(fuzzy_threshold_statement())
+
+    # Проекция и быстрый путь читают строки, полный ответ - ORM-объекты
+    fast = settings.FAST_SERIALIZATION
+    if projection is not None:
+        statement = organization_columns_statement(projection, filters, activity_ids)
+    elif fast:
+        statement = organization_rows_statement(filters, activity_ids)
+    else:
+        statement = organizations_statement(filters, activity_ids)
+    result = db.execute(organizations_page_statement(statement, filters, page))
+    rows = fast or projection is not None
+    organizations = result.all() if rows else result.scalars().all()
+    if not filters.fuzzy_search:
+        organizations = page.finalize(organizations, request, response)
+    if rows:
+        organizations = organization_row_payloads(
+            db, organizations, projection, version
+        )
+    return organizations
+
+
+def read_geo_result(
+    db: Session,
+    key: Hashable,
+    filters: OrganizationFilters,
+    projection: Optional[Projection],
+    versions: Dict[str, int],
+) -> CachedResult:
+    """Читает все организации квантованной области и сохраняет их в кэше.
+
+    Если организаций в области больше GEO_CACHE_MAX_ROWS, сохраняется запись
+    без них: такие запросы выполняются без кэша, не читая область целиком.
+    """
+    quantized = quantize_geo_filters(filters)
+    version = versions[ACTIVITIES_VERSION]
+    activity_ids = None
+    if quantized.activity_id:
+        tree = activity_tree_cache.get(db, version)
+        activity_ids = tree.subtree_ids(quantized.activity_id)
+    if projection is not None:
+        statement = organization_columns_statement(projection, quantized, activity_ids)
+    else:
+        statement = organization_rows_statement(quantized, activity_ids)
+    rows = db.execute(geo_result_statement(statement)).all()
+    region = geo_filters_region(quantized)
+    if len(rows) > settings.GEO_CACHE_MAX_ROWS:
+        return geo_result_cache.put(key, versions, region, None)
+    payloads = organization_row_payloads(db, rows, projection, version)
+    organizations = cached_organizations(rows, payloads, projection)
+    return geo_result_cache.put(key, versions, region, organizations)
+
+
 @router.get(
-    "/organizations/", response_model=List[schemas.Organization], tags=["organizations"]
+    "/organizations/",
+    response_model=schemas.OrganizationListResponse,
+    tags=["organizations"],
 )
-def get_organizations(
-    building_id: Optional[int] = Query(None, description="ID здания для фильтрации"),
-    activity_id: Optional[int] = Query(
-        None, description="ID вида деятельности для фильтрации"
-    ),
-    name: Optional[str] = Query(None, description="Поиск по названию организации"),
-    latitude: Optional[float] = Query(
-        None, description="Широта для географического поиска"
-    ),
-    longitude: Optional[float] = Query(
-        None, description="Долгота для географического поиска"
-    ),
-    radius: Optional[float] = Query(None, description="Радиус поиска в метрах"),
-    bbox_min_lat: Optional[float] = Query(
-        None, description="Минимальная широта прямоугольной области"
-    ),
-    bbox_min_lon: Optional[float] = Query(
-        None, description="Минимальная долгота прямоугольной области"
-    ),
-    bbox_max_lat: Optional[float] = Query(
-        None, description="Максимальная широта прямоугольной области"
-    ),
-    bbox_max_lon: Optional[float] = Query(
-        None, description="Максимальная долгота прямоугольной области"
-    ),
-    db: Session = Depends(get_db),
+async def get_organizations(
+    request: Request,
+    response: Response,
+    filters: OrganizationFilters = Depends(get_organization_filters),
+    projection: Optional[Projection] = Depends(get_projection),
+    page: Page = Depends(get_page),
+    executor: Executor = Depends(get_executor),
     api_key: str = Security(verify_api_key),
+    etag: str = Depends(conditional_get(ORGANIZATIONS_SCOPE)),
 ):
     """
-    Получить список организаций с возможностью фильтрации по:
+    Получить страницу списка организаций с возможностью фильтрации по:
+    - списку ID (ids)
     - зданию
     - виду деятельности (включая дочерние категории)
-    - названию
+    - названию (в том числе нечёткий поиск)
     - географическому расположению (радиус или прямоугольная область)
+
+    Параметры fields и include ограничивают поля и связанные записи ответа
+    (schemas.OrganizationPartial): остальные не читаются из базы.
     """
-    query = db.query(models.Organization)
-
-    # Фильтр по зданию
-    if building_id:
-        query = query.filter(models.Organization.building_id == building_id)
-
-    # Фильтр по виду деятельности (включая дочерние)
-    if activity_id:
-        # Получаем ID всех дочерних категорий
-        def get_child_activity_ids(parent_id):
-            children = (
-                db.query(models.Activity.id)
-                .filter(models.Activity.parent_id == parent_id)
-                .all()
-            )
-            child_ids = [child[0] for child in children]
-            all_ids = [parent_id]
-            for child_id in child_ids:
-                all_ids.extend(get_child_activity_ids(child_id))
-            return all_ids
-
-        activity_ids = get_child_activity_ids(activity_id)
-        query = query.join(models.organization_activity).filter(
-            models.organization_activity.c.activity_id.in_(activity_ids)
+    versions = request.state.data_versions
+    cache_key, cached = geo_cache_lookup(filters, versions, projection)
+    if cache_key is not None and cached is None:
+        cached = await executor.run(
+            read_geo_result, cache_key, filters, projection, versions
         )
+    if cached is not None and cached.organizations is not None:
+        return geo_result_response(cached, filters, page, request, response)
 
-    # Фильтр по названию
-    if name:
-        query = query.filter(models.Organization.name.ilike(f"%{name}%"))
-
-    # Географический фильтр
-    if latitude is not None and longitude is not None:
-        if radius:
-            # Поиск в радиусе
-            point = ST_MakePoint(longitude, latitude)
-            query = query.join(models.Building).filter(
-                ST_DWithin(models.Building.location, point, radius)
-            )
-        elif all([bbox_min_lat, bbox_min_lon, bbox_max_lat, bbox_max_lon]):
-            # Поиск в прямоугольной области
-            envelope = ST_MakeEnvelope(
-                bbox_min_lon, bbox_min_lat, bbox_max_lon, bbox_max_lat, 4326
+    organizations = await executor.run(
+        read_organizations, filters, projection, page, request, response
+    )
+    if projection is not None:
+        return projection_response(organizations, response)
+    return organizations_response(organizations, response)
+
+
+@router.get(
+    "/organizations/facets",
+    response_model=schemas.OrganizationFacets,
+    tags=["organizations"],
+)
+async def get_organization_facets(
+    request: Request,
+    response: Response,
+    facet: Optional[Literal["activities", "buildings"]] = Query(
+        None, description="Вернуть только один вид фасетов"
+    ),
+    activity_id: Optional[List[int]] = Query(
+        None, description="Только указанные виды деятельности"
+    ),
+    building_id: Optional[List[int]] = Query(
+        None, description="Только указанные здания"
+    ),
+    page: Page = Depends(get_page),
+    executor: Executor = Depends(get_executor),
+    api_key: str = Security(verify_api_key),
+):
+    """Количество организаций по видам деятельности (включая дочерние) и зданиям.
+
+    Счётчики читаются из материализованных представлений. Представления
+    обновляются в фоне, поэтому отстают от изменений на FACETS_REFRESH_INTERVAL
+    секунд и время обновления. Фасеты зданий выдаются страницами по
+    building_id (limit, after), фасеты видов деятельности - целиком.
+    """
+    facet_refresher.request_refresh()
+
+    def read(db: Session):
+        facets = {"activities": [], "buildings": []}
+        if facet != "buildings":
+            facets["activities"] = (
+                db.execute(activity_facets_statement(activity_id)).mappings().all()
             )
-            query = query.join(models.Building).filter(
-                func.ST_Within(models.Building.location, envelope)
+        if facet != "activities":
+            statement = building_facets_statement(
+                page.limit + 1, page.after_id, building_id
             )
+            facets["buildings"] = db.execute(statement).mappings().all()
+        return facets
 
-    return query.all()
+    facets = await executor.run(read)
+    facets["buildings"] = page.finalize(
+        facets["buildings"], request, response, key=itemgetter("building_id")
+    )
+    return facets
+
+
+@router.get(
+    "/organizations/clusters",
+    response_model=schemas.OrganizationClusters,
+    tags=["organizations"],
+)
+async def get_organization_clusters(
+    request: Request,
+    zoom: int = Query(
+        ..., ge=0, le=settings.CLUSTER_MAX_ZOOM, description="Уровень масштаба карты"
+    ),
+    viewport: Viewport = Depends(get_viewport),
+    activity_id: Optional[int] = Query(
+        None, description="ID вида деятельности для фильтрации (включая дочерние)"
+    ),
+    executor: Executor = Depends(get_executor),
+    api_key: str = Security(verify_api_key),
+    etag: str = Depends(conditional_get(ORGANIZATIONS_SCOPE)),
+):
+    """Кластеры организаций видимой области карты для уровня масштаба zoom.
+
+    Организации группируются в PostGIS по ячейкам сетки (размер зависит от
+    zoom): для ячейки возвращаются число организаций, средняя точка и самые
+    частые виды деятельности. Ячейки, где организаций не больше
+    CLUSTER_POINTS_THRESHOLD, выдаются отдельными точками. Размер ответа
+    ограничен CLUSTER_MAX_CELLS при любом zoom.
+    """
+    cell_size = cluster_cell_size(zoom, viewport)
+
+    def read(db: Session):
+        activity_ids = None
+        if activity_id:
+            tree = activity_tree_cache.get(db, activities_version(request))
+            activity_ids = tree.subtree_ids(activity_id)
+        return [
+            db.execute(statement).all()
+            for statement in cluster_statements(viewport, cell_size, activity_ids)
+        ]
+
+    cells, points, activities = await executor.run(read)
+    return organization_clusters(zoom, cell_size, cells, points, activities)
+
+
+@router.get(
+    "/organizations/nearest",
+    response_model=List[schemas.OrganizationWithDistance],
+    tags=["organizations"],
+)
+async def get_nearest_organizations(
+    request: Request,
+    latitude: float = Query(..., ge=-90, le=90, description="Широта точки"),
+    longitude: float = Query(..., ge=-180, le=180, description="Долгота точки"),
+    k: int = Query(
+        20, ge=1, le=settings.MAX_PAGE_SIZE, description="Количество организаций"
+    ),
+    activity_id: Optional[int] = Query(
+        None, description="ID вида деятельности для фильтрации (включая дочерние)"
+    ),
+    executor: Executor = Depends(get_executor),
+    api_key: str = Security(verify_api_key),
+    etag: str = Depends(conditional_get(ORGANIZATIONS_SCOPE)),
+):
+    """Получить k ближайших к точке организаций с расстоянием в метрах."""
+
+    def read(db: Session):
+        activity_ids = None
+        if activity_id:
+            tree = activity_tree_cache.get(db, activities_version(request))
+            activity_ids = tree.subtree_ids(activity_id)
+        statement = nearest_organizations_statement(
+            latitude, longitude, k, activity_ids
+        )
+        return db.execute(statement).all()
+
+    return with_distances(await executor.run(read))
+
+
+@router.post(
+    "/organizations/batch-get",
+    response_model=schemas.OrganizationBatch,
+    tags=["organizations"],
+)
+async def batch_get_organizations(
+    body: schemas.OrganizationBatchGet,
+    executor: Executor = Depends(get_executor),
+    api_key: str = Security(verify_api_key),
+):
+    """Получить организации по списку ID (не больше MAX_BATCH_SIZE).
+
+    Организации возвращаются в порядке запроса без повторов, отсутствующие
+    ID перечисляются в missing. Число SQL-запросов не зависит от числа ID.
+    """
+    ids = unique_ids(body.ids)
+    filters = OrganizationFilters(ids=ids)
+
+    def read(db: Session):
+        if not settings.FAST_SERIALIZATION:
+            return db.scalars(organizations_statement(filters)).all()
+        rows = db.execute(organization_rows_statement(filters)).all()
+        return organization_row_payloads(db, rows)
+
+    return organizations_batch_response(ids, await executor.run(read))
 
 
 @router.get(
     "/organizations/{organization_id}",
-    response_model=schemas.Organization,
+    response_model=schemas.OrganizationResponse,
     tags=["organizations"],
 )
-def get_organization(
+async def get_organization(
+    request: Request,
     organization_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    projection: Optional[Projection] = Depends(get_projection),
+    executor: Executor = Depends(get_executor),
     api_key: str = Security(verify_api_key),
+    etag: str = Depends(conditional_get(ORGANIZATIONS_SCOPE)),
 ):
-    """Получить информацию об организации по её идентификатору."""
-    organization = (
-        db.query(models.Organization)
-        .filter(models.Organization.id == organization_id)
-        .first()
-    )
+    """Получить информацию об организации по её идентификатору.
+
+    Параметры fields и include - как у списка организаций.
+    """
+
+    def read(db: Session):
+        if projection is None:
+            return db.scalars(organization_statement(organization_id)).first()
+        filters = OrganizationFilters(ids=(organization_id,))
+        rows = db.execute(organization_columns_statement(projection, filters)).all()
+        payloads = organization_row_payloads(
+            db, rows, projection, activities_version(request)
+        )
+        return payloads[0] if payloads else None
+
+    organization = await executor.run(read)
     if not organization:
         raise HTTPException(status_code=404, detail="Организация не найдена")
+    if projection is not None:
+        return projection_response(organization, response)
     return organization
 
 
@@ -213,45 +643,210 @@ def get_organization(
     status_code=201,
     tags=["organizations"],
 )
-def create_organization(
+async def create_organization(
     organization: schemas.OrganizationCreate,
-    db: Session = Depends(get_db),
+    executor: Executor = Depends(get_executor),
     api_key: str = Security(verify_api_key),
 ):
     """Создать новую организацию."""
-    # Проверяем, что здание существует
-    building = (
-        db.query(models.Building)
-        .filter(models.Building.id == organization.building_id)
-        .first()
-    )
-    if not building:
-        raise HTTPException(status_code=404, detail="Здание не найдено")
 
-    db_org = models.Organization(
-        name=organization.name, building_id=organization.building_id
+    def write(db: Session):
+        # Проверяем, что здание существует
+        building = db.get(models.Building, organization.building_id)
+        if not building:
+            raise HTTPException(status_code=404, detail="Здание не найдено")
+        location = (building.longitude, building.latitude)
+
+        activities = []
+        if organization.activities:
+            activities = db.scalars(
+                select(models.Activity).where(
+                    models.Activity.id.in_(organization.activities)
+                )
+            ).all()
+        db_org = new_organization(organization, list(activities))
+
+        db.add(db_org)
+        versions = bump_data_version(db, ORGANIZATIONS_VERSION)
+        db.commit()
+        geo_result_cache.invalidate_point(*location, versions)
+        tile_cache.invalidate_points([location], versions)
+        # Перечитываем организацию с полным графом ответа: ответ
+        # сериализуется вне сессии
+        statement = organization_statement(db_org.id).execution_options(
+            populate_existing=True
+        )
+        return db.scalars(statement).one()
+
+    return await executor.run(write)
+
+
+@router.post(
+    "/organizations/batch",
+    response_model=schemas.OrganizationBatchResult,
+    status_code=201,
+    tags=["organizations"],
+)
+async def create_organizations_batch(
+    items: List[schemas.OrganizationCreate] = Body(
+        ..., min_length=1, max_length=settings.MAX_BATCH_SIZE
+    ),
+    executor: Executor = Depends(get_executor),
+    api_key: str = Security(verify_api_key),
+):
+    """Создать пачку организаций в одной транзакции.
+
+    Здания и виды деятельности всей пачки проверяются одним запросом каждые.
+    Записи со ссылками на несуществующие записи не создаются и перечисляются
+    в errors по индексу в теле запроса.
+    """
+
+    def write(db: Session):
+        result, locations = create_organizations(db, items)
+        db.commit()
+        for location in locations:
+            geo_result_cache.invalidate_point(*location, result.versions)
+        tile_cache.invalidate_points(locations, result.versions)
+
+        # Граф ответа читается тем же планом загрузки, что и список организаций
+        organizations = []
+        if result.created:
+            filters = OrganizationFilters(ids=tuple(result.created))
+            organizations = db.scalars(organizations_statement(filters)).all()
+        return result, organizations
+
+    result, organizations = await executor.run(write)
+    ids = tuple(result.created)
+    return {
+        "created": organizations_batch(ids, organizations)["organizations"],
+        "errors": batch_errors(result.errors),
+    }
+
+
+# === IMPORT ENDPOINTS ===
+
+
+@router.post("/import/{kind}", response_model=schemas.ImportReport, tags=["import"])
+def import_data(
+    kind: Literal["buildings", "organizations"],
+    file: UploadFile = File(..., description="Файл NDJSON или CSV (UTF-8)"),
+    fmt: Literal["ndjson", "csv"] = Query(
+        "ndjson", alias="format", description="Формат файла"
+    ),
+    batch_size: int = Query(
+        settings.IMPORT_BATCH_SIZE,
+        ge=1,
+        le=100_000,
+        description="Количество записей в одной транзакции",
+    ),
+    db: Session = Depends(get_db),
+    api_key: str = Security(verify_api_key),
+):
+    """Массово импортировать здания или организации из файла.
+
+    Записи имеют те же поля, что и тела запросов POST /buildings/ и
+    POST /organizations/. В CSV телефоны и виды деятельности перечисляются
+    через точку с запятой. Возвращается отчёт с ошибками по пачкам.
+    """
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    report = import_stream(db.get_bind(), kind, stream, fmt, batch_size)
+    if report.imported:
+        geo_result_cache.clear()
+        tile_cache.clear()
+    return report
+
+
+# === EXPORT ENDPOINTS ===
+
+
+@router.get(
+    "/export/organizations",
+    response_class=StreamingResponse,
+    responses={200: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+    tags=["export"],
+)
+def export_organizations_ndjson(
+    db: Session = Depends(get_db),
+    api_key: str = Security(verify_api_key),
+):
+    """Выгрузить все организации в NDJSON: одна организация в схеме ответа
+    GET /organizations/{id} на строку, по возрастанию id.
+
+    Ответ передаётся потоком из серверного курсора по мере чтения из базы.
+    """
+    chunks = export_organizations(db.get_bind(), settings.EXPORT_CHUNK_SIZE)
+    return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE)
+
+
+# === METRICS ENDPOINTS ===
+
+
+@router.get("/metrics", response_class=PlainTextResponse, tags=["metrics"])
+async def get_metrics(api_key: str = Security(verify_api_key)):
+    """Получить метрики в текстовом формате Prometheus: задержки и размеры
+    ответов по маршрутам, SQL-запросы на HTTP-запрос, поиск организаций по
+    наборам фильтров, пул потоков, пулы соединений и кэш геопоиска."""
+    collect_runtime_metrics()
+    return PlainTextResponse(
+        metrics_registry.render(), media_type="text/plain; version=0.0.4"
     )
 
-    # Добавляем телефоны
-    for phone_number in organization.phones:
-        phone = models.Phone(number=phone_number)
-        db_org.phones.append(phone)
-
-    # Добавляем виды деятельности
-    if organization.activities:
-        activities = (
-            db.query(models.Activity)
-            .filter(models.Activity.id.in_(organization.activities))
-            .all()
-        )
-        if len(activities) != len(organization.activities):
-            raise HTTPException(
-                status_code=404,
-                detail="Один или несколько видов деятельности не найдены",
-            )
-        db_org.activities = activities
 
-    db.add(db_org)
-    db.commit()
-    db.refresh(db_org)
-    return db_org
+@router.get(
+    "/metrics/pool", response_model=Dict[str, schemas.PoolStats], tags=["metrics"]
+)
+def get_pool_metrics(api_key: str = Security(verify_api_key)):
+    """Получить состояние пулов соединений синхронного и асинхронного движков.
+
+    Для каждого пула: занятые и свободные соединения, время ожидания выдачи
+    соединения и число таймаутов ожидания.
+    """
+    return get_pool_stats()
+
+
+@router.get(
+    "/metrics/geo-cache", response_model=schemas.GeoCacheStats, tags=["metrics"]
+)
+def get_geo_cache_metrics(api_key: str = Security(verify_api_key)):
+    """Получить статистику кэша географического поиска: размер, попадания,
+    промахи, вытеснения и инвалидации."""
+    return geo_result_cache.stats()
+
+
+# === TILES ENDPOINTS ===
+
+
+@router.get(
+    "/tiles/{z}/{x}/{y}.mvt",
+    response_class=Response,
+    responses={200: {"content": {MVT_MEDIA_TYPE: {}}}},
+    tags=["tiles"],
+)
+async def get_tile(
+    request: Request,
+    response: Response,
+    z: int = Path(..., ge=0, le=settings.TILE_MAX_ZOOM, description="Уровень zoom"),
+    x: int = Path(..., ge=0, description="Номер тайла по горизонтали"),
+    y: int = Path(..., ge=0, description="Номер тайла по вертикали"),
+    executor: Executor = Depends(get_executor),
+    api_key: str = Security(verify_api_key),
+):
+    """Векторный тайл (Mapbox Vector Tile) зданий и организаций в проекции
+    Web Mercator: слои buildings и organizations, у организаций - ID видов
+    деятельности в атрибуте activities.
+
+    Тайлы кэшируются в памяти процесса по z/x/y и версиям данных; создание
+    здания или организации удаляет из кэша только тайлы с новой точкой.
+    """
+    if x >= 2**z or y >= 2**z:
+        raise HTTPException(status_code=404, detail="Тайл не найден")
+    versions = await executor.run(get_data_versions, TILES_SCOPE)
+    check_etag(request, response, versions)
+
+    tile = (z, x, y)
+    body = tile_cache.get(tile, versions) if tile_cache.enabled else None
+    if body is None:
+        body = await executor.run(lambda db: db.scalar(tile_statement(z, x, y)))
+        if tile_cache.enabled:
+            tile_cache.put(tile, versions, body)
+    return Response(body, media_type=MVT_MEDIA_TYPE, headers=dict(response.headers))
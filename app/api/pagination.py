@@ -0,0 +1,86 @@
+import base64
+import binascii
+import json
+from itertools import islice
+from operator import attrgetter
+from typing import Callable, Iterable, List, Optional
+
+from fastapi import HTTPException, Query, Request, Response
+
+from app.core.config import settings
+
+
+def encode_cursor(last_id: int) -> str:
+    """Кодирует идентификатор последней записи страницы в непрозрачный курсор."""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Декодирует курсор, полученный из encode_cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+    return last_id
+
+
+class Page:
+    """Параметры keyset-пагинации по возрастанию id.
+
+    Страница выбирается условием ``id > after`` с сортировкой по id, поэтому
+    вставка новых записей не сдвигает уже выданные страницы.
+    """
+
+    def __init__(self, limit: int, after_id: Optional[int] = None):
+        self.limit = limit
+        self.after_id = after_id
+
+    def apply(self, query, id_column):
+        """Ограничивает запрос текущей страницей (+1 запись для признака next)."""
+        if self.after_id is not None:
+            query = query.filter(id_column > self.after_id)
+        return query.order_by(id_column).limit(self.limit + 1)
+
+    def apply_to_ids(self, ids: Iterable[int]) -> List[int]:
+        """То же, что apply, для уже отсортированной последовательности id."""
+        if self.after_id is not None:
+            ids = (item_id for item_id in ids if item_id > self.after_id)
+        return list(islice(ids, self.limit + 1))
+
+    def finalize(
+        self,
+        items: List,
+        request: Request,
+        response: Response,
+        key: Callable[[object], int] = attrgetter("id"),
+    ) -> List:
+        """Обрезает лишнюю запись и выставляет заголовки со следующим курсором.
+
+        key - id записи, по которому строится курсор.
+        """
+        if len(items) <= self.limit:
+            return items
+        items = items[: self.limit]
+        cursor = encode_cursor(key(items[-1]))
+        next_url = request.url.include_query_params(after=cursor)
+        response.headers["X-Next-Cursor"] = cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+        return items
+
+
+def get_page(
+    limit: int = Query(
+        settings.DEFAULT_PAGE_SIZE,
+        ge=1,
+        le=settings.MAX_PAGE_SIZE,
+        description="Максимальное количество записей на странице",
+    ),
+    after: Optional[str] = Query(
+        None, description="Курсор следующей страницы из заголовка X-Next-Cursor"
+    ),
+) -> Page:
+    return Page(limit=limit, after_id=decode_cursor(after) if after else None)
@@ -0,0 +1,1117 @@
+"""Построители запросов и ответов, общие для синхронных и асинхронных эндпоинтов.
+
+Функции модуля не выполняют запросы сами: они возвращают выражения
+SQLAlchemy, которые выполняются через Session или AsyncSession.
+"""
+
+import bisect
+import copy
+import math
+from itertools import islice
+from operator import attrgetter
+from typing import (
+    Callable,
+    Dict,
+    FrozenSet,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+import orjson
+from fastapi import HTTPException, Query, Request, Response
+from geoalchemy2.functions import ST_DWithin
+from geographiclib.geodesic import Geodesic
+from pydantic import TypeAdapter
+from sqlalchemy import BigInteger, cast, false, func, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.api.pagination import Page
+from app.cache.activity_tree import ActivityTree
+from app.cache.geo import (
+    CachedOrganization,
+    CachedResult,
+    Region,
+    geo_result_cache,
+    region_contains,
+)
+from app.core.config import settings
+from app.database.geo import bbox_envelope, building_geometry, geography_point
+from app.metrics.instrumentation import current_request_stats
+from app.models import models
+from app.schemas import schemas
+
+# === BUILDINGS ===
+
+
+def buildings_statement(address: Optional[str] = None):
+    statement = select(models.Building)
+    if address:
+        statement = statement.where(models.Building.address.ilike(f"%{address}%"))
+    return statement
+
+
+# === ACTIVITIES ===
+
+
+def activity_schema(tree: ActivityTree, activity_id: int) -> schemas.Activity:
+    """Собирает вид деятельности с дочерними категориями из снимка дерева."""
+    node = tree.nodes[activity_id]
+    return schemas.Activity(
+        id=node.id,
+        name=node.name,
+        parent_id=node.parent_id,
+        level=node.level,
+        children=[
+            activity_schema(tree, child_id)
+            for child_id in tree.children.get(activity_id, ())
+        ],
+    )
+
+
+def activities_page(snapshot: ActivityTree, tree: bool, page: Page) -> List:
+    """Страница видов деятельности: деревом от корней или плоским списком."""
+    if tree:
+        ids = page.apply_to_ids(snapshot.roots)
+        return [activity_schema(snapshot, activity_id) for activity_id in ids]
+    ids = page.apply_to_ids(sorted(snapshot.nodes))
+    return [
+        schemas.ActivityFlat.model_validate(snapshot.nodes[activity_id])
+        for activity_id in ids
+    ]
+
+
+def child_activity_level(parent: Optional[models.Activity]):
+    """Уровень и путь родителя для новой записи с учётом ограничения вложенности."""
+    if parent is None:
+        return 1, ""
+    if parent.level >= models.MAX_ACTIVITY_LEVEL:
+        raise HTTPException(
+            status_code=400,
+            detail="Превышен максимальный уровень вложенности (3 уровня)",
+        )
+    return parent.level + 1, parent.path
+
+
+# === ORGANIZATIONS ===
+
+
+class OrganizationFilters:
+    """Параметры фильтрации списка организаций."""
+
+    def __init__(
+        self,
+        ids: Optional[Tuple[int, ...]] = None,
+        building_id: Optional[int] = None,
+        activity_id: Optional[int] = None,
+        name: Optional[str] = None,
+        fuzzy: bool = False,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        radius: Optional[float] = None,
+        bbox_min_lat: Optional[float] = None,
+        bbox_min_lon: Optional[float] = None,
+        bbox_max_lat: Optional[float] = None,
+        bbox_max_lon: Optional[float] = None,
+    ):
+        self.ids = ids
+        self.building_id = building_id
+        self.activity_id = activity_id
+        self.name = name
+        self.fuzzy = fuzzy
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius = radius
+        self.bbox_min_lat = bbox_min_lat
+        self.bbox_min_lon = bbox_min_lon
+        self.bbox_max_lat = bbox_max_lat
+        self.bbox_max_lon = bbox_max_lon
+
+    @property
+    def fuzzy_search(self) -> bool:
+        return bool(self.name and self.fuzzy)
+
+    @property
+    def has_radius(self) -> bool:
+        return None not in (self.latitude, self.longitude) and bool(self.radius)
+
+    @property
+    def has_bbox(self) -> bool:
+        return None not in (
+            self.bbox_min_lat,
+            self.bbox_min_lon,
+            self.bbox_max_lat,
+            self.bbox_max_lon,
+        )
+
+    @property
+    def combination(self) -> str:
+        """Набор применённых фильтров, например "activity_id+radius"."""
+        applied = [
+            name
+            for name, active in (
+                ("ids", self.ids is not None),
+                ("building_id", self.building_id),
+                ("activity_id", self.activity_id),
+                ("fuzzy_name" if self.fuzzy_search else "name", self.name),
+                ("radius", self.has_radius),
+                ("bbox", self.has_bbox and not self.has_radius),
+            )
+            if active
+        ]
+        return "+".join(applied) or "none"
+
+
+def get_organization_filters(
+    ids: Optional[List[str]] = Query(
+        None,
+        description="ID организаций через запятую или повторяющимся параметром "
+        f"(не больше {settings.MAX_BATCH_SIZE})",
+    ),
+    building_id: Optional[int] = Query(None, description="ID здания для фильтрации"),
+    activity_id: Optional[int] = Query(
+        None, description="ID вида деятельности для фильтрации"
+    ),
+    name: Optional[str] = Query(None, description="Поиск по названию организации"),
+    fuzzy: bool = Query(
+        False,
+        description="Нечёткий поиск по названию: результаты упорядочены по "
+        "схожести, выдаётся одна страница без курсора",
+    ),
+    latitude: Optional[float] = Query(
+        None, description="Широта для географического поиска"
+    ),
+    longitude: Optional[float] = Query(
+        None, description="Долгота для географического поиска"
+    ),
+    radius: Optional[float] = Query(None, description="Радиус поиска в метрах"),
+    bbox_min_lat: Optional[float] = Query(
+        None, description="Минимальная широта прямоугольной области"
+    ),
+    bbox_min_lon: Optional[float] = Query(
+        None, description="Минимальная долгота прямоугольной области"
+    ),
+    bbox_max_lat: Optional[float] = Query(
+        None, description="Максимальная широта прямоугольной области"
+    ),
+    bbox_max_lon: Optional[float] = Query(
+        None, description="Максимальная долгота прямоугольной области"
+    ),
+) -> OrganizationFilters:
+    filters = OrganizationFilters(
+        ids=parse_ids(ids) if ids is not None else None,
+        building_id=building_id,
+        activity_id=activity_id,
+        name=name,
+        fuzzy=fuzzy,
+        latitude=latitude,
+        longitude=longitude,
+        radius=radius,
+        bbox_min_lat=bbox_min_lat,
+        bbox_min_lon=bbox_min_lon,
+        bbox_max_lat=bbox_max_lat,
+        bbox_max_lon=bbox_max_lon,
+    )
+    stats = current_request_stats()
+    if stats is not None:
+        stats.organization_filters = filters.combination
+    return filters
+
+
+def unique_ids(ids: Iterable[int]) -> Tuple[int, ...]:
+    """Убирает повторы с сохранением порядка и проверяет MAX_BATCH_SIZE."""
+    ids = tuple(dict.fromkeys(ids))
+    if len(ids) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Не больше {settings.MAX_BATCH_SIZE} ID за запрос",
+        )
+    return ids
+
+
+def parse_ids(values: List[str]) -> Tuple[int, ...]:
+    """ID из параметров вида ids=1,2,3 и ids=1&ids=2."""
+    ids = []
+    for value in values:
+        for item in value.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            try:
+                ids.append(int(item))
+            except ValueError:
+                raise HTTPException(
+                    status_code=422, detail=f"Некорректный ID организации: {item}"
+                )
+    return unique_ids(ids)
+
+
+def organization_load_options():
+    """План жадной загрузки графа ответа schemas.Organization.
+
+    Телефоны и виды деятельности подгружаются через selectin, здание - через
+    join, а дочерние категории - по одному selectin-запросу на уровень дерева.
+    Количество запросов не зависит от числа организаций в выборке.
+    """
+    activities = selectinload(models.Organization.activities)
+    for _ in range(models.MAX_ACTIVITY_LEVEL):
+        activities = activities.selectinload(models.Activity.children)
+    return [
+        selectinload(models.Organization.phones),
+        joinedload(models.Organization.building),
+        activities,
+    ]
+
+
+def organizations_in_activities(activity_ids: FrozenSet[int]):
+    """Условие: организация связана хотя бы с одним из видов деятельности.
+
+    Подзапрос вместо join не дублирует организацию с несколькими подходящими
+    видами деятельности.
+    """
+    if not activity_ids:
+        return false()
+    return models.Organization.id.in_(
+        select(models.organization_activity.c.organization_id).where(
+            models.organization_activity.c.activity_id.in_(activity_ids)
+        )
+    )
+
+
+def fuzzy_threshold_statement():
+    """Порог схожести для оператора % на время текущей транзакции."""
+    return select(
+        func.set_config(
+            "pg_trgm.similarity_threshold",
+            str(settings.FUZZY_SEARCH_THRESHOLD),
+            True,
+        )
+    )
+
+
+def organizations_statement(
+    filters: OrganizationFilters, activity_ids: Optional[FrozenSet[int]] = None
+):
+    """Запрос организаций по фильтрам.
+
+    activity_ids - поддерево filters.activity_id из снимка дерева видов
+    деятельности. При нечётком поиске запрос уже упорядочен по схожести.
+    """
+    statement = select(models.Organization).options(*organization_load_options())
+    return filter_organizations(statement, filters, activity_ids)
+
+
+def organization_rows_statement(
+    filters: OrganizationFilters, activity_ids: Optional[FrozenSet[int]] = None
+):
+    """То же, что organizations_statement, но только столбцы самой организации."""
+    statement = select(
+        models.Organization.id,
+        models.Organization.name,
+        models.Organization.building_id,
+    )
+    return filter_organizations(statement, filters, activity_ids)
+
+
+def filter_organizations(
+    statement, filters: OrganizationFilters, activity_ids: Optional[FrozenSet[int]]
+):
+    # Фильтр по списку ID
+    if filters.ids is not None:
+        statement = statement.where(models.Organization.id.in_(filters.ids))
+
+    # Фильтр по зданию
+    if filters.building_id:
+        statement = statement.where(
+            models.Organization.building_id == filters.building_id
+        )
+
+    # Фильтр по виду деятельности (включая дочерние)
+    if filters.activity_id:
+        statement = statement.where(organizations_in_activities(activity_ids))
+
+    # Фильтр по названию. Оператор % и ILIKE используют GIN-индекс по триграммам
+    if filters.fuzzy_search:
+        similarity = func.similarity(models.Organization.name, filters.name)
+        statement = statement.where(
+            models.Organization.name.op("%")(filters.name)
+        ).order_by(similarity.desc(), models.Organization.id)
+    elif filters.name:
+        statement = statement.where(models.Organization.name.ilike(f"%{filters.name}%"))
+
+    # Географический фильтр
+    if filters.has_radius:
+        # Поиск в радиусе
+        point = geography_point(filters.longitude, filters.latitude)
+        statement = statement.join(models.Building).where(
+            ST_DWithin(models.Building.location, point, filters.radius)
+        )
+    elif filters.has_bbox:
+        # Поиск в прямоугольной области
+        envelope = bbox_envelope(
+            filters.bbox_min_lon,
+            filters.bbox_min_lat,
+            filters.bbox_max_lon,
+            filters.bbox_max_lat,
+        )
+        statement = statement.join(models.Building).where(
+            func.ST_Intersects(building_geometry(), envelope)
+        )
+
+    return statement
+
+
+def organizations_page_statement(statement, filters: OrganizationFilters, page: Page):
+    """Ограничивает запрос организаций страницей.
+
+    Выдача нечёткого поиска ранжирована по схожести, поэтому для неё
+    возвращается только первая страница без курсора.
+    """
+    if not filters.fuzzy_search:
+        return page.apply(statement, models.Organization.id)
+    if page.after_id is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="Курсор не поддерживается при нечётком поиске",
+        )
+    return statement.limit(page.limit)
+
+
+def nearest_organizations_statement(
+    latitude: float,
+    longitude: float,
+    k: int,
+    activity_ids: Optional[FrozenSet[int]] = None,
+):
+    """k ближайших организаций и расстояние до них в метрах.
+
+    Сортировка оператором <-> по geography выполняется по GiST-индексу
+    (KNN), поэтому не требует просмотра всех зданий.
+    """
+    point = geography_point(longitude, latitude)
+    distance = func.ST_Distance(models.Building.location, point)
+    statement = (
+        select(models.Organization, distance)
+        .options(*organization_load_options())
+        .join(models.Building, models.Organization.building)
+    )
+    if activity_ids is not None:
+        statement = statement.where(organizations_in_activities(activity_ids))
+    return statement.order_by(models.Building.location.op("<->")(point)).limit(k)
+
+
+def with_distances(rows) -> List[dict]:
+    return [
+        {
+            **schemas.Organization.model_validate(organization).model_dump(),
+            "distance": meters,
+        }
+        for organization, meters in rows
+    ]
+
+
+def organization_statement(organization_id: int):
+    return (
+        select(models.Organization)
+        .options(*organization_load_options())
+        .where(models.Organization.id == organization_id)
+    )
+
+
+def organizations_batch(ids: Tuple[int, ...], organizations: List) -> dict:
+    """Ответ batch-get: организации в порядке ids и ID, которых нет в базе.
+
+    organizations - ORM-объекты или словари быстрого пути в любом порядке.
+    """
+    by_id = {}
+    for organization in organizations:
+        if isinstance(organization, dict):
+            by_id[organization["id"]] = organization
+        else:
+            by_id[organization.id] = organization
+    return {
+        "organizations": [by_id[item_id] for item_id in ids if item_id in by_id],
+        "missing": [item_id for item_id in ids if item_id not in by_id],
+    }
+
+
+def organizations_batch_response(ids: Tuple[int, ...], organizations: List):
+    """Как organizations_response, но для ответа schemas.OrganizationBatch."""
+    batch = organizations_batch(ids, organizations)
+    if not settings.FAST_SERIALIZATION:
+        return batch
+    return Response(orjson.dumps(batch), media_type="application/json")
+
+
+def new_organization(
+    organization: schemas.OrganizationCreate, activities: List[models.Activity]
+) -> models.Organization:
+    """Создаёт объект организации с телефонами и видами деятельности.
+
+    activities - найденные в базе виды деятельности из organization.activities.
+    """
+    if len(activities) != len(set(organization.activities)):
+        raise HTTPException(
+            status_code=404,
+            detail="Один или несколько видов деятельности не найдены",
+        )
+    db_org = models.Organization(
+        name=organization.name, building_id=organization.building_id
+    )
+    # Добавляем телефоны
+    for phone_number in organization.phones:
+        db_org.phones.append(models.Phone(number=phone_number))
+    # Добавляем виды деятельности
+    db_org.activities = activities
+    return db_org
+
+
+# === CLUSTERS ===
+
+
+class Viewport(NamedTuple):
+    min_lon: float
+    min_lat: float
+    max_lon: float
+    max_lat: float
+
+
+def get_viewport(
+    bbox_min_lat: float = Query(
+        ..., ge=-90, le=90, description="Минимальная широта видимой области"
+    ),
+    bbox_min_lon: float = Query(
+        ..., ge=-180, le=180, description="Минимальная долгота видимой области"
+    ),
+    bbox_max_lat: float = Query(
+        ..., ge=-90, le=90, description="Максимальная широта видимой области"
+    ),
+    bbox_max_lon: float = Query(
+        ..., ge=-180, le=180, description="Максимальная долгота видимой области"
+    ),
+) -> Viewport:
+    if bbox_min_lat > bbox_max_lat or bbox_min_lon > bbox_max_lon:
+        raise HTTPException(
+            status_code=422,
+            detail="Минимальные координаты области больше максимальных",
+        )
+    return Viewport(bbox_min_lon, bbox_min_lat, bbox_max_lon, bbox_max_lat)
+
+
+def cluster_cell_size(zoom: int, viewport: Viewport) -> float:
+    """Размер ячейки сетки кластеров в градусах.
+
+    На уровне zoom тайл 256 px покрывает 360 / 2^zoom градусов долготы и
+    делится на CLUSTER_CELLS_PER_TILE ячеек. Если область при этом
+    покрывает больше CLUSTER_MAX_CELLS ячеек, ячейка укрупняется.
+    """
+    size = 360.0 / (2**zoom * settings.CLUSTER_CELLS_PER_TILE)
+    width = viewport.max_lon - viewport.min_lon
+    height = viewport.max_lat - viewport.min_lat
+    # +1: область, не выровненная по сетке, задевает лишнюю ячейку с каждой оси
+    while (width / size + 1) * (height / size + 1) > settings.CLUSTER_MAX_CELLS:
+        size *= 2
+    return size
+
+
+def viewport_organizations_cte(
+    viewport: Viewport,
+    cell_size: float,
+    activity_ids: Optional[FrozenSet[int]] = None,
+):
+    """Организации в области с координатами и ячейкой сетки.
+
+    Сетка привязана к началу координат, а не к области, поэтому при сдвиге
+    карты кластеры на месте не пересчитываются в другие.
+    """
+    geometry = building_geometry()
+    longitude = func.ST_X(geometry)
+    latitude = func.ST_Y(geometry)
+    statement = (
+        select(
+            models.Organization.id,
+            models.Organization.name,
+            models.Organization.building_id,
+            longitude.label("longitude"),
+            latitude.label("latitude"),
+            cast(func.floor(longitude / cell_size), BigInteger).label("cell_x"),
+            cast(func.floor(latitude / cell_size), BigInteger).label("cell_y"),
+        )
+        .join(models.Building, models.Organization.building)
+        .where(func.ST_Intersects(geometry, bbox_envelope(*viewport)))
+    )
+    if activity_ids is not None:
+        statement = statement.where(organizations_in_activities(activity_ids))
+    return statement.cte("viewport_organizations")
+
+
+def cluster_cells_statement(organizations):
+    """Число организаций и их средняя точка по ячейкам сетки."""
+    cell = (organizations.c.cell_x, organizations.c.cell_y)
+    return (
+        select(
+            *cell,
+            func.count().label("organizations"),
+            func.avg(organizations.c.longitude).label("longitude"),
+            func.avg(organizations.c.latitude).label("latitude"),
+        )
+        .group_by(*cell)
+        .order_by(*cell)
+    )
+
+
+def cluster_points_statement(organizations):
+    """Организации ячеек, где их не больше CLUSTER_POINTS_THRESHOLD."""
+    counted = select(
+        organizations,
+        func.count()
+        .over(partition_by=(organizations.c.cell_x, organizations.c.cell_y))
+        .label("cell_organizations"),
+    ).subquery()
+    return (
+        select(
+            counted.c.id,
+            counted.c.name,
+            counted.c.building_id,
+            counted.c.longitude,
+            counted.c.latitude,
+        )
+        .where(counted.c.cell_organizations <= settings.CLUSTER_POINTS_THRESHOLD)
+        .order_by(counted.c.id)
+    )
+
+
+def cluster_activities_statement(organizations):
+    """CLUSTER_TOP_ACTIVITIES самых частых видов деятельности каждой ячейки."""
+    links = models.organization_activity
+    cell = (organizations.c.cell_x, organizations.c.cell_y)
+    ranked = (
+        select(
+            *cell,
+            links.c.activity_id,
+            func.count().label("organizations"),
+            func.row_number()
+            .over(
+                partition_by=cell,
+                order_by=(func.count().desc(), links.c.activity_id),
+            )
+            .label("rank"),
+        )
+        .join(links, links.c.organization_id == organizations.c.id)
+        .group_by(*cell, links.c.activity_id)
+        .subquery()
+    )
+    return (
+        select(
+            ranked.c.cell_x,
+            ranked.c.cell_y,
+            ranked.c.activity_id,
+            ranked.c.organizations,
+        )
+        .where(ranked.c.rank <= settings.CLUSTER_TOP_ACTIVITIES)
+        .order_by(ranked.c.cell_x, ranked.c.cell_y, ranked.c.rank)
+    )
+
+
+def cluster_statements(
+    viewport: Viewport,
+    cell_size: float,
+    activity_ids: Optional[FrozenSet[int]] = None,
+):
+    """Запросы ячеек, отдельных точек и видов деятельности ячеек."""
+    organizations = viewport_organizations_cte(viewport, cell_size, activity_ids)
+    return (
+        cluster_cells_statement(organizations),
+        cluster_points_statement(organizations),
+        cluster_activities_statement(organizations),
+    )
+
+
+def organization_clusters(
+    zoom: int, cell_size: float, cells, points, activities
+) -> dict:
+    """Ответ schemas.OrganizationClusters из результатов cluster_statements.
+
+    Ячейки, организации которых выданы точками, в кластеры не попадают.
+    """
+    by_cell: Dict[Tuple[int, int], List[dict]] = {}
+    for row in activities:
+        by_cell.setdefault((row.cell_x, row.cell_y), []).append(
+            {"activity_id": row.activity_id, "organizations": row.organizations}
+        )
+    clusters = [
+        {
+            "cell_x": row.cell_x,
+            "cell_y": row.cell_y,
+            "organizations": row.organizations,
+            "latitude": row.latitude,
+            "longitude": row.longitude,
+            "activities": by_cell.get((row.cell_x, row.cell_y), []),
+        }
+        for row in cells
+        if row.organizations > settings.CLUSTER_POINTS_THRESHOLD
+    ]
+    return {
+        "zoom": zoom,
+        "cell_size": cell_size,
+        "clusters": clusters,
+        "points": [row._asdict() for row in points],
+    }
+
+
+# === GEO CACHE ===
+
+# Наименьшая длина градуса широты (на экваторе), м: по ней область круга
+# оценивается сверху
+MIN_METERS_PER_DEGREE = 110_574.0
+# Средний радиус Земли, м. Расстояние по сфере отличается от расстояния по
+# эллипсоиду WGS84 меньше чем на SPHERE_DISTANCE_ERROR: точки дальше от
+# границы круга проверяются по сфере, остальные - по эллипсоиду
+EARTH_RADIUS = 6_371_008.8
+SPHERE_DISTANCE_ERROR = 0.01
+
+
+def snap(value: float, step: float, rounding: Callable[[float], float]) -> float:
+    if not step:
+        return value
+    return round(rounding(value / step) * step, 9)
+
+
+def geodesic_distance(
+    latitude: float, longitude: float, other_latitude: float, other_longitude: float
+) -> float:
+    """Расстояние по эллипсоиду WGS84 в метрах, как у geography в PostGIS."""
+    return Geodesic.WGS84.Inverse(
+        latitude, longitude, other_latitude, other_longitude, Geodesic.DISTANCE
+    )["s12"]
+
+
+def sphere_distance(
+    latitude: float, longitude: float, other_latitude: float, other_longitude: float
+) -> float:
+    phi, other_phi = math.radians(latitude), math.radians(other_latitude)
+    delta_lat = math.sin((other_phi - phi) / 2) ** 2
+    delta_lon = math.sin(math.radians(other_longitude - longitude) / 2) ** 2
+    haversine = delta_lat + math.cos(phi) * math.cos(other_phi) * delta_lon
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(haversine)))
+
+
+def quantize_geo_filters(filters: OrganizationFilters) -> OrganizationFilters:
+    """Привязывает географический фильтр к сетке кэша.
+
+    Прямоугольник расширяется наружу до узлов сетки, центр круга смещается
+    к ближайшему узлу, а радиус увеличивается на это смещение и округляется
+    вверх, поэтому запрошенная область всегда покрыта. Неиспользуемые
+    географические параметры сбрасываются.
+    """
+    grid = settings.GEO_CACHE_GRID
+    quantized = copy.copy(filters)
+    quantized.latitude = quantized.longitude = quantized.radius = None
+    quantized.bbox_min_lat = quantized.bbox_min_lon = None
+    quantized.bbox_max_lat = quantized.bbox_max_lon = None
+    if filters.has_radius:
+        quantized.latitude = snap(filters.latitude, grid, round)
+        quantized.longitude = snap(filters.longitude, grid, round)
+        shift = geodesic_distance(
+            filters.latitude, filters.longitude, quantized.latitude, quantized.longitude
+        )
+        quantized.radius = snap(
+            filters.radius + shift, settings.GEO_CACHE_RADIUS_STEP, math.ceil
+        )
+    elif filters.has_bbox:
+        quantized.bbox_min_lat = max(snap(filters.bbox_min_lat, grid, math.floor), -90)
+        quantized.bbox_min_lon = snap(filters.bbox_min_lon, grid, math.floor)
+        quantized.bbox_max_lat = min(snap(filters.bbox_max_lat, grid, math.ceil), 90)
+        quantized.bbox_max_lon = snap(filters.bbox_max_lon, grid, math.ceil)
+    return quantized
+
+
+def geo_filters_region(filters: OrganizationFilters) -> Region:
+    """Область в градусах, вне которой организации не влияют на выдачу."""
+    if not filters.has_radius:
+        return (
+            filters.bbox_min_lon,
+            filters.bbox_min_lat,
+            filters.bbox_max_lon,
+            filters.bbox_max_lat,
+        )
+    delta_lat = filters.radius / MIN_METERS_PER_DEGREE
+    min_lat = max(filters.latitude - delta_lat, -90)
+    max_lat = min(filters.latitude + delta_lat, 90)
+    # Градус долготы короче всего на самой далёкой от экватора широте круга
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat * 180 > delta_lat:
+        delta_lon = delta_lat / cos_lat
+        min_lon = filters.longitude - delta_lon
+        max_lon = filters.longitude + delta_lon
+        if -180 <= min_lon and max_lon <= 180:
+            return min_lon, min_lat, max_lon, max_lat
+    # Круг захватывает полюс или пересекает антимеридиан: весь пояс широт
+    return -180.0, min_lat, 180.0, max_lat
+
+
+def in_geo_filter(filters: OrganizationFilters, longitude: float, latitude: float):
+    """Точка проходит географический фильтр: те же условия, что в
+    filter_organizations (ST_DWithin по geography или ST_Intersects)."""
+    if not filters.has_radius:
+        return region_contains(geo_filters_region(filters), longitude, latitude)
+    center = (filters.latitude, filters.longitude)
+    distance = sphere_distance(*center, latitude, longitude)
+    if distance < filters.radius * (1 - SPHERE_DISTANCE_ERROR):
+        return True
+    if distance > filters.radius * (1 + SPHERE_DISTANCE_ERROR):
+        return False
+    return geodesic_distance(*center, latitude, longitude) <= filters.radius
+
+
+def geo_cache_lookup(
+    filters: OrganizationFilters,
+    versions: Dict[str, int],
+    projection: Optional["Projection"] = None,
+) -> Tuple[Optional[Hashable], Optional[CachedResult]]:
+    """Ищет результат географического запроса организаций в кэше.
+
+    Возвращает ключ записи (None, если запрос не кэшируется) и найденную
+    запись. Ключ - фильтры, привязанные к сетке, и проекция: запросы
+    соседних областей получают одну запись. versions - версии данных ответа
+    (те же, что в его ETag).
+    """
+    if not geo_result_cache.enabled or filters.fuzzy_search:
+        return None, None
+    if not (filters.has_radius or filters.has_bbox):
+        return None, None
+    quantized = quantize_geo_filters(filters)
+    key = (tuple(sorted(vars(quantized).items())), projection)
+    return key, geo_result_cache.get(key, versions)
+
+
+def geo_result_statement(statement):
+    """Все организации квантованной области (не больше GEO_CACHE_MAX_ROWS + 1)
+    с координатами зданий.
+
+    statement - запрос строк организаций с географическим фильтром, который
+    уже присоединил здания.
+    """
+    return (
+        statement.add_columns(
+            models.Building.longitude.label("geo_longitude"),
+            models.Building.latitude.label("geo_latitude"),
+        )
+        .order_by(models.Organization.id)
+        .limit(settings.GEO_CACHE_MAX_ROWS + 1)
+    )
+
+
+def cached_organizations(
+    rows, payloads: List[dict], projection: Optional["Projection"] = None
+) -> Tuple[CachedOrganization, ...]:
+    """Записи кэша из строк geo_result_statement и ответов по ним."""
+    return tuple(
+        CachedOrganization(
+            row.id,
+            row.geo_longitude,
+            row.geo_latitude,
+            orjson.dumps(payload) if projection is None else encode_projection(payload),
+        )
+        for row, payload in zip(rows, payloads)
+    )
+
+
+def geo_result_response(
+    entry: CachedResult,
+    filters: OrganizationFilters,
+    page: Page,
+    request: Request,
+    response: Response,
+) -> Response:
+    """Страница ответа из записи кэша: организации точной области запроса."""
+    organizations = entry.organizations
+    start = 0
+    if page.after_id is not None:
+        start = bisect.bisect_right(organizations, page.after_id, key=attrgetter("id"))
+    matching = (
+        organization
+        for organization in islice(organizations, start, None)
+        if in_geo_filter(filters, organization.longitude, organization.latitude)
+    )
+    selected = page.finalize(list(islice(matching, page.limit + 1)), request, response)
+    body = b"[" + b",".join(organization.body for organization in selected) + b"]"
+    return Response(body, media_type="application/json", headers=dict(response.headers))
+
+
+# === FAST SERIALIZATION ===
+
+ORGANIZATION_LIST = TypeAdapter(List[schemas.Organization])
+
+
+def building_details_statement(building_ids: Iterable[int]):
+    return select(
+        models.Building.id,
+        models.Building.address,
+        models.Building.latitude,
+        models.Building.longitude,
+    ).where(models.Building.id.in_(building_ids))
+
+
+def phone_details_statement(organization_ids: List[int]):
+    return (
+        select(models.Phone.id, models.Phone.number, models.Phone.organization_id)
+        .where(models.Phone.organization_id.in_(organization_ids))
+        .order_by(models.Phone.id)
+    )
+
+
+def activity_links_statement(organization_ids: List[int]):
+    return (
+        select(
+            models.organization_activity.c.organization_id,
+            models.organization_activity.c.activity_id,
+        )
+        .where(models.organization_activity.c.organization_id.in_(organization_ids))
+        .order_by(models.organization_activity.c.activity_id)
+    )
+
+
+def organization_details_statements(rows) -> List:
+    """Запросы зданий, телефонов и видов деятельности для строк организаций."""
+    organization_ids = [row.id for row in rows]
+    return [
+        building_details_statement({row.building_id for row in rows}),
+        phone_details_statement(organization_ids),
+        activity_links_statement(organization_ids),
+    ]
+
+
+def activity_payload(tree: ActivityTree, activity_id: int, memo: Dict) -> dict:
+    if activity_id not in memo:
+        node = tree.nodes[activity_id]
+        memo[activity_id] = {
+            "name": node.name,
+            "parent_id": node.parent_id,
+            "level": node.level,
+            "id": node.id,
+            "children": [
+                activity_payload(tree, child_id, memo)
+                for child_id in tree.children.get(activity_id, ())
+            ],
+        }
+    return memo[activity_id]
+
+
+def building_payloads(buildings) -> Dict[int, dict]:
+    return {
+        building.id: {
+            "address": building.address,
+            "latitude": building.latitude,
+            "longitude": building.longitude,
+            "id": building.id,
+        }
+        for building in buildings
+    }
+
+
+def phone_payloads(phones) -> Dict[int, List[dict]]:
+    """Телефоны по id организации."""
+    phones_by_organization: Dict[int, List[dict]] = {}
+    for phone in phones:
+        phones_by_organization.setdefault(phone.organization_id, []).append(
+            {
+                "number": phone.number,
+                "id": phone.id,
+                "organization_id": phone.organization_id,
+            }
+        )
+    return phones_by_organization
+
+
+def activity_payloads(links, tree: ActivityTree) -> Dict[int, List[dict]]:
+    """Виды деятельности с дочерними категориями по id организации."""
+    memo: Dict[int, dict] = {}
+    activities_by_organization: Dict[int, List[dict]] = {}
+    for organization_id, activity_id in links:
+        activities_by_organization.setdefault(organization_id, []).append(
+            activity_payload(tree, activity_id, memo)
+        )
+    return activities_by_organization
+
+
+def organization_payloads(rows, buildings, phones, links, tree: ActivityTree):
+    """Собирает ответы schemas.Organization из строк запросов.
+
+    Словари повторяют порядок полей схем и кодируются без валидации, поэтому
+    полагаются на то, что данные в базе уже прошли её при записи.
+    """
+    buildings_by_id = building_payloads(buildings)
+    phones_by_organization = phone_payloads(phones)
+    activities_by_organization = activity_payloads(links, tree)
+    return [
+        {
+            "name": row.name,
+            "building_id": row.building_id,
+            "id": row.id,
+            "phones": phones_by_organization.get(row.id, []),
+            "activities": activities_by_organization.get(row.id, []),
+            "building": buildings_by_id[row.building_id],
+        }
+        for row in rows
+    ]
+
+
+def encode_organizations(organizations: List) -> bytes:
+    """JSON-тело списка организаций: словари быстрого пути или ORM-объекты."""
+    if settings.FAST_SERIALIZATION:
+        return orjson.dumps(organizations)
+    return ORGANIZATION_LIST.dump_json(
+        ORGANIZATION_LIST.validate_python(organizations, from_attributes=True)
+    )
+
+
+def organizations_response(organizations: List, response: Response):
+    """Ответ со списком организаций.
+
+    В быстром пути тело кодируется сразу, минуя повторную валидацию
+    response_model; ORM-объекты возвращаются FastAPI как есть.
+    """
+    if not settings.FAST_SERIALIZATION:
+        return organizations
+    return Response(
+        encode_organizations(organizations),
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
+
+
+# === PROJECTION ===
+
+# Поля и связанные записи организации, доступные в fields= и include=
+ORGANIZATION_FIELDS = ("id", "name", "building_id")
+ORGANIZATION_RELATIONS = ("phones", "building", "activities")
+
+ORGANIZATION_PARTIAL = TypeAdapter(schemas.OrganizationPartial)
+ORGANIZATION_PARTIAL_LIST = TypeAdapter(List[schemas.OrganizationPartial])
+
+
+class Projection(NamedTuple):
+    """Запрошенные поля (всегда с id) и связанные записи организации."""
+
+    fields: Tuple[str, ...]
+    include: Tuple[str, ...]
+
+
+def parse_names(
+    value: str, allowed: Tuple[str, ...], parameter: str
+) -> Tuple[str, ...]:
+    requested = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Неизвестные значения {parameter}: {', '.join(sorted(unknown))}. "
+            f"Допустимые: {', '.join(allowed)}",
+        )
+    return tuple(name for name in allowed if name in requested)
+
+
+def get_projection(
+    fields: Optional[str] = Query(
+        None,
+        description="Поля организации через запятую: "
+        f"{', '.join(ORGANIZATION_FIELDS)} (id выдаётся всегда). "
+        "По умолчанию, если задан include, - все",
+    ),
+    include: Optional[str] = Query(
+        None,
+        description="Связанные записи через запятую: "
+        f"{', '.join(ORGANIZATION_RELATIONS)}. По умолчанию, если задан fields, - "
+        "никакие",
+    ),
+) -> Optional[Projection]:
+    """Проекция ответа; None - полный ответ schemas.Organization."""
+    if fields is None and include is None:
+        return None
+    selected = ORGANIZATION_FIELDS
+    if fields is not None:
+        selected = parse_names(f"id,{fields}", ORGANIZATION_FIELDS, "fields")
+    return Projection(
+        selected, parse_names(include or "", ORGANIZATION_RELATIONS, "include")
+    )
+
+
+def organization_columns_statement(
+    projection: Projection,
+    filters: OrganizationFilters,
+    activity_ids: Optional[FrozenSet[int]] = None,
+):
+    """Как organization_rows_statement, но только столбцы проекции."""
+    columns = [getattr(models.Organization, name) for name in projection.fields]
+    if "building" in projection.include and "building_id" not in projection.fields:
+        columns.append(models.Organization.building_id)
+    return filter_organizations(select(*columns), filters, activity_ids)
+
+
+def projection_details_statements(projection: Projection, rows) -> Dict[str, object]:
+    """Запросы только тех связанных записей, которые запрошены в include."""
+    organization_ids = [row.id for row in rows]
+    statements = {}
+    if "phones" in projection.include:
+        statements["phones"] = phone_details_statement(organization_ids)
+    if "building" in projection.include:
+        building_ids = {row.building_id for row in rows}
+        statements["building"] = building_details_statement(building_ids)
+    if "activities" in projection.include:
+        statements["activities"] = activity_links_statement(organization_ids)
+    return statements
+
+
+def projected_payloads(
+    projection: Projection,
+    rows,
+    details: Dict[str, List],
+    tree: Optional[ActivityTree] = None,
+) -> List[dict]:
+    """Ответы schemas.OrganizationPartial только с запрошенными полями.
+
+    details - результаты projection_details_statements по тем же ключам,
+    tree - снимок дерева видов деятельности (нужен только для activities).
+    """
+    related = {}
+    if "phones" in details:
+        related["phones"] = (phone_payloads(details["phones"]), [])
+    if "building" in details:
+        related["building"] = (building_payloads(details["building"]), None)
+    if "activities" in details:
+        related["activities"] = (activity_payloads(details["activities"], tree), [])
+
+    payloads = []
+    for row in rows:
+        payload = {name: getattr(row, name) for name in projection.fields}
+        for name, (by_key, default) in related.items():
+            key = row.building_id if name == "building" else row.id
+            payload[name] = by_key.get(key, default)
+        payloads.append(payload)
+    return payloads
+
+
+def encode_projection(payload) -> bytes:
+    """JSON-тело проекции: словарь или список словарей projected_payloads.
+
+    Вне быстрого пути проверяется схемой schemas.OrganizationPartial, в ответ
+    попадают только заданные поля.
+    """
+    if settings.FAST_SERIALIZATION:
+        return orjson.dumps(payload)
+    adapter = ORGANIZATION_PARTIAL
+    if isinstance(payload, list):
+        adapter = ORGANIZATION_PARTIAL_LIST
+    return adapter.dump_json(adapter.validate_python(payload), exclude_unset=True)
+
+
+def projection_response(payload, response: Response) -> Response:
+    return Response(
+        encode_projection(payload),
+        media_type="application/json",
+        headers=dict(response.headers),
+    )
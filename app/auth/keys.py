@@ -0,0 +1,162 @@
+"""Ключи доступа к API: хранение в виде хэшей и кэш в памяти процесса.
+
+В таблице api_keys лежит только SHA-256 ключа. Предъявленный ключ хэшируется
+и ищется в снимке таблицы по хэшу: сравниваются хэши, а не сами ключи,
+поэтому время поиска не раскрывает совпадающий префикс ключа. Снимок
+обновляется по версии данных api_keys.
+"""
+
+import hashlib
+import secrets
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database.session import SessionLocal
+from app.database.versions import API_KEYS_VERSION, bump_data_version, get_data_version
+from app.models import models
+
+# Имя ключа из настроек (API_KEY) в снимке и в ограничении частоты
+SETTINGS_KEY_NAME = "settings"
+
+
+class ApiKeyRecord(NamedTuple):
+    name: str
+    key_hash: str
+    rate_limit: float
+    burst: int
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def settings_key() -> Optional[ApiKeyRecord]:
+    if not settings.API_KEY:
+        return None
+    rate_limit = settings.API_KEY_RATE_LIMIT
+    burst = settings.RATE_LIMIT_BURST if rate_limit else 0
+    return ApiKeyRecord(
+        SETTINGS_KEY_NAME, hash_api_key(settings.API_KEY), rate_limit, burst
+    )
+
+
+def load_api_keys(db: Session) -> Dict[str, ApiKeyRecord]:
+    """Активные ключи таблицы и ключ из настроек, по хэшу."""
+    rows = db.query(
+        models.ApiKey.name,
+        models.ApiKey.key_hash,
+        models.ApiKey.rate_limit,
+        models.ApiKey.burst,
+    ).filter(models.ApiKey.is_active.is_(True))
+    keys = {}
+    for name, key_hash, rate_limit, burst in rows:
+        if rate_limit is None:
+            rate_limit = settings.RATE_LIMIT
+        if burst is None:
+            burst = settings.RATE_LIMIT_BURST
+        keys[key_hash] = ApiKeyRecord(name, key_hash, rate_limit, burst)
+    default = settings_key()
+    if default is not None:
+        keys.setdefault(default.key_hash, default)
+    return keys
+
+
+class ApiKeyStore:
+    """Снимок таблицы api_keys в памяти процесса.
+
+    Проверка ключа не обращается к базе. Раз в API_KEYS_CHECK_INTERVAL
+    секунд refresh() сверяет версию данных api_keys одним запросом и при
+    изменении перечитывает таблицу. Обновляет один вызов: остальные запросы
+    в это время не ждут и используют прежний снимок, он же используется,
+    пока база недоступна.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._keys: Optional[Dict[str, ApiKeyRecord]] = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def needs_refresh(self) -> bool:
+        if self._keys is None:
+            return True
+        # Снимок уже обновляет другой запрос
+        if self._lock.locked():
+            return False
+        return self._expired()
+
+    def refresh(self) -> None:
+        """Обновляет снимок; блокирующий вызов, выполняется в пуле потоков.
+
+        Без снимка ключи проверить не по чему, поэтому первый снимок ждут
+        все запросы. Дальше обновляет один вызов, остальные сразу выходят.
+        """
+        if not self._lock.acquire(blocking=self._keys is None):
+            return
+        try:
+            if self._keys is not None and not self._expired():
+                return
+            try:
+                with SessionLocal() as db:
+                    version = get_data_version(db, API_KEYS_VERSION)
+                    if self._keys is None or version != self._version:
+                        self._keys = load_api_keys(db)
+                        self._version = version
+            except SQLAlchemyError:
+                if self._keys is None:
+                    raise
+            self._checked_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def lookup(self, api_key: str) -> Optional[ApiKeyRecord]:
+        return (self._keys or {}).get(hash_api_key(api_key))
+
+    def invalidate(self) -> None:
+        self._keys = None
+
+    def _expired(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.check_interval
+
+
+api_key_store = ApiKeyStore(settings.API_KEYS_CHECK_INTERVAL)
+
+
+def create_api_key(
+    db: Session,
+    name: str,
+    rate_limit: Optional[float] = None,
+    burst: Optional[int] = None,
+) -> str:
+    """Создаёт ключ и возвращает его; в базе остаётся только хэш."""
+    api_key = secrets.token_urlsafe(32)
+    db.add(
+        models.ApiKey(
+            name=name,
+            key_hash=hash_api_key(api_key),
+            rate_limit=rate_limit,
+            burst=burst,
+        )
+    )
+    bump_data_version(db, API_KEYS_VERSION)
+    db.commit()
+    return api_key
+
+
+def revoke_api_key(db: Session, name: str) -> bool:
+    """Отключает ключ; возвращает False, если ключа с таким именем нет."""
+    updated = (
+        db.query(models.ApiKey)
+        .filter(models.ApiKey.name == name)
+        .update({models.ApiKey.is_active: False})
+    )
+    if updated:
+        bump_data_version(db, API_KEYS_VERSION)
+    db.commit()
+    return bool(updated)
@@ -0,0 +1,54 @@
+"""Ограничение частоты запросов на ключ API (token bucket в памяти процесса).
+
+Корзина ключа вмещает burst токенов и пополняется со скоростью rate_limit
+токенов в секунду; каждый запрос забирает один токен. Лимит действует на
+процесс: при нескольких воркерах суммарный лимит ключа умножается на их число.
+"""
+
+import threading
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, rate_limit: float, burst: int) -> float:
+        """Забирает токен ключа.
+
+        Возвращает 0, если запрос разрешён, иначе - сколько секунд ждать
+        следующего токена. rate_limit <= 0 - без ограничения.
+        """
+        if rate_limit <= 0:
+            return 0.0
+        capacity = max(burst, 1)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(capacity, now)
+            else:
+                elapsed = now - bucket.updated
+                bucket.tokens = min(capacity, bucket.tokens + elapsed * rate_limit)
+                bucket.updated = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return 0.0
+            return (1 - bucket.tokens) / rate_limit
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+rate_limiter = RateLimiter()
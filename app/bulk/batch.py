@@ -0,0 +1,211 @@
+"""Пакетное создание зданий, видов деятельности и организаций.
+
+Функции выполняют вставку всей пачки несколькими запросами в текущей
+транзакции сессии: ссылки пачки (здания, родительские категории, виды
+деятельности) проверяются одним запросом, записи вставляются многострочными
+INSERT ... RETURNING. Записи с ошибками пропускаются и попадают в отчёт по
+индексу в пачке. Транзакцию фиксирует вызывающий эндпоинт.
+
+Эндпоинты вызывают функции через исполнитель запроса (app.database.executor).
+"""
+
+from typing import Dict, List, NamedTuple, Tuple
+
+from fastapi import HTTPException
+from geoalchemy2 import WKTElement
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.api.queries import child_activity_level
+from app.database.versions import (
+    ACTIVITIES_VERSION,
+    BUILDINGS_VERSION,
+    ORGANIZATIONS_VERSION,
+    bump_data_version,
+)
+from app.models import models
+from app.schemas import schemas
+
+BUILDING_NOT_FOUND = "Здание не найдено"
+PARENT_NOT_FOUND = "Родительская категория не найдена"
+ACTIVITIES_NOT_FOUND = "Один или несколько видов деятельности не найдены"
+
+# Предел числа параметров одного запроса в протоколе PostgreSQL (asyncpg
+# проверяет его до отправки)
+MAX_BIND_PARAMETERS = 32767
+
+
+class BatchResult(NamedTuple):
+    # Созданные записи в порядке пачки: схемы ответа, для организаций - id
+    # (граф ответа перечитывается после фиксации транзакции)
+    created: List
+    # Индекс записи в пачке -> ошибка
+    errors: Dict[int, str]
+    # Версии данных, полученные транзакцией пачки (пусто, если записей нет)
+    versions: Dict[str, int]
+
+
+def batch_errors(errors: Dict[int, str]) -> List[schemas.BatchItemError]:
+    return [
+        schemas.BatchItemError(index=index, error=error)
+        for index, error in sorted(errors.items())
+    ]
+
+
+def insert_returning_ids(db: Session, table, rows: List[dict]) -> List[int]:
+    """Многострочный INSERT ... RETURNING id; id в порядке rows."""
+    if not rows:
+        return []
+    statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    return list(db.scalars(statement, rows))
+
+
+def insert_rows(db: Session, table, rows: List[dict]) -> None:
+    """Многострочные INSERT, каждый не больше MAX_BIND_PARAMETERS параметров."""
+    if not rows:
+        return
+    chunk_size = MAX_BIND_PARAMETERS // len(rows[0])
+    for start in range(0, len(rows), chunk_size):
+        db.execute(insert(table).values(rows[start : start + chunk_size]))
+
+
+def create_buildings(db: Session, items: List[schemas.BuildingCreate]) -> BatchResult:
+    ids = insert_returning_ids(
+        db,
+        models.Building.__table__,
+        [
+            {
+                "address": item.address,
+                "location": WKTElement(
+                    f"POINT({item.longitude} {item.latitude})", srid=4326
+                ),
+            }
+            for item in items
+        ],
+    )
+    versions = bump_data_version(db, BUILDINGS_VERSION)
+    created = [
+        schemas.Building(id=building_id, **item.model_dump())
+        for building_id, item in zip(ids, items)
+    ]
+    return BatchResult(created, {}, versions)
+
+
+def create_activities(db: Session, items: List[schemas.ActivityCreate]) -> BatchResult:
+    """Создаёт виды деятельности; родители должны уже существовать в базе."""
+    parent_ids = {item.parent_id for item in items if item.parent_id}
+    parents = {}
+    if parent_ids:
+        rows = db.execute(
+            select(
+                models.Activity.id, models.Activity.level, models.Activity.path
+            ).where(models.Activity.id.in_(parent_ids))
+        )
+        parents = {row.id: row for row in rows}
+
+    errors: Dict[int, str] = {}
+    accepted = []
+    for index, item in enumerate(items):
+        parent = None
+        if item.parent_id:
+            parent = parents.get(item.parent_id)
+            if parent is None:
+                errors[index] = PARENT_NOT_FOUND
+                continue
+        try:
+            level, parent_path = child_activity_level(parent)
+        except HTTPException as error:
+            errors[index] = error.detail
+            continue
+        accepted.append((item, level, parent_path))
+    if not accepted:
+        return BatchResult([], errors, {})
+
+    # Путь включает собственный id записи, поэтому id выделяются заранее
+    ids = db.scalars(
+        select(
+            func.nextval(func.pg_get_serial_sequence("activities", "id"))
+        ).select_from(func.generate_series(1, len(accepted)))
+    ).all()
+    rows = [
+        {
+            "id": activity_id,
+            "name": item.name,
+            "parent_id": item.parent_id,
+            "level": level,
+            "path": models.Activity.build_path(activity_id, parent_path),
+        }
+        for activity_id, (item, level, parent_path) in zip(ids, accepted)
+    ]
+    insert_rows(db, models.Activity.__table__, rows)
+    versions = bump_data_version(db, ACTIVITIES_VERSION)
+    created = [
+        schemas.ActivityFlat(
+            id=row["id"],
+            name=row["name"],
+            parent_id=row["parent_id"],
+            level=row["level"],
+        )
+        for row in rows
+    ]
+    return BatchResult(created, errors, versions)
+
+
+def create_organizations(
+    db: Session, items: List[schemas.OrganizationCreate]
+) -> Tuple[BatchResult, List[Tuple[float, float]]]:
+    """Создаёт организации с телефонами и видами деятельности.
+
+    Возвращает результат и координаты зданий созданных организаций (для
+    инвалидации кэша геопоиска).
+    """
+    building_ids = {item.building_id for item in items}
+    buildings = {
+        row.id: (row.longitude, row.latitude)
+        for row in db.execute(
+            select(
+                models.Building.id, models.Building.longitude, models.Building.latitude
+            ).where(models.Building.id.in_(building_ids))
+        )
+    }
+    activity_ids = {activity_id for item in items for activity_id in item.activities}
+    existing_activities = set()
+    if activity_ids:
+        existing_activities = set(
+            db.scalars(
+                select(models.Activity.id).where(models.Activity.id.in_(activity_ids))
+            )
+        )
+
+    errors: Dict[int, str] = {}
+    accepted: List[schemas.OrganizationCreate] = []
+    for index, item in enumerate(items):
+        if item.building_id not in buildings:
+            errors[index] = BUILDING_NOT_FOUND
+        elif not existing_activities.issuperset(item.activities):
+            errors[index] = ACTIVITIES_NOT_FOUND
+        else:
+            accepted.append(item)
+    if not accepted:
+        return BatchResult([], errors, {}), []
+
+    ids = insert_returning_ids(
+        db,
+        models.Organization.__table__,
+        [{"name": item.name, "building_id": item.building_id} for item in accepted],
+    )
+    phones = [
+        {"number": number, "organization_id": organization_id}
+        for organization_id, item in zip(ids, accepted)
+        for number in item.phones
+    ]
+    insert_rows(db, models.Phone.__table__, phones)
+    links = [
+        {"organization_id": organization_id, "activity_id": activity_id}
+        for organization_id, item in zip(ids, accepted)
+        for activity_id in dict.fromkeys(item.activities)
+    ]
+    insert_rows(db, models.organization_activity, links)
+    versions = bump_data_version(db, ORGANIZATIONS_VERSION)
+    locations = list({buildings[item.building_id] for item in accepted})
+    return BatchResult(ids, errors, versions), locations
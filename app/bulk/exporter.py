@@ -0,0 +1,43 @@
+"""Потоковая выгрузка справочника в NDJSON.
+
+Организации читаются серверным курсором порциями по yield_per и
+сериализуются построчно, поэтому потребление памяти и время до первого байта
+не зависят от размера таблицы.
+"""
+
+from typing import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.api.queries import organization_load_options
+from app.models import models
+from app.schemas import schemas
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_line(organization: models.Organization) -> bytes:
+    line = schemas.Organization.model_validate(organization).model_dump_json()
+    return f"{line}\n".encode()
+
+
+def export_organizations(engine: Engine, chunk_size: int = 1000) -> Iterator[bytes]:
+    """Выдаёт организации с зданием, телефонами и видами деятельности.
+
+    Каждая порция из chunk_size организаций отдаётся одним блоком строк NDJSON.
+    Генератор открывает собственную сессию: он выполняется уже после выхода из
+    зависимостей запроса.
+    """
+    statement = (
+        select(models.Organization)
+        .options(*organization_load_options())
+        .order_by(models.Organization.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    with Session(engine) as db:
+        for partition in db.scalars(statement).partitions():
+            yield b"".join(ndjson_line(organization) for organization in partition)
+            # Порция больше не нужна: не держим её в identity map
+            db.expunge_all()
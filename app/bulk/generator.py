@@ -0,0 +1,291 @@
+"""Генерация синтетического справочника для нагрузочного тестирования.
+
+Строки создаются в Python генератором random.Random(seed) и передаются в
+основные таблицы командой COPY в текстовом формате потоком, без
+промежуточных файлов и без хранения всего набора в памяти. При одинаковых
+seed и размерах содержимое набора повторяется; идентификаторы отсчитываются
+от текущих максимальных id таблиц.
+
+- здания - кластеры вокруг центров городов (нормальное распределение);
+- виды деятельности - дерево из трёх уровней с материализованными путями;
+- организации - телефоны в допустимых форматах и 1-3 вида деятельности.
+"""
+
+import random
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.database.versions import (
+    ACTIVITIES_VERSION,
+    BUILDINGS_VERSION,
+    DATA_VERSION_BUMP,
+    ORGANIZATIONS_VERSION,
+)
+from app.models.models import MAX_ACTIVITY_LEVEL, Activity
+
+# Город: название, долгота и широта центра, разброс координат (градусы), вес
+CITIES = [
+    ("Москва", 37.6173, 55.7558, 0.12, 12),
+    ("Санкт-Петербург", 30.3351, 59.9343, 0.09, 5),
+    ("Новосибирск", 82.9204, 55.0302, 0.07, 2),
+    ("Екатеринбург", 60.6122, 56.8519, 0.06, 2),
+    ("Казань", 49.1221, 55.7887, 0.06, 1),
+    ("Нижний Новгород", 44.0059, 56.3269, 0.05, 1),
+]
+
+STREETS = [
+    "Ленина",
+    "Мира",
+    "Советская",
+    "Садовая",
+    "Лесная",
+    "Школьная",
+    "Центральная",
+    "Молодёжная",
+    "Набережная",
+    "Гагарина",
+    "Пушкина",
+    "Заводская",
+]
+STREET_KINDS = ["ул.", "пр-т", "пер.", "б-р"]
+
+LEGAL_FORMS = ["ООО", "ЗАО", "АО", "ИП"]
+NAME_PREFIXES = [
+    "Альфа",
+    "Гранд",
+    "Мега",
+    "Профи",
+    "Сити",
+    "Техно",
+    "Эко",
+    "Север",
+    "Вектор",
+    "Стандарт",
+]
+NAME_SUFFIXES = ["Трейд", "Сервис", "Групп", "Маркет", "Снаб", "Строй", "Плюс", "Лайн"]
+
+# Корневые виды деятельности и разделы второго уровня
+ACTIVITY_ROOTS = {
+    "Еда": ["Мясная продукция", "Молочная продукция", "Выпечка", "Напитки"],
+    "Автомобили": ["Грузовые", "Легковые", "Мототехника"],
+    "Строительство": ["Материалы", "Инструменты", "Отделка"],
+    "Одежда": ["Мужская", "Женская", "Детская", "Обувь"],
+    "Электроника": ["Компьютеры", "Телефоны", "Бытовая техника"],
+    "Медицина": ["Аптеки", "Клиники", "Оптика"],
+    "Услуги": ["Ремонт", "Доставка", "Уборка", "Юридические"],
+    "Образование": ["Курсы", "Репетиторы", "Детские центры"],
+}
+ACTIVITY_LEAVES = ["Опт", "Розница", "Производство", "Импорт"]
+
+# Шаблоны допустимых форматов телефона (schemas.PhoneBase)
+PHONE_FORMATS = [
+    "{}-{}{}{}-{}{}{}",
+    "{}{}{}-{}{}{}-{}{}{}",
+    "{}-{}{}{}-{}{}{}-{}{}-{}{}",
+]
+
+ORGANIZATIONS_PER_BUILDING = 4
+
+TABLES = ("activities", "buildings", "organizations", "phones", "organization_activity")
+
+
+class RowStream:
+    """Файлоподобный объект для copy_expert: строки COPY формируются по мере чтения."""
+
+    def __init__(self, rows: Iterable[Tuple]):
+        self.lines = ("\t".join(map(copy_value, row)) + "\n" for row in rows)
+        self.buffer = ""
+        self.rows = 0
+
+    def read(self, size: int = -1) -> str:
+        chunks = [self.buffer]
+        length = len(self.buffer)
+        for line in self.lines:
+            chunks.append(line)
+            length += len(line)
+            self.rows += 1
+            if 0 <= size <= length:
+                break
+        data = "".join(chunks)
+        if size < 0:
+            self.buffer = ""
+            return data
+        self.buffer = data[size:]
+        return data[:size]
+
+
+def copy_value(value) -> str:
+    # Сгенерированные строки не содержат табуляций, переводов строк и "\"
+    return "\\N" if value is None else str(value)
+
+
+def copy_table(cursor, table: str, columns: str, rows: Iterable[Tuple]) -> int:
+    stream = RowStream(rows)
+    cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", stream)
+    return stream.rows
+
+
+def activity_rows(rng: random.Random, first_id: int) -> Iterator[Tuple]:
+    """Дерево видов деятельности: корень, разделы, 1-3 листа в каждом разделе."""
+    next_id = first_id
+
+    def node(name: str, parent: Optional[Tuple], level: int) -> Tuple:
+        nonlocal next_id
+        assert level <= MAX_ACTIVITY_LEVEL
+        parent_id, parent_path = (parent[0], parent[4]) if parent else (None, "")
+        row = (
+            next_id,
+            name,
+            parent_id,
+            level,
+            Activity.build_path(next_id, parent_path),
+        )
+        next_id += 1
+        return row
+
+    for root_name, sections in ACTIVITY_ROOTS.items():
+        root = node(root_name, None, 1)
+        yield root
+        for section_name in sections:
+            section = node(section_name, root, 2)
+            yield section
+            for leaf_name in rng.sample(ACTIVITY_LEAVES, rng.randint(1, 3)):
+                yield node(f"{section_name}: {leaf_name.lower()}", section, 3)
+
+
+def building_rows(rng: random.Random, first_id: int, count: int) -> Iterator[Tuple]:
+    weights = [city[4] for city in CITIES]
+    for building_id in range(first_id, first_id + count):
+        city, longitude, latitude, spread, _ = rng.choices(CITIES, weights)[0]
+        address = (
+            f"г. {city}, {rng.choice(STREET_KINDS)} {rng.choice(STREETS)}, "
+            f"{rng.randint(1, 150)}"
+        )
+        point = (
+            f"SRID=4326;POINT({longitude + rng.gauss(0, spread * 1.8):.6f} "
+            f"{latitude + rng.gauss(0, spread):.6f})"
+        )
+        yield building_id, address, point
+
+
+def organization_rows(
+    rng: random.Random, first_id: int, count: int, building_ids: range
+) -> Iterator[Tuple]:
+    for organization_id in range(first_id, first_id + count):
+        name = (
+            f'{rng.choice(LEGAL_FORMS)} "{rng.choice(NAME_PREFIXES)}'
+            f'{rng.choice(NAME_SUFFIXES)} {organization_id}"'
+        )
+        yield organization_id, name, rng.choice(building_ids)
+
+
+def phone_number(rng: random.Random) -> str:
+    template = rng.choice(PHONE_FORMATS)
+    digits = rng.choices("0123456789", k=template.count("{}"))
+    return template.format(*digits)
+
+
+def phone_rows(rng: random.Random, organization_ids: range) -> Iterator[Tuple]:
+    for organization_id in organization_ids:
+        for _ in range(rng.randint(1, 3)):
+            yield phone_number(rng), organization_id
+
+
+def link_rows(
+    rng: random.Random, organization_ids: range, activity_ids: List[int]
+) -> Iterator[Tuple]:
+    for organization_id in organization_ids:
+        for activity_id in rng.sample(activity_ids, rng.randint(1, 3)):
+            yield organization_id, activity_id
+
+
+def next_ids(cursor) -> Dict[str, int]:
+    ids = {}
+    for table in ("activities", "buildings", "organizations"):
+        cursor.execute(f"SELECT coalesce(max(id), 0) + 1 FROM {table}")
+        ids[table] = cursor.fetchone()[0]
+    return ids
+
+
+def generate_directory(
+    connection,
+    organizations: int,
+    buildings: Optional[int] = None,
+    seed: int = 42,
+    on_table: Optional[Callable[[str, int, float], None]] = None,
+) -> Dict[str, int]:
+    """Генерирует справочник в одной транзакции соединения DB-API (psycopg2).
+
+    Добавляет новое дерево видов деятельности, buildings зданий (по умолчанию
+    organizations / 4) и organizations организаций с телефонами и связями.
+    on_table вызывается после загрузки каждой таблицы с именем, числом строк
+    и длительностью. Возвращает число добавленных строк по таблицам.
+    Транзакцию фиксирует вызывающий код.
+    """
+    if buildings is None:
+        buildings = max(organizations // ORGANIZATIONS_PER_BUILDING, 1)
+    # Отдельный генератор на таблицу: содержимое таблицы не зависит от размеров
+    # остальных
+    rngs = {table: random.Random(f"{seed}:{table}") for table in TABLES}
+    counts: Dict[str, int] = {}
+
+    def load(table: str, columns: str, rows: Iterable[Tuple]) -> None:
+        started = time.perf_counter()
+        counts[table] = copy_table(cursor, table, columns, rows)
+        if on_table:
+            on_table(table, counts[table], time.perf_counter() - started)
+
+    with connection.cursor() as cursor:
+        # Идентификаторы назначаются явно: блокировка защищает диапазоны id
+        # от параллельных вставок до обновления последовательностей
+        cursor.execute(
+            "LOCK TABLE activities, buildings, organizations "
+            "IN SHARE ROW EXCLUSIVE MODE"
+        )
+        first = next_ids(cursor)
+
+        activities = list(activity_rows(rngs["activities"], first["activities"]))
+        load("activities", "id, name, parent_id, level, path", activities)
+        load(
+            "buildings",
+            "id, address, location",
+            building_rows(rngs["buildings"], first["buildings"], buildings),
+        )
+        building_ids = range(first["buildings"], first["buildings"] + buildings)
+        load(
+            "organizations",
+            "id, name, building_id",
+            organization_rows(
+                rngs["organizations"],
+                first["organizations"],
+                organizations,
+                building_ids,
+            ),
+        )
+        organization_ids = range(
+            first["organizations"], first["organizations"] + organizations
+        )
+        load(
+            "phones",
+            "number, organization_id",
+            phone_rows(rngs["phones"], organization_ids),
+        )
+        load(
+            "organization_activity",
+            "organization_id, activity_id",
+            link_rows(
+                rngs["organization_activity"],
+                organization_ids,
+                [activity[0] for activity in activities],
+            ),
+        )
+
+        for table in ("activities", "buildings", "organizations"):
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"(SELECT max(id) FROM {table}))"
+            )
+        for name in (ACTIVITIES_VERSION, BUILDINGS_VERSION, ORGANIZATIONS_VERSION):
+            cursor.execute(DATA_VERSION_BUMP, (name,))
+        cursor.execute(f"ANALYZE {', '.join(TABLES)}")
+    return counts
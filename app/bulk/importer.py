@@ -0,0 +1,261 @@
+"""Потоковый импорт зданий и организаций через COPY.
+
+Записи читаются из NDJSON или CSV, проверяются схемами schemas.*Create и
+загружаются пачками: каждая пачка копируется во временные таблицы командой
+COPY и переносится в основные таблицы несколькими INSERT ... SELECT в одной
+транзакции. Ошибки проверки и ссылочной целостности собираются в отчёт по
+пачкам и не прерывают импорт.
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.engine import Engine
+
+from app.database.versions import (
+    BUILDINGS_VERSION,
+    DATA_VERSION_BUMP,
+    ORGANIZATIONS_VERSION,
+)
+from app.schemas import schemas
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+# Поля CSV со списками значений, разделёнными точкой с запятой
+CSV_LIST_FIELDS = ("phones", "activities")
+
+STAGING_TABLES = """
+CREATE TEMP TABLE IF NOT EXISTS import_buildings (
+    line integer, address text, longitude float8, latitude float8
+) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS import_organizations (
+    line integer, id integer, name text, building_id integer
+) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS import_phones (
+    line integer, number text
+) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS import_organization_activities (
+    line integer, activity_id integer
+) ON COMMIT DELETE ROWS;
+"""
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Tuple[int, object]]:
+    """Читает записи из потока; возвращает пары (номер строки, dict или ошибка)."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            for field in CSV_LIST_FIELDS:
+                if field in record:
+                    value = record[field] or ""
+                    record[field] = [item for item in value.split(";") if item]
+            yield reader.line_num, record
+        return
+
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as error:
+            yield line_no, f"Некорректный JSON: {error}"
+
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}"
+        for item in error.errors()
+    )
+
+
+def copy_rows(cursor, table: str, rows: Iterable[Tuple]) -> None:
+    """Загружает строки во временную таблицу одной командой COPY."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def load_buildings(cursor, items: List[Tuple[int, schemas.BuildingCreate]]) -> Dict:
+    copy_rows(
+        cursor,
+        "import_buildings",
+        (
+            (line, building.address, building.longitude, building.latitude)
+            for line, building in items
+        ),
+    )
+    cursor.execute(
+        """
+        INSERT INTO buildings (address, location)
+        SELECT address, ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography
+        FROM import_buildings
+        ORDER BY line
+        """
+    )
+    return {}
+
+
+def load_organizations(
+    cursor, items: List[Tuple[int, schemas.OrganizationCreate]]
+) -> Dict[int, str]:
+    copy_rows(
+        cursor,
+        "import_organizations",
+        ((line, None, item.name, item.building_id) for line, item in items),
+    )
+    copy_rows(
+        cursor,
+        "import_phones",
+        ((line, number) for line, item in items for number in item.phones),
+    )
+    copy_rows(
+        cursor,
+        "import_organization_activities",
+        (
+            (line, activity_id)
+            for line, item in items
+            for activity_id in set(item.activities)
+        ),
+    )
+
+    # Проверка ссылок выполняется одним запросом на всю пачку
+    errors: Dict[int, str] = {}
+    cursor.execute(
+        """
+        SELECT line FROM import_organizations o
+        WHERE NOT EXISTS (SELECT 1 FROM buildings b WHERE b.id = o.building_id)
+        """
+    )
+    for (line,) in cursor.fetchall():
+        errors[line] = "Здание не найдено"
+    cursor.execute(
+        """
+        SELECT DISTINCT line FROM import_organization_activities a
+        WHERE NOT EXISTS (SELECT 1 FROM activities WHERE activities.id = a.activity_id)
+        """
+    )
+    for (line,) in cursor.fetchall():
+        errors.setdefault(line, "Один или несколько видов деятельности не найдены")
+    if errors:
+        for table in (
+            "import_organizations",
+            "import_phones",
+            "import_organization_activities",
+        ):
+            cursor.execute(f"DELETE FROM {table} WHERE line = ANY(%s)", (list(errors),))
+
+    # Идентификаторы выделяются заранее, чтобы связать телефоны и виды
+    # деятельности с новыми организациями без построчных запросов
+    cursor.execute(
+        "UPDATE import_organizations "
+        "SET id = nextval(pg_get_serial_sequence('organizations', 'id'))"
+    )
+    cursor.execute(
+        """
+        INSERT INTO organizations (id, name, building_id)
+        SELECT id, name, building_id FROM import_organizations ORDER BY line
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO phones (number, organization_id)
+        SELECT p.number, o.id
+        FROM import_phones p JOIN import_organizations o USING (line)
+        """
+    )
+    cursor.execute(
+        """
+        INSERT INTO organization_activity (organization_id, activity_id)
+        SELECT o.id, a.activity_id
+        FROM import_organization_activities a JOIN import_organizations o USING (line)
+        """
+    )
+    return errors
+
+
+IMPORTERS = {
+    "buildings": (schemas.BuildingCreate, load_buildings, BUILDINGS_VERSION),
+    "organizations": (
+        schemas.OrganizationCreate,
+        load_organizations,
+        ORGANIZATIONS_VERSION,
+    ),
+}
+
+
+def import_batch(
+    engine: Engine, kind: str, batch: int, records: List[Tuple[int, object]]
+) -> schemas.ImportBatchReport:
+    """Проверяет и загружает одну пачку записей в отдельной транзакции."""
+    schema, load, version = IMPORTERS[kind]
+    errors: Dict[int, str] = {}
+    items: List[Tuple[int, BaseModel]] = []
+    for line, record in records:
+        if isinstance(record, str):
+            errors[line] = record
+            continue
+        try:
+            items.append((line, schema.model_validate(record)))
+        except ValidationError as error:
+            errors[line] = validation_message(error)
+
+    if items:
+        connection = engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(STAGING_TABLES)
+                load_errors = load(cursor, items)
+                if len(load_errors) < len(items):
+                    cursor.execute(DATA_VERSION_BUMP, (version,))
+                errors.update(load_errors)
+            connection.commit()
+        except Exception as error:
+            connection.rollback()
+            message = f"Ошибка загрузки пачки: {error}"
+            errors.update({line: message for line, _ in items})
+        finally:
+            connection.close()
+
+    return schemas.ImportBatchReport(
+        batch=batch,
+        rows=len(records),
+        imported=len(records) - len(errors),
+        errors=[
+            schemas.ImportRowError(line=line, error=error)
+            for line, error in sorted(errors.items())
+        ],
+    )
+
+
+def import_stream(
+    engine: Engine,
+    kind: str,
+    stream: TextIO,
+    fmt: str = "ndjson",
+    batch_size: int = 5000,
+    on_batch: Optional[Callable[[schemas.ImportBatchReport], None]] = None,
+) -> schemas.ImportReport:
+    """Импортирует записи kind ("buildings" или "organizations") из потока.
+
+    Поток читается построчно, в памяти держится только текущая пачка.
+    on_batch вызывается с отчётом после каждой пачки.
+    """
+    records = read_records(stream, fmt)
+    report = schemas.ImportReport(kind=kind, rows=0, imported=0, batches=[])
+    batch = 0
+    while chunk := list(islice(records, batch_size)):
+        batch += 1
+        batch_report = import_batch(engine, kind, batch, chunk)
+        report.rows += batch_report.rows
+        report.imported += batch_report.imported
+        report.batches.append(batch_report)
+        if on_batch:
+            on_batch(batch_report)
+    return report
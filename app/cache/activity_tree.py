@@ -0,0 +1,119 @@
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database.versions import ACTIVITIES_VERSION, get_data_version
+from app.models import models
+
+
+class ActivityNode(NamedTuple):
+    id: int
+    name: str
+    parent_id: Optional[int]
+    level: int
+
+
+class ActivityTree:
+    """Неизменяемый снимок таблицы activities.
+
+    Снимок строится целиком и после этого не меняется, поэтому читатели
+    используют его без блокировок.
+    """
+
+    def __init__(self, version: int, nodes: Iterable[ActivityNode]):
+        self.version = version
+        self.nodes: Dict[int, ActivityNode] = {node.id: node for node in nodes}
+
+        children: Dict[Optional[int], List[int]] = {}
+        for node in sorted(self.nodes.values()):
+            children.setdefault(node.parent_id, []).append(node.id)
+        self.children: Dict[Optional[int], Tuple[int, ...]] = {
+            parent_id: tuple(ids) for parent_id, ids in children.items()
+        }
+        self.roots: Tuple[int, ...] = self.children.get(None, ())
+
+        self.descendants: Dict[int, FrozenSet[int]] = {}
+        for root_id in self.roots:
+            self._collect_descendants(root_id)
+
+    def _collect_descendants(self, activity_id: int) -> FrozenSet[int]:
+        subtree = {activity_id}
+        for child_id in self.children.get(activity_id, ()):
+            subtree |= self._collect_descendants(child_id)
+        self.descendants[activity_id] = frozenset(subtree)
+        return self.descendants[activity_id]
+
+    def subtree_ids(self, activity_id: int) -> FrozenSet[int]:
+        """ID вида деятельности и всех его потомков (пусто, если его нет)."""
+        return self.descendants.get(activity_id, frozenset())
+
+
+def load_activity_tree(db: Session, version: int) -> ActivityTree:
+    """Строит снимок дерева одним запросом."""
+    rows = db.query(
+        models.Activity.id,
+        models.Activity.name,
+        models.Activity.parent_id,
+        models.Activity.level,
+    ).all()
+    return ActivityTree(version, (ActivityNode(*row) for row in rows))
+
+
+class ActivityTreeCache:
+    """Кэш снимка дерева видов деятельности в памяти процесса.
+
+    Актуальность проверяется по счётчику data_versions не чаще, чем раз в
+    ACTIVITY_TREE_CHECK_INTERVAL секунд, поэтому другие воркеры замечают
+    изменения одним дешёвым запросом. Изменения в текущем процессе
+    сбрасывают снимок сразу через invalidate(). Эндпоинты с ETag передают
+    уже прочитанную версию, и снимок старше неё перестраивается сразу.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._snapshot: Optional[ActivityTree] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, version: Optional[int] = None) -> ActivityTree:
+        """Снимок дерева.
+
+        version - уже прочитанная версия ACTIVITIES_VERSION (например, из
+        request.state.data_versions, по которой построен ETag ответа): снимок
+        старше неё перестраивается сразу, не дожидаясь проверки по интервалу.
+        """
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if version is not None:
+            if snapshot is not None and snapshot.version >= version:
+                return snapshot
+        elif snapshot is not None and now - self._checked_at < self.check_interval:
+            return snapshot
+        else:
+            version = get_data_version(db, ACTIVITIES_VERSION)
+            if snapshot is not None and snapshot.version >= version:
+                self._checked_at = now
+                return snapshot
+
+        # Перестраивает снимок один поток. Остальные не ждут его (в асинхронном
+        # режиме ожидание блокировки остановило бы цикл событий), а строят свой
+        if not self._lock.acquire(blocking=False):
+            return load_activity_tree(db, version)
+        try:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version < version:
+                snapshot = load_activity_tree(db, version)
+                self._snapshot = snapshot
+            self._checked_at = now
+        finally:
+            self._lock.release()
+        return snapshot
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+
+activity_tree_cache = ActivityTreeCache(settings.ACTIVITY_TREE_CHECK_INTERVAL)
@@ -0,0 +1,210 @@
+"""Кэш результатов географического поиска организаций.
+
+Координаты запроса привязываются к сетке (app.api.queries.quantize_geo_filters),
+поэтому запросы соседних областей, например с координатами, отличающимися в
+пятом знаке, попадают в одну запись. Запись хранит все организации
+квантованной области - закодированные ответы с координатами зданий, по id;
+из неё каждый запрос отбирает точную область и свою страницу. Записи
+вытесняются по LRU и TTL.
+
+Записи действительны для одного набора версий данных (app.cache.versions).
+Каждая запись помнит охватываемую область, а индекс по крупным ячейкам
+позволяет при создании здания или организации в текущем процессе удалить
+только записи, область которых содержит новую точку. Изменение в другом
+процессе очищает кэш при первом чтении с новыми версиями.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterator, NamedTuple, Optional, Set, Tuple
+
+from app.cache.versions import CacheVersions
+from app.core.config import settings
+
+# Область в градусах: (min_lon, min_lat, max_lon, max_lat)
+Region = Tuple[float, float, float, float]
+Cell = Tuple[int, int]
+
+# Размер ячейки индекса инвалидации в градусах. Записи, покрывающие больше
+# MAX_INDEX_CELLS ячеек, проверяются при любой инвалидации
+INDEX_CELL_DEGREES = 0.1
+MAX_INDEX_CELLS = 64
+
+
+class CachedOrganization(NamedTuple):
+    id: int
+    longitude: float
+    latitude: float
+    body: bytes  # JSON ответа для организации
+
+
+class CachedResult(NamedTuple):
+    # По возрастанию id; None - в области больше GEO_CACHE_MAX_ROWS организаций,
+    # запрос выполняется без кэша
+    organizations: Optional[Tuple[CachedOrganization, ...]]
+    region: Region
+    expires_at: float
+
+
+def region_contains(region: Region, longitude: float, latitude: float) -> bool:
+    min_lon, min_lat, max_lon, max_lat = region
+    return min_lon <= longitude <= max_lon and min_lat <= latitude <= max_lat
+
+
+def region_cells(region: Region) -> Optional[Iterator[Cell]]:
+    """Ячейки индекса, пересекающие область, или None, если их слишком много."""
+    min_lon, min_lat, max_lon, max_lat = region
+    x_range = range(
+        math.floor(min_lon / INDEX_CELL_DEGREES),
+        math.floor(max_lon / INDEX_CELL_DEGREES) + 1,
+    )
+    y_range = range(
+        math.floor(min_lat / INDEX_CELL_DEGREES),
+        math.floor(max_lat / INDEX_CELL_DEGREES) + 1,
+    )
+    if len(x_range) * len(y_range) > MAX_INDEX_CELLS:
+        return None
+    return ((x, y) for x in x_range for y in y_range)
+
+
+def point_cell(longitude: float, latitude: float) -> Cell:
+    return (
+        math.floor(longitude / INDEX_CELL_DEGREES),
+        math.floor(latitude / INDEX_CELL_DEGREES),
+    )
+
+
+class GeoResultCache:
+    """Потокобезопасный LRU-кэш результатов с TTL и инвалидацией по точке."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CachedResult]" = OrderedDict()
+        self._cells: Dict[Cell, Set[Hashable]] = {}
+        self._wide: Set[Hashable] = set()
+        self._versions = CacheVersions()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl > 0
+
+    def get(self, key: Hashable, versions: Dict[str, int]) -> Optional[CachedResult]:
+        """Запись для ответа по версиям данных versions (тем же, что в ETag)."""
+        with self._lock:
+            entry = None
+            if self._sync(versions):
+                entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(
+        self,
+        key: Hashable,
+        versions: Dict[str, int],
+        region: Region,
+        organizations: Optional[Tuple[CachedOrganization, ...]],
+    ) -> CachedResult:
+        """Сохраняет результат, прочитанный по версиям versions.
+
+        Пока есть изменения текущего процесса новее этих версий, результат
+        не сохраняется: он мог быть прочитан до изменения, а его область уже
+        инвалидирована.
+        """
+        entry = CachedResult(organizations, region, time.monotonic() + self.ttl)
+        with self._lock:
+            if versions != self._versions.current or self._versions.pending:
+                return entry
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            cells = region_cells(region)
+            if cells is None:
+                self._wide.add(key)
+            else:
+                for cell in cells:
+                    self._cells.setdefault(cell, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return entry
+
+    def invalidate_point(
+        self, longitude: float, latitude: float, versions: Dict[str, int]
+    ) -> None:
+        """Удаляет записи, область которых содержит точку.
+
+        versions - версии данных, которые получило изменение
+        (bump_data_version).
+        """
+        with self._lock:
+            candidates = self._cells.get(point_cell(longitude, latitude), set())
+            for key in list(candidates | self._wide):
+                if region_contains(self._entries[key].region, longitude, latitude):
+                    self._remove(key)
+                    self.invalidations += 1
+            self._versions.register(versions)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _sync(self, versions: Dict[str, int]) -> bool:
+        """Переходит к версиям versions; False - версии старше текущих."""
+        if self._versions.is_older(versions):
+            return False
+        if not self._versions.advance(versions):
+            self._clear()
+        return True
+
+    def _clear(self) -> None:
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+        self._cells.clear()
+        self._wide.clear()
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        cells = region_cells(entry.region)
+        if cells is None:
+            self._wide.discard(key)
+            return
+        for cell in cells:
+            keys = self._cells.get(cell)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._cells[cell]
+
+
+geo_result_cache = GeoResultCache(
+    max_entries=settings.GEO_CACHE_MAX_ENTRIES, ttl=settings.GEO_CACHE_TTL
+)
@@ -0,0 +1,157 @@
+"""Кэш векторных тайлов (MVT) в памяти процесса.
+
+Тайл хранится по ключу (z, x, y); все записи действительны для одного
+набора версий данных (app.cache.versions). Изменение текущего процесса
+точечное: после фиксации транзакции invalidate_points удаляет тайлы,
+содержащие новые точки; изменение другим процессом очищает кэш.
+
+Размер кэша ограничен суммарным размером тайлов, вытеснение по LRU.
+"""
+
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.cache.versions import CacheVersions
+from app.core.config import settings
+
+Tile = Tuple[int, int, int]
+
+# Предел широты проекции Web Mercator (EPSG:3857)
+MAX_LATITUDE = 85.0511287798066
+# Допуск вокруг точки: точка на границе тайлов попадает в оба
+POINT_MARGIN = 1e-9
+
+
+def tile_index(zoom: int, position: float) -> int:
+    return min(max(math.floor(position), 0), 2**zoom - 1)
+
+
+def tile_range(zoom: int, low: float, high: float) -> range:
+    return range(tile_index(zoom, low), tile_index(zoom, high) + 1)
+
+
+def point_tiles(zoom: int, longitude: float, latitude: float) -> Iterable[Tile]:
+    """Тайлы уровня zoom, содержащие точку (с допуском POINT_MARGIN)."""
+    scale = 2**zoom
+    x_low = (longitude - POINT_MARGIN + 180.0) / 360.0 * scale
+    x_high = (longitude + POINT_MARGIN + 180.0) / 360.0 * scale
+    y_bounds = []
+    for edge in (latitude + POINT_MARGIN, latitude - POINT_MARGIN):
+        phi = math.radians(max(min(edge, MAX_LATITUDE), -MAX_LATITUDE))
+        mercator = math.log(math.tan(math.pi / 4 + phi / 2))
+        y_bounds.append((1 - mercator / math.pi) / 2 * scale)
+    return (
+        (zoom, x, y)
+        for x in tile_range(zoom, x_low, x_high)
+        for y in tile_range(zoom, *y_bounds)
+    )
+
+
+class TileCache:
+    """Потокобезопасный LRU-кэш тайлов с ограничением по размеру в байтах."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._tiles: "OrderedDict[Tile, bytes]" = OrderedDict()
+        self._zooms: Dict[int, int] = {}
+        self._size = 0
+        self._versions = CacheVersions()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, tile: Tile, versions: Dict[str, int]) -> Optional[bytes]:
+        with self._lock:
+            body = None
+            if self._sync(versions):
+                body = self._tiles.get(tile)
+            if body is None:
+                self.misses += 1
+                return None
+            self._tiles.move_to_end(tile)
+            self.hits += 1
+            return body
+
+    def put(self, tile: Tile, versions: Dict[str, int], body: bytes) -> None:
+        """Сохраняет тайл, построенный по версиям versions.
+
+        Пока есть изменения текущего процесса новее этих версий, тайл не
+        сохраняется: он мог быть построен до изменения, а его точки уже
+        инвалидированы.
+        """
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if versions != self._versions.current or self._versions.pending:
+                return
+            if tile in self._tiles:
+                self._remove(tile)
+            self._tiles[tile] = body
+            self._zooms[tile[0]] = self._zooms.get(tile[0], 0) + 1
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._tiles)))
+                self.evictions += 1
+
+    def invalidate_points(
+        self, points: Iterable[Tuple[float, float]], versions: Dict[str, int]
+    ) -> None:
+        """Удаляет тайлы, содержащие точки одной зафиксированной транзакции.
+
+        versions - версии данных, которые получила эта транзакция.
+        """
+        with self._lock:
+            for longitude, latitude in points:
+                for zoom in list(self._zooms):
+                    for tile in point_tiles(zoom, longitude, latitude):
+                        if tile in self._tiles:
+                            self._remove(tile)
+                            self.invalidations += 1
+            self._versions.register(versions)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tiles": len(self._tiles),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _sync(self, versions: Dict[str, int]) -> bool:
+        """Переходит к версиям versions; False - версии старше текущих."""
+        if self._versions.is_older(versions):
+            return False
+        if not self._versions.advance(versions):
+            self._clear()
+        return True
+
+    def _clear(self) -> None:
+        self.invalidations += len(self._tiles)
+        self._tiles.clear()
+        self._zooms.clear()
+        self._size = 0
+
+    def _remove(self, tile: Tile) -> None:
+        self._size -= len(self._tiles.pop(tile))
+        zoom = tile[0]
+        self._zooms[zoom] -= 1
+        if not self._zooms[zoom]:
+            del self._zooms[zoom]
+
+
+tile_cache = TileCache(max_bytes=settings.TILE_CACHE_MAX_BYTES)
@@ -0,0 +1,65 @@
+"""Версии данных, для которых действительны записи кэша процесса.
+
+Кэш хранит записи, построенные по одному набору версий данных
+(app.database.versions). Изменения текущего процесса кэш учитывает точечно:
+после фиксации транзакции удаляет затронутые записи и регистрирует версии,
+которые получила транзакция (bump_data_version). При переходе к новым
+версиям записи сохраняются, только если все промежуточные версии - такие
+изменения; иначе (изменение другим процессом) кэш очищается целиком.
+"""
+
+from typing import Dict, Optional, Set
+
+
+class CacheVersions:
+    """Текущие версии кэша и ещё не увиденные версии изменений процесса.
+
+    Не потокобезопасен: вызывается под блокировкой кэша.
+    """
+
+    def __init__(self):
+        self.current: Optional[Dict[str, int]] = None
+        # Версии изменений текущего процесса, уже учтённых в кэше, но ещё не
+        # увиденных в версиях данных
+        self._local: Dict[str, Set[int]] = {}
+
+    @property
+    def pending(self) -> bool:
+        """Есть изменения процесса новее текущих версий."""
+        return any(self._local.values())
+
+    def is_older(self, versions: Dict[str, int]) -> bool:
+        """versions старше текущих: ответ построен по устаревшим данным."""
+        if self.current is None:
+            return False
+        return any(versions[name] < self.current[name] for name in versions)
+
+    def advance(self, versions: Dict[str, int]) -> bool:
+        """Переходит к versions (не старше текущих).
+
+        False - между текущими версиями и versions есть чужие изменения,
+        записи кэша нужно удалить.
+        """
+        if versions == self.current:
+            return True
+        valid = self.current is None or all(
+            version in self._local.get(name, ())
+            for name in versions
+            for version in range(self.current[name] + 1, versions[name] + 1)
+        )
+        self.current = dict(versions)
+        self._local = {
+            name: {version for version in pending if version > versions[name]}
+            for name, pending in self._local.items()
+        }
+        return valid
+
+    def register(self, versions: Dict[str, int]) -> None:
+        """Запоминает версии изменения процесса, уже учтённого в кэше."""
+        if self.current is None:
+            return
+        for name, version in versions.items():
+            # Версию, уже пройденную кэшем, учитывать поздно: при переходе
+            # через неё кэш был очищен
+            if name in self.current and version > self.current[name]:
+                self._local.setdefault(name, set()).add(version)
@@ -0,0 +1,130 @@
+"""Команды обслуживания справочника.
+
+Примеры:
+    python -m app.cli import buildings buildings.ndjson
+    python -m app.cli import organizations organizations.csv --format csv
+    python -m app.cli generate --organizations 1000000 --seed 42
+    python -m app.cli api-key create partner --rate-limit 20 --burst 40
+    python -m app.cli api-key revoke partner
+"""
+
+import argparse
+import sys
+
+from app.auth.keys import create_api_key, revoke_api_key
+from app.bulk.generator import generate_directory
+from app.bulk.importer import IMPORT_FORMATS, IMPORTERS, import_stream
+from app.core.config import settings
+from app.database.session import SessionLocal, engine
+from app.schemas import schemas
+
+
+def print_batch(report: schemas.ImportBatchReport) -> None:
+    print(
+        f"Пачка {report.batch}: строк {report.rows}, "
+        f"загружено {report.imported}, ошибок {len(report.errors)}",
+        file=sys.stderr,
+    )
+    for error in report.errors:
+        print(f"  строка {error.line}: {error.error}", file=sys.stderr)
+
+
+def run_import(args: argparse.Namespace) -> int:
+    with open(args.path, encoding="utf-8", newline="") as stream:
+        report = import_stream(
+            engine, args.kind, stream, args.format, args.batch_size, print_batch
+        )
+    print(f"Итого: строк {report.rows}, загружено {report.imported}")
+    return 0 if report.rows == report.imported else 1
+
+
+def print_table(table: str, rows: int, seconds: float) -> None:
+    rate = rows / seconds if seconds else 0
+    print(
+        f"{table}: строк {rows} за {seconds:.1f} с ({rate:,.0f} строк/с)",
+        file=sys.stderr,
+    )
+
+
+def run_generate(args: argparse.Namespace) -> int:
+    connection = engine.raw_connection()
+    try:
+        counts = generate_directory(
+            connection, args.organizations, args.buildings, args.seed, print_table
+        )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    print("Итого: " + ", ".join(f"{table} {rows}" for table, rows in counts.items()))
+    return 0
+
+
+def run_api_key_create(args: argparse.Namespace) -> int:
+    with SessionLocal() as db:
+        api_key = create_api_key(db, args.name, args.rate_limit, args.burst)
+    # Ключ выводится один раз: в базе хранится только его хэш
+    print(api_key)
+    return 0
+
+
+def run_api_key_revoke(args: argparse.Namespace) -> int:
+    with SessionLocal() as db:
+        if revoke_api_key(db, args.name):
+            return 0
+    print(f"Ключ {args.name} не найден", file=sys.stderr)
+    return 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser(
+        "import", help="Массовый импорт зданий или организаций через COPY"
+    )
+    import_parser.add_argument("kind", choices=sorted(IMPORTERS))
+    import_parser.add_argument("path", help="Путь к файлу NDJSON или CSV")
+    import_parser.add_argument("--format", choices=IMPORT_FORMATS, default="ndjson")
+    import_parser.add_argument(
+        "--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE
+    )
+    import_parser.set_defaults(handler=run_import)
+
+    generate_parser = commands.add_parser(
+        "generate", help="Синтетический справочник для нагрузочного тестирования"
+    )
+    generate_parser.add_argument("--organizations", type=int, default=100000)
+    generate_parser.add_argument(
+        "--buildings", type=int, help="По умолчанию - организаций / 4"
+    )
+    generate_parser.add_argument("--seed", type=int, default=42)
+    generate_parser.set_defaults(handler=run_generate)
+
+    api_key_parser = commands.add_parser("api-key", help="Ключи доступа к API")
+    api_key_commands = api_key_parser.add_subparsers(dest="action", required=True)
+    create_parser = api_key_commands.add_parser(
+        "create", help="Создать ключ и вывести его"
+    )
+    create_parser.add_argument("name")
+    create_parser.add_argument(
+        "--rate-limit",
+        type=float,
+        help="Запросов в секунду (по умолчанию RATE_LIMIT, 0 - без ограничения)",
+    )
+    create_parser.add_argument(
+        "--burst", type=int, help="Допустимый всплеск (по умолчанию RATE_LIMIT_BURST)"
+    )
+    create_parser.set_defaults(handler=run_api_key_create)
+    revoke_parser = api_key_commands.add_parser("revoke", help="Отключить ключ")
+    revoke_parser.add_argument("name")
+    revoke_parser.set_defaults(handler=run_api_key_revoke)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import ConfigDict
 from pydantic_settings import BaseSettings
 
@@ -15,10 +17,91 @@ class Settings(BaseSettings):
         f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@"
         f"{POSTGRES_SERVER}/{POSTGRES_DB}"
     )
+    SQLALCHEMY_ASYNC_DATABASE_URL: str = (
+        f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@"
+        f"{POSTGRES_SERVER}/{POSTGRES_DB}"
+    )
+    # Режим работы с БД: "sync" - запросы эндпоинтов в пуле потоков на
+    # psycopg2, "async" - через AsyncSession на asyncpg
+    DATABASE_MODE: Literal["sync", "async"] = "sync"
+
+    # Пул соединений (отдельно для синхронного и асинхронного движков)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0  # ожидание свободного соединения, секунды
+    DB_POOL_RECYCLE: int = 1800  # пересоздание соединений, секунды (-1 - никогда)
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 0 - без ограничения
 
     # Настройки API ключа
     API_KEY: str = "your-super-secret-api-key"
     API_KEY_NAME: str = "api_key"
+    # Ключи партнёров хранятся в таблице api_keys (python -m app.cli api-key).
+    # Кэш ключей сверяет версию данных не чаще, чем раз в интервал (секунды)
+    API_KEYS_CHECK_INTERVAL: float = 5.0
+    # Ограничение частоты запросов на ключ (token bucket): запросов в секунду
+    # и допустимый всплеск. Для ключей без своих значений; 0 - без ограничения.
+    # API_KEY из настроек ограничивается API_KEY_RATE_LIMIT
+    RATE_LIMIT: float = 50.0
+    RATE_LIMIT_BURST: int = 100
+    API_KEY_RATE_LIMIT: float = 0.0
+
+    # Настройки постраничной выдачи
+    DEFAULT_PAGE_SIZE: int = 100
+    MAX_PAGE_SIZE: int = 1000
+
+    # Максимум ID в одном запросе POST /organizations/batch-get и ?ids= и
+    # записей в одном запросе пакетного создания (POST .../batch)
+    MAX_BATCH_SIZE: int = 1000
+
+    # Минимальная схожесть (0..1) для нечёткого поиска по названию
+    FUZZY_SEARCH_THRESHOLD: float = 0.3
+
+    # Размер пачки записей при массовом импорте (одна транзакция на пачку)
+    IMPORT_BATCH_SIZE: int = 5000
+
+    # Количество организаций, читаемых из серверного курсора за раз при выгрузке
+    EXPORT_CHUNK_SIZE: int = 1000
+
+    # Быстрый путь сериализации списка организаций: ответ собирается из строк
+    # запросов и кодируется orjson без повторной валидации по response_model
+    FAST_SERIALIZATION: bool = False
+
+    # Кэш результатов географического поиска организаций. Координаты
+    # квантуются к сетке GEO_CACHE_GRID (градусы), радиус - к шагу
+    # GEO_CACHE_RADIUS_STEP (метры). Запись хранит все организации
+    # квантованной области; области, где их больше GEO_CACHE_MAX_ROWS, не
+    # кэшируются. GEO_CACHE_MAX_ENTRIES=0 отключает кэш
+    GEO_CACHE_MAX_ENTRIES: int = 1024
+    GEO_CACHE_TTL: float = 30.0
+    GEO_CACHE_GRID: float = 0.001
+    GEO_CACHE_RADIUS_STEP: float = 50.0
+    GEO_CACHE_MAX_ROWS: int = 500
+
+    # Кластеры организаций для карты (GET /organizations/clusters): максимальный
+    # zoom, число ячеек сетки на ширину тайла 256 px и максимум ячеек в области
+    # (при большем ячейки укрупняются). Ячейки, где организаций не больше
+    # CLUSTER_POINTS_THRESHOLD, выдаются отдельными точками
+    CLUSTER_MAX_ZOOM: int = 22
+    CLUSTER_CELLS_PER_TILE: int = 8
+    CLUSTER_MAX_CELLS: int = 1024
+    CLUSTER_POINTS_THRESHOLD: int = 3
+    CLUSTER_TOP_ACTIVITIES: int = 3
+
+    # Векторные тайлы (GET /tiles/{z}/{x}/{y}.mvt): максимальный zoom, предел
+    # объектов в слое тайла и размер кэша тайлов в байтах (0 - без кэша)
+    TILE_MAX_ZOOM: int = 22
+    TILE_MAX_FEATURES: int = 50000
+    TILE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Как часто (в секундах) проверяется актуальность счётчиков фасетов
+    # (GET /organizations/facets). Обновление идёт в фоне: счётчики отстают
+    # на этот интервал и время обновления
+    FACETS_REFRESH_INTERVAL: float = 5.0
+
+    # Как часто (в секундах) кэш дерева видов деятельности сверяет свою версию
+    # с базой данных. Изменения в текущем процессе применяются сразу.
+    ACTIVITY_TREE_CHECK_INTERVAL: float = 1.0
 
     model_config = ConfigDict(case_sensitive=True)
 
@@ -0,0 +1,51 @@
+"""Выполнение кода эндпоинтов с сессией в режиме DATABASE_MODE.
+
+Эндпоинты реализованы один раз: асинхронная функция маршрута передаёт
+синхронную функцию с Session исполнителю запроса. Исполнитель выполняет её
+- в пуле потоков на сессии psycopg2 (sync), с замером ожидания свободного
+  потока (app.metrics.threadpool);
+- через AsyncSession.run_sync на asyncpg (async): запросы синхронного кода
+  не блокируют цикл событий, пока ждут базу.
+
+Результат функции сериализуется после выхода из исполнителя, поэтому она
+возвращает объекты с уже загруженными атрибутами, ленивые загрузки в режиме
+async недоступны.
+"""
+
+from typing import Callable, TypeVar, Union
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.metrics.threadpool import run_in_threadpool
+
+T = TypeVar("T")
+
+
+class SyncExecutor:
+    """Сессия psycopg2: функции выполняются в пуле потоков."""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        return await run_in_threadpool(func, self.session, *args, **kwargs)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.session.close)
+
+
+class AsyncExecutor:
+    """Сессия asyncpg: функции выполняются через AsyncSession.run_sync."""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        return await self.session.run_sync(func, *args, **kwargs)
+
+    async def close(self) -> None:
+        await self.session.close()
+
+
+Executor = Union[SyncExecutor, AsyncExecutor]
@@ -0,0 +1,163 @@
+"""Счётчики организаций по видам деятельности и зданиям (фасеты).
+
+Счётчики хранятся в материализованных представлениях (миграция
+organization_facets): по виду деятельности - с учётом всех потомков, по
+зданию - организации в здании. Чтение фасетов не зависит от числа
+организаций.
+
+Представления обновляются по версиям данных: FACETS_VERSION хранит сумму
+версий организаций, зданий и видов деятельности на момент последнего
+обновления. Версии только растут, поэтому меньшая сумма означает, что
+данные менялись. Обновление выполняет один процесс (advisory-блокировка),
+остальные в это время отдают прежние счётчики.
+
+Запрос фасетов только читает представления: проверка версий и обновление
+выполняются в фоновом потоке, поэтому ни время обновления, ни его ошибки
+не влияют на ответ.
+"""
+
+import logging
+import threading
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import column, func, select, table, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database.session import SessionLocal
+from app.database.versions import (
+    ACTIVITIES_VERSION,
+    BUILDINGS_VERSION,
+    FACETS_VERSION,
+    ORGANIZATIONS_VERSION,
+    get_data_versions,
+)
+from app.models import models
+
+logger = logging.getLogger(__name__)
+
+FACETS_SCOPE = (ORGANIZATIONS_VERSION, BUILDINGS_VERSION, ACTIVITIES_VERSION)
+
+activity_organization_counts = table(
+    "activity_organization_counts", column("activity_id"), column("organizations")
+)
+building_organization_counts = table(
+    "building_organization_counts", column("building_id"), column("organizations")
+)
+
+REFRESH_LOCK = text("SELECT pg_try_advisory_xact_lock(hashtext('organization_facets'))")
+# Обновление идёт в фоне, ограничение DB_STATEMENT_TIMEOUT_MS для запросов
+# API к нему не относится
+REFRESH_TIMEOUT = text("SET LOCAL statement_timeout = 0")
+REFRESH_VIEWS = (
+    text("REFRESH MATERIALIZED VIEW CONCURRENTLY activity_organization_counts"),
+    text("REFRESH MATERIALIZED VIEW CONCURRENTLY building_organization_counts"),
+)
+
+
+def activity_facets_statement(activity_ids: Optional[Iterable[int]] = None):
+    statement = select(
+        activity_organization_counts.c.activity_id,
+        activity_organization_counts.c.organizations,
+    ).order_by(activity_organization_counts.c.activity_id)
+    if activity_ids is not None:
+        statement = statement.where(
+            activity_organization_counts.c.activity_id.in_(activity_ids)
+        )
+    return statement
+
+
+def building_facets_statement(
+    limit: int,
+    after_id: Optional[int] = None,
+    building_ids: Optional[Iterable[int]] = None,
+):
+    """Страница счётчиков по зданиям (keyset по building_id): зданий много,
+    поэтому выдача ограничивается limit записями."""
+    building_id = building_organization_counts.c.building_id
+    statement = (
+        select(building_id, building_organization_counts.c.organizations)
+        .order_by(building_id)
+        .limit(limit)
+    )
+    if after_id is not None:
+        statement = statement.where(building_id > after_id)
+    if building_ids is not None:
+        statement = statement.where(
+            building_organization_counts.c.building_id.in_(building_ids)
+        )
+    return statement
+
+
+def refresh_facets(db: Session, version: int) -> bool:
+    """Обновляет представления и запоминает version; фиксирует транзакцию.
+
+    Возвращает False, если представления уже обновляет другой процесс.
+    """
+    if not db.execute(REFRESH_LOCK).scalar():
+        db.rollback()
+        return False
+    db.execute(REFRESH_TIMEOUT)
+    for statement in REFRESH_VIEWS:
+        db.execute(statement)
+    upsert = insert(models.DataVersion).values(name=FACETS_VERSION, version=version)
+    db.execute(
+        upsert.on_conflict_do_update(
+            index_elements=[models.DataVersion.name],
+            set_={"version": func.greatest(models.DataVersion.version, version)},
+        )
+    )
+    db.commit()
+    return True
+
+
+class FacetRefresher:
+    """Проверяет актуальность фасетов не чаще, чем раз в check_interval секунд.
+
+    Между проверками и во время обновления счётчики могут отставать от
+    данных; интервал ограничивает и частоту обновлений при постоянной записи.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def request_refresh(self) -> None:
+        """Запускает проверку в фоновом потоке, если подошёл срок."""
+        if time.monotonic() - self._checked_at < self.check_interval:
+            return
+        # Проверяет один поток; запросы не ждут и читают текущие счётчики
+        if not self._lock.acquire(blocking=False):
+            return
+        thread = threading.Thread(
+            target=self._refresh_in_background, name="facet-refresh", daemon=True
+        )
+        thread.start()
+
+    def refresh(self) -> None:
+        """Сверяет версии и при необходимости обновляет представления.
+
+        Блокирующий вызов в отдельной сессии.
+        """
+        with SessionLocal() as db:
+            versions = get_data_versions(db, FACETS_SCOPE + (FACETS_VERSION,))
+            target = sum(versions[name] for name in FACETS_SCOPE)
+            if versions[FACETS_VERSION] < target:
+                refresh_facets(db, target)
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except SQLAlchemyError:
+            # Прежние счётчики остаются; следующая попытка - через интервал
+            logger.exception("Не удалось обновить счётчики фасетов")
+        finally:
+            self._checked_at = time.monotonic()
+            self._lock.release()
+
+
+facet_refresher = FacetRefresher(settings.FACETS_REFRESH_INTERVAL)
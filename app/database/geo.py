@@ -0,0 +1,24 @@
+from geoalchemy2.functions import ST_MakeEnvelope, ST_MakePoint, ST_SetSRID
+from sqlalchemy import cast
+
+from app.models import models
+
+
+def geography_point(longitude: float, latitude: float):
+    """Точка WGS84 того же типа, что и buildings.location.
+
+    Сравнение geography с geography позволяет ST_DWithin и оператору <->
+    использовать GiST-индекс по buildings.location.
+    """
+    return cast(
+        ST_SetSRID(ST_MakePoint(longitude, latitude), 4326), models.POINT_GEOGRAPHY
+    )
+
+
+def building_geometry():
+    """buildings.location как geometry; совпадает с выражением GiST-индекса."""
+    return cast(models.Building.location, models.POINT_GEOMETRY)
+
+
+def bbox_envelope(min_lon: float, min_lat: float, max_lon: float, max_lat: float):
+    return ST_MakeEnvelope(min_lon, min_lat, max_lon, max_lat, 4326)
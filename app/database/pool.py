@@ -0,0 +1,75 @@
+import threading
+import time
+from typing import Dict, Type
+
+from sqlalchemy import exc
+from sqlalchemy.pool import Pool
+
+
+class PoolMetrics:
+    """Накопленная статистика выдачи соединений из пула."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def observe(self, wait_seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def snapshot(self, pool: Pool) -> Dict:
+        """Текущее состояние пула вместе с накопленной статистикой."""
+        with self._lock:
+            checkouts = self.checkouts
+            stats = {
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_avg": (
+                    self.wait_seconds_total / checkouts if checkouts else 0.0
+                ),
+                "wait_seconds_max": self.wait_seconds_max,
+            }
+        stats.update(
+            size=pool.size(),
+            in_use=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+        )
+        return stats
+
+
+class InstrumentedPoolMixin:
+    """Замеряет время ожидания соединения при выдаче его из пула."""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.observe(time.perf_counter() - started, timed_out)
+
+
+def instrumented_pool_class(base: Type[Pool], metrics: PoolMetrics) -> Type[Pool]:
+    """Класс пула на основе base, пишущий статистику в metrics.
+
+    Статистика хранится в атрибуте класса, поэтому переживает пересоздание
+    пула (engine.dispose()).
+    """
+    return type(
+        f"Instrumented{base.__name__}",
+        (InstrumentedPoolMixin, base),
+        {"metrics": metrics},
+    )
@@ -0,0 +1,32 @@
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """Считает SQL-запросы, выполненные через engine внутри блока with.
+
+    Пример:
+        with QueryCounter(engine) as counter:
+            client.get("/api/v1/organizations/")
+        assert counter.count <= 5
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.count = 0
+        self.statements: List[str] = []
+
+    def _before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        self.count += 1
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
@@ -1,11 +1,49 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.core.config import settings
+from app.database.executor import AsyncExecutor, SyncExecutor
+from app.database.pool import PoolMetrics, instrumented_pool_class
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URL)
+pool_metrics = {"sync": PoolMetrics(), "async": PoolMetrics()}
+
+pool_options = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+sync_connect_args = {}
+async_connect_args = {}
+if settings.DB_STATEMENT_TIMEOUT_MS:
+    timeout = settings.DB_STATEMENT_TIMEOUT_MS
+    sync_connect_args["options"] = f"-c statement_timeout={timeout}"
+    async_connect_args["server_settings"] = {"statement_timeout": str(timeout)}
+
+engine = create_engine(
+    settings.SQLALCHEMY_DATABASE_URL,
+    poolclass=instrumented_pool_class(QueuePool, pool_metrics["sync"]),
+    connect_args=sync_connect_args,
+    **pool_options,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок используется эндпоинтами при DATABASE_MODE=async.
+# Объекты не истекают после commit: ленивые загрузки в async недоступны
+async_engine = create_async_engine(
+    settings.SQLALCHEMY_ASYNC_DATABASE_URL,
+    poolclass=instrumented_pool_class(AsyncAdaptedQueuePool, pool_metrics["async"]),
+    connect_args=async_connect_args,
+    **pool_options,
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
 Base = declarative_base()
 
 
@@ -16,3 +54,24 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_executor():
+    """Исполнитель кода эндпоинтов для режима DATABASE_MODE."""
+    if settings.DATABASE_MODE == "async":
+        async with AsyncSessionLocal() as db:
+            yield AsyncExecutor(db)
+        return
+    executor = SyncExecutor(SessionLocal())
+    try:
+        yield executor
+    finally:
+        await executor.close()
+
+
+def get_pool_stats():
+    """Состояние пулов соединений обоих движков."""
+    return {
+        "sync": pool_metrics["sync"].snapshot(engine.pool),
+        "async": pool_metrics["async"].snapshot(async_engine.pool),
+    }
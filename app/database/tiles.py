@@ -0,0 +1,95 @@
+"""Векторные тайлы (Mapbox Vector Tile) зданий и организаций.
+
+Тайл z/x/y в проекции Web Mercator собирается одним запросом функциями
+PostGIS ST_AsMVTGeom/ST_AsMVT и содержит два слоя:
+- buildings: здание (id, address, organizations - число организаций);
+- organizations: организация в точке её здания (id, name, building_id,
+  activities - ID видов деятельности через запятую).
+
+Здания выбираются по GiST-индексу buildings.location (geometry): границы
+тайла переводятся в WGS84, в этой проекции тайл тоже прямоугольник. Точки
+берутся без буфера, поэтому точка попадает только в тайлы, которые её
+содержат, - на этом основана инвалидация app.cache.tiles.
+"""
+
+from sqlalchemy import LargeBinary, String, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from app.core.config import settings
+from app.database.geo import building_geometry
+from app.database.versions import BUILDINGS_VERSION, ORGANIZATIONS_VERSION
+from app.models import models
+
+# Версии данных, от которых зависят тайлы (виды деятельности в тайле - только
+# ID, поэтому изменения справочника видов деятельности тайлы не меняют)
+TILES_SCOPE = (ORGANIZATIONS_VERSION, BUILDINGS_VERSION)
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+# Размер тайла во внутренних координатах MVT (по умолчанию PostGIS)
+MVT_EXTENT = 4096
+
+
+def tile_layer(rows, name: str):
+    """ST_AsMVT по подзапросу rows с колонкой geom; пустой слой - b''."""
+    layer = func.ST_AsMVT(rows.table_valued(), name, MVT_EXTENT, "geom", "id")
+    return select(func.coalesce(layer, literal(b"", LargeBinary))).scalar_subquery()
+
+
+def tile_statement(z: int, x: int, y: int):
+    """Тайл z/x/y: слои buildings и organizations, не больше
+    TILE_MAX_FEATURES объектов в слое."""
+    envelope = func.ST_TileEnvelope(z, x, y)
+    in_tile = func.ST_Intersects(building_geometry(), func.ST_Transform(envelope, 4326))
+    geom = func.ST_AsMVTGeom(
+        func.ST_Transform(building_geometry(), 3857), envelope, MVT_EXTENT, 0
+    ).label("geom")
+
+    counts = (
+        select(func.count())
+        .where(models.Organization.building_id == models.Building.id)
+        .scalar_subquery()
+    )
+    buildings = (
+        select(
+            models.Building.id,
+            models.Building.address,
+            counts.label("organizations"),
+            geom,
+        )
+        .where(in_tile)
+        .order_by(models.Building.id)
+        .limit(settings.TILE_MAX_FEATURES)
+        .subquery()
+    )
+
+    links = models.organization_activity
+    activities = (
+        select(
+            func.string_agg(
+                cast(links.c.activity_id, String),
+                aggregate_order_by(",", links.c.activity_id),
+            )
+        )
+        .where(links.c.organization_id == models.Organization.id)
+        .scalar_subquery()
+    )
+    organizations = (
+        select(
+            models.Organization.id,
+            models.Organization.name,
+            models.Organization.building_id,
+            func.coalesce(activities, "").label("activities"),
+            geom,
+        )
+        .join(models.Building, models.Organization.building)
+        .where(in_tile)
+        .order_by(models.Organization.id)
+        .limit(settings.TILE_MAX_FEATURES)
+        .subquery()
+    )
+
+    return select(
+        tile_layer(buildings, "buildings").op("||", return_type=LargeBinary)(
+            tile_layer(organizations, "organizations")
+        )
+    )
@@ -0,0 +1,63 @@
+from typing import Dict, Iterable
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models import models
+
+# Имена версий данных. Версия увеличивается в той же транзакции, что и
+# изменение соответствующей таблицы
+ACTIVITIES_VERSION = "activities"
+API_KEYS_VERSION = "api_keys"
+BUILDINGS_VERSION = "buildings"
+# Сумма версий данных, по которой последний раз обновлялись счётчики фасетов
+FACETS_VERSION = "facets"
+ORGANIZATIONS_VERSION = "organizations"
+
+# bump_data_version для курсора DBAPI (psycopg2) вне сессии SQLAlchemy:
+# массовые загрузки работают с соединением напрямую. Параметр - имя версии
+DATA_VERSION_BUMP = """
+INSERT INTO data_versions (name, version) VALUES (%s, 1)
+ON CONFLICT (name) DO UPDATE SET version = data_versions.version + 1
+"""
+
+
+def bump_data_version(db: Session, *names: str) -> Dict[str, int]:
+    """Увеличивает версии данных в рамках текущей транзакции.
+
+    Возвращает новые версии: после фиксации транзакции их получает
+    именно это изменение.
+    """
+    versions = {}
+    for name in names:
+        statement = insert(models.DataVersion).values(name=name, version=1)
+        versions[name] = db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[models.DataVersion.name],
+                set_={"version": models.DataVersion.version + 1},
+            ).returning(models.DataVersion.version)
+        ).scalar_one()
+    return versions
+
+
+def get_data_version(db: Session, name: str) -> int:
+    """Возвращает текущую версию данных (0, если изменений ещё не было)."""
+    version = (
+        db.query(models.DataVersion.version)
+        .filter(models.DataVersion.name == name)
+        .scalar()
+    )
+    return version or 0
+
+
+def get_data_versions(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Возвращает версии нескольких наборов данных одним запросом."""
+    names = list(names)
+    rows = db.execute(
+        select(models.DataVersion.name, models.DataVersion.version).where(
+            models.DataVersion.name.in_(names)
+        )
+    )
+    versions = dict(rows.tuples().all())
+    return {name: versions.get(name, 0) for name in names}
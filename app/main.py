@@ -4,6 +4,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from app.api.endpoints import router as api_router
 from app.core.config import settings
 from app.database.session import engine
+from app.metrics.instrumentation import MetricsMiddleware
 from app.models import models
 
 # Создаем таблицы в базе данных
@@ -23,7 +24,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "ETag"],
 )
 
+# Метрики запросов (GET /api/v1/metrics)
+app.add_middleware(MetricsMiddleware)
+
+
 # Подключаем роутер API
 app.include_router(api_router, prefix=settings.API_V1_STR)
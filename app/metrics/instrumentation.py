@@ -0,0 +1,240 @@
+"""Метрики запросов: задержка, запросы в работе, размер ответа, SQL и пул потоков.
+
+Ожидание свободного потока пула замеряет исполнитель SyncExecutor
+(app.metrics.threadpool); состояние пула снимается со статистики лимитера
+anyio при выдаче метрик.
+
+MetricsMiddleware заводит для каждого HTTP-запроса объект RequestStats в
+contextvar. Обработчики событий SQLAlchemy (подписаны на все Engine, включая
+sync_engine асинхронного движка) добавляют в него число и длительность
+SQL-запросов: контекст копируется в поток пула для синхронных эндпоинтов и
+виден в гринлетах asyncpg для асинхронных.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+import anyio.to_thread
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache.geo import geo_result_cache
+from app.cache.tiles import tile_cache
+from app.database.session import get_pool_stats
+from app.metrics.registry import registry
+
+STATEMENT_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUESTS = registry.counter(
+    "http_requests_total",
+    "Количество HTTP-запросов",
+    ("method", "route", "status"),
+)
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds",
+    "Длительность обработки HTTP-запроса",
+    ("method", "route"),
+)
+REQUESTS_IN_PROGRESS = registry.gauge(
+    "http_requests_in_progress", "HTTP-запросы в обработке"
+)
+RESPONSE_SIZE = registry.histogram(
+    "http_response_size_bytes",
+    "Размер тела ответа",
+    ("method", "route"),
+    buckets=SIZE_BUCKETS,
+)
+REQUEST_STATEMENTS = registry.histogram(
+    "http_request_db_statements",
+    "Количество SQL-запросов за HTTP-запрос",
+    ("method", "route"),
+    buckets=STATEMENT_BUCKETS,
+)
+REQUEST_DB_DURATION = registry.histogram(
+    "http_request_db_duration_seconds",
+    "Суммарная длительность SQL-запросов за HTTP-запрос",
+    ("method", "route"),
+)
+ORGANIZATION_SEARCH_DURATION = registry.histogram(
+    "organization_search_duration_seconds",
+    "Длительность поиска организаций по набору фильтров",
+    ("filters",),
+)
+ORGANIZATION_SEARCH_STATEMENTS = registry.histogram(
+    "organization_search_db_statements",
+    "Количество SQL-запросов поиска организаций по набору фильтров",
+    ("filters",),
+    buckets=STATEMENT_BUCKETS,
+)
+THREADPOOL_BUSY = registry.gauge("threadpool_threads_busy", "Занятые потоки пула anyio")
+THREADPOOL_WAITING = registry.gauge(
+    "threadpool_tasks_waiting", "Задачи, ожидающие свободного потока пула anyio"
+)
+THREADPOOL_SIZE = registry.gauge("threadpool_threads_total", "Размер пула потоков")
+POOL_CONNECTIONS = registry.gauge(
+    "db_pool_connections",
+    "Соединения пула базы данных по состоянию",
+    ("engine", "state"),
+)
+POOL_CHECKOUTS = registry.counter(
+    "db_pool_checkouts_total", "Выдачи соединений из пула", ("engine",)
+)
+POOL_TIMEOUTS = registry.counter(
+    "db_pool_timeouts_total", "Таймауты ожидания соединения", ("engine",)
+)
+POOL_WAIT = registry.counter(
+    "db_pool_wait_seconds_total", "Суммарное ожидание соединения", ("engine",)
+)
+GEO_CACHE_REQUESTS = registry.counter(
+    "geo_cache_requests_total", "Обращения к кэшу геопоиска", ("result",)
+)
+GEO_CACHE_ENTRIES = registry.gauge("geo_cache_entries", "Записи в кэше геопоиска")
+TILE_CACHE_REQUESTS = registry.counter(
+    "tile_cache_requests_total", "Обращения к кэшу тайлов", ("result",)
+)
+TILE_CACHE_BYTES = registry.gauge("tile_cache_bytes", "Размер тайлов в кэше")
+
+
+class RequestStats:
+    """Статистика одного HTTP-запроса."""
+
+    def __init__(self):
+        self.statements = 0
+        self.db_seconds = 0.0
+        # Набор фильтров поиска организаций (см. OrganizationFilters.combination)
+        self.organization_filters: Optional[str] = None
+
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    return request_stats.get()
+
+
+# === SQL ===
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    stats = request_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+@event.listens_for(Engine, "handle_error")
+def handle_error(exception_context):
+    # after_cursor_execute не вызывается для упавшего запроса
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started"):
+        conn.info["query_started"].pop()
+        stats = request_stats.get()
+        if stats is not None:
+            stats.statements += 1
+
+
+# === THREADPOOL ===
+
+
+def collect_runtime_metrics() -> None:
+    """Снимает состояние пулов и кэшей перед выдачей метрик.
+
+    Вызывается в цикле событий: лимитер потоков anyio привязан к нему.
+    """
+    statistics = anyio.to_thread.current_default_thread_limiter().statistics()
+    THREADPOOL_BUSY.set(statistics.borrowed_tokens)
+    THREADPOOL_WAITING.set(statistics.tasks_waiting)
+    THREADPOOL_SIZE.set(statistics.total_tokens)
+
+    for engine_name, pool in get_pool_stats().items():
+        for state in ("in_use", "idle", "overflow"):
+            POOL_CONNECTIONS.set(pool[state], engine=engine_name, state=state)
+        POOL_CHECKOUTS.set(pool["checkouts"], engine=engine_name)
+        POOL_TIMEOUTS.set(pool["timeouts"], engine=engine_name)
+        POOL_WAIT.set(pool["wait_seconds_total"], engine=engine_name)
+
+    geo_cache = geo_result_cache.stats()
+    GEO_CACHE_REQUESTS.set(geo_cache["hits"], result="hit")
+    GEO_CACHE_REQUESTS.set(geo_cache["misses"], result="miss")
+    GEO_CACHE_ENTRIES.set(geo_cache["entries"])
+
+    tiles = tile_cache.stats()
+    TILE_CACHE_REQUESTS.set(tiles["hits"], result="hit")
+    TILE_CACHE_REQUESTS.set(tiles["misses"], result="miss")
+    TILE_CACHE_BYTES.set(tiles["bytes"])
+
+
+# === HTTP ===
+
+
+def route_label(scope: Scope) -> str:
+    route = scope.get("route")
+    if route is not None:
+        return route.path_format
+    # Служебные маршруты Starlette (документация) без параметров пути
+    if "endpoint" in scope:
+        return scope["path"]
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI-middleware, собирающее метрики HTTP-запросов.
+
+    Метка route - шаблон пути маршрута (например /api/v1/organizations/{organization_id}),
+    поэтому число рядов не зависит от значений параметров.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            REQUESTS_IN_PROGRESS.dec()
+            request_stats.reset(token)
+
+            labels = {"method": scope["method"], "route": route_label(scope)}
+            REQUESTS.inc(status=str(status), **labels)
+            REQUEST_DURATION.observe(elapsed, **labels)
+            RESPONSE_SIZE.observe(size, **labels)
+            REQUEST_STATEMENTS.observe(stats.statements, **labels)
+            REQUEST_DB_DURATION.observe(stats.db_seconds, **labels)
+            if stats.organization_filters is not None:
+                filters = stats.organization_filters
+                ORGANIZATION_SEARCH_DURATION.observe(elapsed, filters=filters)
+                ORGANIZATION_SEARCH_STATEMENTS.observe(
+                    stats.statements, filters=filters
+                )
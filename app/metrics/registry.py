@@ -0,0 +1,152 @@
+"""Минимальный реестр метрик в текстовом формате Prometheus (0.0.4).
+
+Поддерживаются счётчики, датчики и гистограммы с метками. Все изменения
+выполняются под одной блокировкой реестра: метрики обновляются из потоков
+пула и из цикла событий.
+"""
+
+import math
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{escape_label(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Metric(ABC):
+    kind = ""
+
+    def __init__(self, registry: "Registry", name: str, documentation: str, labels=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.label_names: Tuple[str, ...] = tuple(labels)
+        registry.register(self)
+
+    def key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Строки значений метрики без HELP и TYPE."""
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def set(self, value: float, **labels: str) -> None:
+        """Устанавливает значение; для счётчиков, которые ведутся вне реестра."""
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = value
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}"
+            for key, value in sorted(self.values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Для каждого набора меток: счётчики по корзинам (не накопленные) и сумма
+        self.counts: Dict[LabelValues, List[int]] = {}
+        self.sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self.key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self.registry.lock:
+            counts = self.counts.setdefault(key, [0] * len(self.buckets))
+            counts[index] += 1
+            self.sums[key] = self.sums.get(key, 0.0) + value
+
+    def samples(self) -> List[str]:
+        lines = []
+        bucket_labels = self.label_names + ("le",)
+        for key, counts in sorted(self.counts.items()):
+            total = 0
+            for bound, count in zip(self.buckets, counts):
+                total += count
+                labels = format_labels(bucket_labels, key + (format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {total}")
+            labels = format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {format_value(self.sums[key])}")
+            lines.append(f"{self.name}_count{labels} {total}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> None:
+        self.metrics.append(metric)
+
+    def counter(self, name: str, documentation: str, labels=()) -> Counter:
+        return Counter(self, name, documentation, labels)
+
+    def gauge(self, name: str, documentation: str, labels=()) -> Gauge:
+        return Gauge(self, name, documentation, labels)
+
+    def histogram(
+        self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return Histogram(self, name, documentation, labels, buckets=buckets)
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for metric in self.metrics:
+                lines.append(f"# HELP {metric.name} {metric.documentation}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Реестр метрик приложения (GET /api/v1/metrics)
+registry = Registry()
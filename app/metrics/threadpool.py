@@ -0,0 +1,35 @@
+"""Запуск функций в пуле потоков anyio с замером ожидания свободного потока.
+
+Через run_in_threadpool выполняет запросы к базе исполнитель SyncExecutor:
+время от постановки функции в очередь до начала её выполнения попадает в
+гистограмму threadpool_queue_wait_seconds. Модуль не зависит от базы данных,
+поэтому его импортирует app.database.executor.
+"""
+
+import time
+from typing import Callable, TypeVar
+
+from starlette.concurrency import run_in_threadpool as starlette_run_in_threadpool
+
+from app.metrics.registry import registry
+
+T = TypeVar("T")
+
+WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+THREADPOOL_WAIT = registry.histogram(
+    "threadpool_queue_wait_seconds",
+    "Ожидание свободного потока пула запросами к базе в режиме sync",
+    buckets=WAIT_BUCKETS,
+)
+
+
+async def run_in_threadpool(func: Callable[..., T], *args, **kwargs) -> T:
+    """run_in_threadpool Starlette с замером ожидания свободного потока."""
+    submitted = time.perf_counter()
+
+    def timed() -> T:
+        THREADPOOL_WAIT.observe(time.perf_counter() - submitted)
+        return func(*args, **kwargs)
+
+    return await starlette_run_in_threadpool(timed)
@@ -1,16 +1,35 @@
-from geoalchemy2 import Geography
-from geoalchemy2.shape import to_shape
-from sqlalchemy import Column, ForeignKey, Integer, String, Table
-from sqlalchemy.orm import backref, relationship
+from geoalchemy2 import Geography, Geometry
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Table,
+    cast,
+    func,
+)
+from sqlalchemy.orm import backref, column_property, deferred, relationship
 
 from app.database.session import Base
 
+# Максимальный уровень вложенности видов деятельности
+MAX_ACTIVITY_LEVEL = 3
+
+# Типы точек WGS84: хранение (geography) и приведение к geometry
+POINT_GEOGRAPHY = Geography(geometry_type="POINT", srid=4326)
+POINT_GEOMETRY = Geometry(geometry_type="POINT", srid=4326)
+
 # Связь многие-ко-многим между Organization и Activity
 organization_activity = Table(
     "organization_activity",
     Base.metadata,
-    Column("organization_id", Integer, ForeignKey("organizations.id")),
-    Column("activity_id", Integer, ForeignKey("activities.id")),
+    Column("organization_id", Integer, ForeignKey("organizations.id"), index=True),
+    Column("activity_id", Integer, ForeignKey("activities.id"), index=True),
 )
 
 
@@ -18,10 +37,12 @@ class Organization(Base):
     __tablename__ = "organizations"
 
     id = Column(Integer, primary_key=True, index=True)
+    # Помимо b-tree индекса есть GIN-индекс по триграммам (миграция
+    # trigram_indexes, требует расширения pg_trgm)
     name = Column(String, index=True)
 
     phones = relationship("Phone", back_populates="organization")
-    building_id = Column(Integer, ForeignKey("buildings.id"))
+    building_id = Column(Integer, ForeignKey("buildings.id"), index=True)
     building = relationship("Building", back_populates="organizations")
     activities = relationship(
         "Activity", secondary=organization_activity, back_populates="organizations"
@@ -33,7 +54,7 @@ class Phone(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     number = Column(String)
-    organization_id = Column(Integer, ForeignKey("organizations.id"))
+    organization_id = Column(Integer, ForeignKey("organizations.id"), index=True)
 
     organization = relationship("Organization", back_populates="phones")
 
@@ -42,24 +63,30 @@ class Building(Base):
     __tablename__ = "buildings"
 
     id = Column(Integer, primary_key=True, index=True)
+    # GIN-индекс по триграммам создаётся миграцией trigram_indexes
     address = Column(String, index=True)
-    location = Column(Geography(geometry_type="POINT", srid=4326))
+    # WKB точки в Python не нужен: координаты читаются колонками ниже
+    location = deferred(Column(Geography(geometry_type="POINT", srid=4326)))
 
     organizations = relationship("Organization", back_populates="building")
 
-    @property
-    def latitude(self):
-        if self.location is not None:
-            point = to_shape(self.location)
-            return point.y
-        return 0.0
+    # Координаты извлекаются в SQL, без разбора WKB для каждой строки
+    latitude = column_property(
+        func.coalesce(func.ST_Y(cast(location.expression, POINT_GEOMETRY)), 0.0)
+    )
+    longitude = column_property(
+        func.coalesce(func.ST_X(cast(location.expression, POINT_GEOMETRY)), 0.0)
+    )
 
-    @property
-    def longitude(self):
-        if self.location is not None:
-            point = to_shape(self.location)
-            return point.x
-        return 0.0
+    __table_args__ = (
+        # GiST-индекс по geography (idx_buildings_location) создаёт geoalchemy2,
+        # этот обслуживает поиск в прямоугольной области по geometry
+        Index(
+            "ix_buildings_location_geometry_gist",
+            cast(location.expression, POINT_GEOMETRY),
+            postgresql_using="gist",
+        ),
+    )
 
 
 class Activity(Base):
@@ -69,8 +96,52 @@ class Activity(Base):
     name = Column(String, index=True)
     parent_id = Column(Integer, ForeignKey("activities.id"))
     level = Column(Integer, default=1)  # Уровень вложенности
+    # Материализованный путь от корня: id предков и самой записи через точку,
+    # например "4.6.7.". Потомки записи - все строки с префиксом её пути.
+    path = Column(String)
 
     children = relationship("Activity", backref=backref("parent", remote_side=[id]))
     organizations = relationship(
         "Organization", secondary=organization_activity, back_populates="activities"
     )
+
+    __table_args__ = (
+        Index(
+            "ix_activities_path", "path", postgresql_ops={"path": "varchar_pattern_ops"}
+        ),
+    )
+
+    @staticmethod
+    def build_path(activity_id: int, parent_path: str = "") -> str:
+        """Строит материализованный путь записи по пути её родителя."""
+        return f"{parent_path}{activity_id}."
+
+
+class DataVersion(Base):
+    """Счётчик версии данных таблицы, увеличивается при каждом изменении.
+
+    Позволяет процессам приложения дёшево проверять актуальность кэшей.
+    """
+
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+class ApiKey(Base):
+    """Ключ доступа к API. Сам ключ не хранится, только его SHA-256.
+
+    rate_limit (запросов в секунду) и burst задают ограничение частоты
+    запросов ключа; NULL - значения по умолчанию из настроек.
+    """
+
+    __tablename__ = "api_keys"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
+    key_hash = Column(String(64), nullable=False, unique=True)
+    rate_limit = Column(Float)
+    burst = Column(Integer)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
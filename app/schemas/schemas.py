@@ -1,6 +1,5 @@
-from typing import List, Optional
+from typing import Annotated, List, Optional, Union
 
-from geoalchemy2.shape import to_shape
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 
@@ -68,27 +67,6 @@ class Building(BuildingBase):
 
     model_config = ConfigDict(from_attributes=True)
 
-    @classmethod
-    def model_validate(cls, obj, *args, **kwargs):
-        if isinstance(obj, dict):
-            return super().model_validate(obj, *args, **kwargs)
-
-        # Создаем словарь для данных
-        data = {}
-        data["id"] = obj.id
-        data["address"] = obj.address
-
-        if hasattr(obj, "location") and obj.location is not None:
-            # Получаем координаты из WKB формата
-            point = to_shape(obj.location)
-            data["longitude"] = point.x
-            data["latitude"] = point.y
-        else:
-            data["longitude"] = 0.0
-            data["latitude"] = 0.0
-
-        return super().model_validate(data, *args, **kwargs)
-
 
 class ActivityBase(BaseModel):
     name: str
@@ -100,6 +78,12 @@ class ActivityCreate(ActivityBase):
     pass
 
 
+class ActivityFlat(ActivityBase):
+    id: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class Activity(ActivityBase):
     id: int
     children: List["Activity"] = []
@@ -145,10 +129,115 @@ class Organization(OrganizationBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class OrganizationPartial(BaseModel):
+    """Организация с полями из fields и связанными записями из include.
+
+    В ответе присутствуют только запрошенные поля.
+    """
+
+    id: int
+    name: Optional[str] = None
+    building_id: Optional[int] = None
+    phones: Optional[List[Phone]] = None
+    building: Optional[Building] = None
+    activities: Optional[List[Activity]] = None
+
+
+# Ответ эндпоинтов чтения организаций: полный или, с fields/include,
+# OrganizationPartial. Варианты проверяются по порядку, поэтому ORM-объекты
+# полного ответа валидируются один раз - как schemas.Organization.
+OrganizationResponse = Annotated[
+    Union[Organization, OrganizationPartial], Field(union_mode="left_to_right")
+]
+OrganizationListResponse = Annotated[
+    Union[List[Organization], List[OrganizationPartial]],
+    Field(union_mode="left_to_right"),
+]
+
+
+class OrganizationWithDistance(Organization):
+    distance: float  # в метрах
+
+
 # Обновляем forward references
 Activity.model_rebuild()
 
 
+class OrganizationBatchGet(BaseModel):
+    ids: List[int] = Field(min_length=1)
+
+
+class OrganizationBatch(BaseModel):
+    organizations: List[Organization]  # в порядке запрошенных ID, без повторов
+    missing: List[int]  # запрошенные ID, которых нет в базе
+
+
+class BatchItemError(BaseModel):
+    index: int  # индекс записи в теле запроса, с нуля
+    error: str
+
+
+class BuildingBatchResult(BaseModel):
+    created: List[Building]  # в порядке тела запроса, без записей с ошибками
+    errors: List[BatchItemError]
+
+
+class ActivityBatchResult(BaseModel):
+    created: List[ActivityFlat]
+    errors: List[BatchItemError]
+
+
+class OrganizationBatchResult(BaseModel):
+    created: List[Organization]
+    errors: List[BatchItemError]
+
+
+class ActivityFacet(BaseModel):
+    activity_id: int
+    organizations: int  # включая организации дочерних видов деятельности
+
+
+class BuildingFacet(BaseModel):
+    building_id: int
+    organizations: int
+
+
+class OrganizationFacets(BaseModel):
+    activities: List[ActivityFacet]
+    buildings: List[BuildingFacet]
+
+
+class ClusterActivity(BaseModel):
+    activity_id: int
+    organizations: int
+
+
+class OrganizationCluster(BaseModel):
+    # Ячейка сетки: floor(долгота / cell_size), floor(широта / cell_size)
+    cell_x: int
+    cell_y: int
+    organizations: int
+    # Средняя точка организаций ячейки
+    latitude: float
+    longitude: float
+    activities: List[ClusterActivity]  # самые частые, по убыванию
+
+
+class ClusterPoint(BaseModel):
+    id: int
+    name: str
+    building_id: int
+    latitude: float
+    longitude: float
+
+
+class OrganizationClusters(BaseModel):
+    zoom: int
+    cell_size: float  # в градусах
+    clusters: List[OrganizationCluster]
+    points: List[ClusterPoint]
+
+
 class LocationQuery(BaseModel):
     latitude: float
     longitude: float
@@ -157,3 +246,44 @@ class LocationQuery(BaseModel):
     bbox_min_lon: Optional[float] = None
     bbox_max_lat: Optional[float] = None
     bbox_max_lon: Optional[float] = None
+
+
+class PoolStats(BaseModel):
+    size: int
+    in_use: int
+    idle: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_avg: float
+    wait_seconds_max: float
+
+
+class GeoCacheStats(BaseModel):
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+    hit_rate: float
+    evictions: int
+    invalidations: int
+
+
+class ImportRowError(BaseModel):
+    line: int  # номер строки во входном файле
+    error: str
+
+
+class ImportBatchReport(BaseModel):
+    batch: int
+    rows: int
+    imported: int
+    errors: List[ImportRowError]
+
+
+class ImportReport(BaseModel):
+    kind: str
+    rows: int
+    imported: int
+    batches: List[ImportBatchReport]
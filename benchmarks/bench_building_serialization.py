@@ -0,0 +1,77 @@
+"""Микробенчмарк сериализации зданий в schemas.Building.
+
+Сравнивает стоимость одной строки:
+- до: координаты разбираются из WKB через to_shape (как делали свойства
+  Building.latitude/longitude и переопределённый Building.model_validate);
+- после: координаты приходят из SQL (ST_X/ST_Y) готовыми числами.
+
+Запуск:
+    python -m benchmarks.bench_building_serialization --rows 100000
+"""
+
+import argparse
+import time
+from types import SimpleNamespace
+
+from geoalchemy2.shape import from_shape, to_shape
+from shapely.geometry import Point
+
+from app.schemas import schemas
+
+
+def legacy_building(obj) -> schemas.Building:
+    """Прежний путь сериализации: WKB -> Shapely для каждой координаты."""
+    latitude = to_shape(obj.location).y if obj.location is not None else 0.0
+    longitude = to_shape(obj.location).x if obj.location is not None else 0.0
+    return schemas.Building.model_validate(
+        {
+            "id": obj.id,
+            "address": obj.address,
+            "latitude": latitude,
+            "longitude": longitude,
+        }
+    )
+
+
+def measure(label: str, func, rows) -> float:
+    started = time.perf_counter()
+    for row in rows:
+        func(row)
+    elapsed = time.perf_counter() - started
+    per_row_us = elapsed / len(rows) * 1_000_000
+    print(f"{label:<28} {elapsed:8.3f} с  {per_row_us:8.2f} мкс/строка")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    legacy_rows = []
+    sql_rows = []
+    for index in range(args.rows):
+        longitude = 37.0 + (index % 1000) / 1000
+        latitude = 55.0 + (index // 1000 % 1000) / 1000
+        address = f"г. Москва, ул. Тестовая {index}"
+        legacy_rows.append(
+            SimpleNamespace(
+                id=index,
+                address=address,
+                location=from_shape(Point(longitude, latitude), srid=4326),
+            )
+        )
+        sql_rows.append(
+            SimpleNamespace(
+                id=index, address=address, latitude=latitude, longitude=longitude
+            )
+        )
+
+    print(f"Зданий: {args.rows}")
+    before = measure("to_shape (до)", legacy_building, legacy_rows)
+    after = measure("ST_X/ST_Y (после)", schemas.Building.model_validate, sql_rows)
+    print(f"Ускорение: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Нагрузочное сравнение синхронного и асинхронного режимов работы с БД.
+
+Запустите два экземпляра API в разных режимах, например:
+    DATABASE_MODE=sync uvicorn app.main:app --port 8000
+    DATABASE_MODE=async uvicorn app.main:app --port 8001
+
+и сравните их пропускную способность при одинаковой конкурентности:
+    python -m benchmarks.bench_db_modes \\
+        --target sync=http://localhost:8000 --target async=http://localhost:8001 \\
+        --concurrency 200 --duration 30
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+from app.core.config import settings
+
+DEFAULT_PATHS = [
+    "/organizations/?limit=50",
+    "/organizations/?activity_id=1&limit=50",
+    "/organizations/?latitude=55.7558&longitude=37.6173&radius=1000&limit=50",
+    "/organizations/1",
+    "/buildings/?limit=50",
+    "/activities/?tree=true",
+]
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    paths: List[str],
+    deadline: float,
+    latencies: List[float],
+    errors: List[int],
+) -> None:
+    index = 0
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError:
+            errors.append(0)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run_target(
+    name: str, base_url: str, paths: List[str], concurrency: int, duration: float
+) -> None:
+    latencies: List[float] = []
+    errors: List[int] = []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=f"{base_url}{settings.API_V1_STR}",
+        headers={settings.API_KEY_NAME: settings.API_KEY},
+        limits=limits,
+        timeout=60,
+    ) as client:
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(
+                worker(client, paths, deadline, latencies, errors)
+                for _ in range(concurrency)
+            )
+        )
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:<8} запросов: {len(latencies):7d}  "
+        f"RPS: {len(latencies) / duration:9.1f}  "
+        f"p50: {quantiles[49] * 1000:8.1f} мс  "
+        f"p95: {quantiles[94] * 1000:8.1f} мс  "
+        f"p99: {quantiles[98] * 1000:8.1f} мс  "
+        f"ошибок: {len(errors)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--target",
+        action="append",
+        required=True,
+        help="Имя и адрес экземпляра API в виде name=http://host:port",
+    )
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument(
+        "--path", action="append", help="Путь относительно API_V1_STR (повторяемый)"
+    )
+    args = parser.parse_args()
+
+    paths = args.path or DEFAULT_PATHS
+    for target in args.target:
+        name, _, base_url = target.partition("=")
+        asyncio.run(run_target(name, base_url, paths, args.concurrency, args.duration))
+
+
+if __name__ == "__main__":
+    main()
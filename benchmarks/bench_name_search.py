@@ -0,0 +1,124 @@
+"""Бенчмарк поиска организаций по названию на большой таблице.
+
+Создаёт отдельную таблицу bench_organizations с заданным числом строк и
+сравнивает задержку запросов:
+- ILIKE '%...%' без индекса (последовательное сканирование);
+- ILIKE '%...%' с GIN-индексом по триграммам;
+- нечёткий поиск оператором % с ранжированием по similarity().
+
+Требует PostgreSQL с расширением pg_trgm. Запуск:
+    python -m benchmarks.bench_name_search --rows 1000000
+"""
+
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+
+WORDS = [
+    "Рога",
+    "Копыта",
+    "АвтоМир",
+    "Молоко",
+    "Мясо",
+    "Запчасти",
+    "Аптека",
+    "Здоровье",
+    "Строй",
+    "Сервис",
+    "Торг",
+    "Экспресс",
+]
+
+QUERIES = {
+    "ilike": (
+        "SELECT id FROM bench_organizations WHERE name ILIKE :pattern "
+        "ORDER BY id LIMIT 100"
+    ),
+    "fuzzy": (
+        "SELECT id FROM bench_organizations WHERE name % :term "
+        "ORDER BY similarity(name, :term) DESC, id LIMIT 100"
+    ),
+}
+
+
+def populate(connection, rows: int) -> None:
+    connection.execute(text("DROP TABLE IF EXISTS bench_organizations"))
+    connection.execute(
+        text("CREATE TABLE bench_organizations (id serial PRIMARY KEY, name text)")
+    )
+    words = "ARRAY[" + ", ".join(f"'{word}'" for word in WORDS) + "]"
+    connection.execute(
+        text(
+            f"""
+            INSERT INTO bench_organizations (name)
+            SELECT (ARRAY['ООО', 'ЗАО', 'ИП'])[1 + i % 3] || ' "'
+                || ({words})[1 + i % {len(WORDS)}] || ' '
+                || ({words})[1 + (i / {len(WORDS)}) % {len(WORDS)}] || ' '
+                || i || '"'
+            FROM generate_series(1, :rows) AS i
+            """
+        ),
+        {"rows": rows},
+    )
+    connection.execute(text("ANALYZE bench_organizations"))
+
+
+def measure(connection, sql: str, params: dict, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        connection.execute(text(sql), params).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def report(connection, label: str, repeat: int) -> None:
+    connection.execute(
+        text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, false)"),
+        {"threshold": str(settings.FUZZY_SEARCH_THRESHOLD)},
+    )
+    ilike = measure(connection, QUERIES["ilike"], {"pattern": "%Копыта Апт%"}, repeat)
+    fuzzy = measure(connection, QUERIES["fuzzy"], {"term": "Капыта Аптка"}, repeat)
+    print(f"{label:<22} ILIKE: {ilike:9.2f} мс   fuzzy: {fuzzy:9.2f} мс")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=settings.SQLALCHEMY_DATABASE_URL)
+    parser.add_argument(
+        "--keep", action="store_true", help="Не удалять таблицу после замера"
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.connect() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        print(f"Заполняем bench_organizations: {args.rows} строк...")
+        populate(connection, args.rows)
+        connection.commit()
+
+        report(connection, "без индекса", args.repeat)
+
+        connection.execute(
+            text(
+                "CREATE INDEX bench_organizations_name_trgm "
+                "ON bench_organizations USING gin (name gin_trgm_ops)"
+            )
+        )
+        connection.execute(text("ANALYZE bench_organizations"))
+        connection.commit()
+        report(connection, "GIN gin_trgm_ops", args.repeat)
+
+        if not args.keep:
+            connection.execute(text("DROP TABLE bench_organizations"))
+            connection.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Микробенчмарк сериализации списка организаций (без БД).
+
+Сравнивает время кодирования страницы из 1000 организаций:
+- до: ORM-объекты проходят валидацию по response_model FastAPI
+  (serialize_response) и кодируются JSONResponse (stdlib json);
+- после: быстрый путь FAST_SERIALIZATION - словари собираются из строк
+  запросов (organization_payloads) и кодируются orjson.
+
+Запуск:
+    python -m benchmarks.bench_organization_serialization --pages 50
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import namedtuple
+from types import SimpleNamespace
+from typing import List
+
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.api.queries import organization_payloads
+from app.cache.activity_tree import ActivityNode, ActivityTree
+from app.schemas import schemas
+
+PAGE_SIZE = 1000
+
+OrganizationRow = namedtuple("OrganizationRow", "id name building_id")
+BuildingRow = namedtuple("BuildingRow", "id address latitude longitude")
+PhoneRow = namedtuple("PhoneRow", "id number organization_id")
+
+
+def activity_tree() -> ActivityTree:
+    """Три уровня: 4 корня, по 3 дочерних, по 2 внучатых категории."""
+    nodes = []
+    next_id = 1
+    for root in range(4):
+        root_id = next_id
+        nodes.append(ActivityNode(root_id, f"Категория {root}", None, 1))
+        next_id += 1
+        for child in range(3):
+            child_id = next_id
+            nodes.append(ActivityNode(child_id, f"Раздел {child}", root_id, 2))
+            next_id += 1
+            for leaf in range(2):
+                nodes.append(ActivityNode(next_id, f"Товар {leaf}", child_id, 3))
+                next_id += 1
+    return ActivityTree(1, nodes)
+
+
+def orm_activity(tree: ActivityTree, activity_id: int) -> SimpleNamespace:
+    node = tree.nodes[activity_id]
+    return SimpleNamespace(
+        **node._asdict(),
+        children=[
+            orm_activity(tree, child_id) for child_id in tree.children.get(node.id, ())
+        ],
+    )
+
+
+def generate(tree: ActivityTree):
+    """Одна страница организаций в двух представлениях: ORM и строки запросов."""
+    activity_ids = sorted(tree.nodes)
+    orm_activities = {
+        activity_id: orm_activity(tree, activity_id) for activity_id in activity_ids
+    }
+    orm_items: List[SimpleNamespace] = []
+    rows, buildings, phones, links = [], [], [], []
+    for index in range(1, PAGE_SIZE + 1):
+        building = BuildingRow(
+            index, f"г. Москва, ул. Тестовая {index}", 55.7 + index / 1e5, 37.6
+        )
+        organization_phones = [
+            PhoneRow(index * 2, "2-222-222", index),
+            PhoneRow(index * 2 + 1, "8-923-666-13-13", index),
+        ]
+        organization_activities = [
+            activity_ids[index % len(activity_ids)],
+            activity_ids[(index * 7) % len(activity_ids)],
+        ]
+        organization_activities = sorted(set(organization_activities))
+
+        rows.append(OrganizationRow(index, f"ООО Организация {index}", index))
+        buildings.append(building)
+        phones.extend(organization_phones)
+        links.extend((index, activity_id) for activity_id in organization_activities)
+        orm_items.append(
+            SimpleNamespace(
+                id=index,
+                name=f"ООО Организация {index}",
+                building_id=index,
+                building=SimpleNamespace(**building._asdict()),
+                phones=[
+                    SimpleNamespace(**phone._asdict()) for phone in organization_phones
+                ],
+                activities=[orm_activities[i] for i in organization_activities],
+            )
+        )
+    return orm_items, (rows, buildings, phones, links)
+
+
+async def response_model_body(field, items) -> bytes:
+    content = await serialize_response(field=field, response_content=items)
+    return JSONResponse(content).body
+
+
+def fast_body(tree: ActivityTree, rows, buildings, phones, links) -> bytes:
+    return orjson.dumps(organization_payloads(rows, buildings, phones, links, tree))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50)
+    args = parser.parse_args()
+
+    tree = activity_tree()
+    orm_items, query_rows = generate(tree)
+    field = create_model_field(
+        "Response_get_organizations", List[schemas.Organization], mode="serialization"
+    )
+
+    legacy = asyncio.run(response_model_body(field, orm_items))
+    fast = fast_body(tree, *query_rows)
+    assert json.loads(legacy) == json.loads(fast), "Ответы различаются"
+
+    async def legacy_pages() -> None:
+        for _ in range(args.pages):
+            await response_model_body(field, orm_items)
+
+    started = time.perf_counter()
+    asyncio.run(legacy_pages())
+    before = (time.perf_counter() - started) / args.pages
+
+    started = time.perf_counter()
+    for _ in range(args.pages):
+        fast_body(tree, *query_rows)
+    after = (time.perf_counter() - started) / args.pages
+
+    print(f"Организаций на странице: {PAGE_SIZE}, страниц: {args.pages}")
+    print(
+        f"{'response_model + json (до)':<30} {before * 1000:8.2f} мс/1000 организаций"
+    )
+    print(f"{'строки + orjson (после)':<30} {after * 1000:8.2f} мс/1000 организаций")
+    print(f"Ускорение: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Синтетический набор данных для бенчмарков.
+
+Данные создаёт генератор app.bulk.generator (то же, что python -m app.cli
+generate) в очищенных таблицах справочника, поэтому при одинаковых seed и
+размере набор, включая идентификаторы, повторяется.
+"""
+
+from sqlalchemy import text
+
+from app.bulk.generator import TABLES, generate_directory
+
+# Таблицы справочника очищаются вместе, счётчики id начинаются заново.
+# Версии данных не сбрасываются: генератор их увеличивает, и запущенный API
+# сбрасывает свои кэши
+TRUNCATE_TABLES = text(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY")
+
+
+def seed_dataset(connection, organizations: int, seed: int) -> dict:
+    """Заменяет справочник набором из organizations организаций в транзакции
+    connection.
+
+    Возвращает фактические размеры таблиц после генерации.
+    """
+    connection.execute(TRUNCATE_TABLES)
+    generate_directory(connection.connection, organizations, seed=seed)
+    return dataset_size(connection)
+
+
+def dataset_size(connection) -> dict:
+    return {
+        table: connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+        for table in ("buildings", "organizations", "activities", "phones")
+    }
@@ -0,0 +1,350 @@
+"""Набор нагрузочных сценариев API с отчётом в JSON и сравнением прогонов.
+
+Каждый сценарий - один эндпоинт или одна комбинация фильтров
+GET /organizations/. Параметры запросов (id зданий, виды деятельности,
+фрагменты названий, координаты) выбираются из данных самого API
+детерминированно по --seed, поэтому прогоны на одном наборе данных
+сравнимы между собой.
+
+Запуск (API уже запущен; --seed-organizations перед прогоном заменяет
+справочник в базе синтетическими данными, см. benchmarks/dataset.py):
+    python -m benchmarks.suite run --base-url http://localhost:8000 \\
+        --requests 500 --concurrency 20 --output baseline.json
+
+Сравнение двух отчётов (код возврата 1 при регрессии):
+    python -m benchmarks.suite compare baseline.json candidate.json --threshold 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import create_engine
+
+from app.core.config import settings
+from benchmarks.dataset import dataset_size, seed_dataset
+
+# Сценарий: имя и функция, строящая путь запроса по выборке данных
+Scenario = Tuple[str, Callable[[random.Random, dict], str]]
+
+
+def pick(rng: random.Random, values: List):
+    return values[rng.randrange(len(values))]
+
+
+def name_fragment(rng: random.Random, sample: dict) -> str:
+    words = pick(rng, sample["names"]).replace('"', " ").split()
+    return max(words, key=len)
+
+
+def radius_path(rng: random.Random, sample: dict) -> str:
+    longitude, latitude = pick(rng, sample["points"])
+    return (
+        f"/organizations/?latitude={latitude:.5f}&longitude={longitude:.5f}"
+        f"&radius={rng.choice([500, 1000, 5000])}&limit=50"
+    )
+
+
+def bbox_path(rng: random.Random, sample: dict) -> str:
+    longitude, latitude = pick(rng, sample["points"])
+    size = rng.choice([0.01, 0.05, 0.1])
+    return (
+        f"/organizations/?bbox_min_lat={latitude - size:.5f}"
+        f"&bbox_min_lon={longitude - size:.5f}"
+        f"&bbox_max_lat={latitude + size:.5f}"
+        f"&bbox_max_lon={longitude + size:.5f}&limit=50"
+    )
+
+
+SCENARIOS: List[Scenario] = [
+    ("buildings", lambda rng, s: "/buildings/?limit=100"),
+    ("activities_flat", lambda rng, s: "/activities/"),
+    ("activities_tree", lambda rng, s: "/activities/?tree=true"),
+    (
+        "organization_by_id",
+        lambda rng, s: f"/organizations/{pick(rng, s['organization_ids'])}",
+    ),
+    ("organizations", lambda rng, s: "/organizations/?limit=50"),
+    (
+        "organizations_building",
+        lambda rng, s: f"/organizations/?building_id={pick(rng, s['building_ids'])}",
+    ),
+    (
+        "organizations_activity_subtree",
+        lambda rng, s: (
+            f"/organizations/?activity_id={pick(rng, s['root_activity_ids'])}&limit=50"
+        ),
+    ),
+    (
+        "organizations_name",
+        lambda rng, s: f"/organizations/?name={name_fragment(rng, s)}&limit=50",
+    ),
+    (
+        "organizations_fuzzy_name",
+        lambda rng, s: (
+            f"/organizations/?name={name_fragment(rng, s)[:-1]}&fuzzy=true&limit=50"
+        ),
+    ),
+    ("organizations_radius", radius_path),
+    ("organizations_bbox", bbox_path),
+    (
+        "organizations_nearest",
+        lambda rng, s: "/organizations/nearest?latitude={1:.5f}&longitude={0:.5f}"
+        "&k=20".format(*pick(rng, s["points"])),
+    ),
+]
+
+
+# === RUN ===
+
+
+async def sample_dataset(client: httpx.AsyncClient) -> dict:
+    """Выборка идентификаторов и координат для параметров сценариев."""
+    buildings = (await client.get("/buildings/?limit=1000")).json()
+    organizations = (await client.get("/organizations/?limit=1000")).json()
+    activities = (await client.get("/activities/?limit=1000")).json()
+    if not buildings or not organizations or not activities:
+        raise SystemExit("В базе нет данных: заполните её (--seed-organizations)")
+    return {
+        "building_ids": [building["id"] for building in buildings],
+        "points": [
+            (building["longitude"], building["latitude"]) for building in buildings
+        ],
+        "organization_ids": [organization["id"] for organization in organizations],
+        "names": [organization["name"] for organization in organizations],
+        "root_activity_ids": [
+            activity["id"] for activity in activities if activity["parent_id"] is None
+        ],
+    }
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    if not latencies:
+        # Сценарий без запросов: метрик задержки нет
+        return {
+            "requests": 0,
+            "errors": errors,
+            "throughput_rps": 0.0,
+            "mean_ms": None,
+            "p50_ms": None,
+            "p95_ms": None,
+            "p99_ms": None,
+        }
+    latencies = sorted(latencies)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else []
+
+    def quantile(index: int) -> float:
+        value = quantiles[index] if quantiles else latencies[0]
+        return round(value * 1000, 3)
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": quantile(49),
+        "p95_ms": quantile(94),
+        "p99_ms": quantile(98),
+    }
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, paths: List[str], concurrency: int
+) -> dict:
+    latencies: List[float] = []
+    errors = 0
+    queue = iter(paths)
+
+    async def worker() -> None:
+        nonlocal errors
+        for path in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                errors += response.status_code >= 400
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run_suite(args, dataset: Optional[dict]) -> dict:
+    async with httpx.AsyncClient(
+        base_url=f"{args.base_url}{settings.API_V1_STR}",
+        headers={settings.API_KEY_NAME: settings.API_KEY},
+        limits=httpx.Limits(max_connections=args.concurrency),
+        timeout=60,
+    ) as client:
+        sample = await sample_dataset(client)
+        results = {}
+        for name, build_path in SCENARIOS:
+            if args.scenario and name not in args.scenario:
+                continue
+            # Прогрев: соединения, планы запросов. Параметры прогрева берутся из
+            # отдельной последовательности, чтобы замер не попадал в кэши
+            # ответов, заполненные прогревом
+            warmup_rng = random.Random(f"{args.seed}:{name}:warmup")
+            warmup = [build_path(warmup_rng, sample) for _ in range(args.warmup)]
+            await run_scenario(client, warmup, args.concurrency)
+            rng = random.Random(f"{args.seed}:{name}")
+            paths = [build_path(rng, sample) for _ in range(args.requests)]
+            results[name] = await run_scenario(client, paths, args.concurrency)
+            print(format_result(name, results[name]), file=sys.stderr)
+
+    return {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "base_url": args.base_url,
+            "commit": git_commit(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+            "dataset": dataset,
+        },
+        "scenarios": results,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_result(name: str, result: dict) -> str:
+    if not result["requests"]:
+        return f"{name:<32} нет запросов"
+    return (
+        f"{name:<32} RPS: {result['throughput_rps']:9.1f}  "
+        f"p50: {result['p50_ms']:8.1f}  p95: {result['p95_ms']:8.1f}  "
+        f"p99: {result['p99_ms']:8.1f} мс  ошибок: {result['errors']}"
+    )
+
+
+def run(args) -> int:
+    dataset = None
+    if args.database_url:
+        engine = create_engine(args.database_url)
+        with engine.begin() as connection:
+            if args.seed_organizations:
+                print(
+                    f"Генерация {args.seed_organizations} организаций...",
+                    file=sys.stderr,
+                )
+                dataset = seed_dataset(connection, args.seed_organizations, args.seed)
+            else:
+                dataset = dataset_size(connection)
+
+    report = asyncio.run(run_suite(args, dataset))
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, ensure_ascii=False, indent=2)
+    print(f"Отчёт: {args.output}", file=sys.stderr)
+    return 0
+
+
+# === COMPARE ===
+
+
+# Сравниваемые метрики и направление ухудшения: 1 - рост, -1 - падение
+COMPARED_METRICS = (("p95_ms", 1), ("p99_ms", 1), ("throughput_rps", -1))
+
+
+def relative_change(before: float, after: float) -> float:
+    return (after - before) / before if before else 0.0
+
+
+def compare(args) -> int:
+    """Сравнивает отчёты; регрессия - рост p95/p99 или падение RPS больше порога."""
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)["scenarios"]
+    with open(args.candidate, encoding="utf-8") as candidate_file:
+        candidate = json.load(candidate_file)["scenarios"]
+
+    regressions = 0
+    print(f"{'сценарий':<32} {'p95, мс':>19} {'p99, мс':>19} {'RPS':>21}")
+    for name in sorted(set(baseline) & set(candidate)):
+        before, after = baseline[name], candidate[name]
+        if not before["requests"] or not after["requests"]:
+            print(f"{name:<32} нет запросов в одном из отчётов")
+            continue
+        columns = []
+        regressed = False
+        for metric, worse in COMPARED_METRICS:
+            change = relative_change(before[metric], after[metric])
+            regressed |= worse * change > args.threshold
+            columns.append(
+                f"{before[metric]:8.1f}→{after[metric]:8.1f}{change * 100:+5.0f}%"
+            )
+        regressions += regressed
+        marker = "  РЕГРЕССИЯ" if regressed else ""
+        print(f"{name:<32} {' '.join(columns)}{marker}")
+    for name in sorted(set(baseline) ^ set(candidate)):
+        print(f"{name:<32} есть только в одном из отчётов")
+
+    print(f"Регрессий: {regressions}")
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Прогнать сценарии")
+    run_parser.add_argument("--base-url", default="http://localhost:8000")
+    run_parser.add_argument("--requests", type=int, default=500)
+    run_parser.add_argument("--warmup", type=int, default=20)
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument(
+        "--scenario", action="append", help="Запустить только указанные сценарии"
+    )
+    run_parser.add_argument(
+        "--database-url",
+        default=settings.SQLALCHEMY_DATABASE_URL,
+        help="База API: размеры набора данных для отчёта и генерация; "
+        "пустая строка - не подключаться",
+    )
+    run_parser.add_argument(
+        "--seed-organizations",
+        type=int,
+        default=0,
+        help="Перед прогоном заменить справочник в базе синтетическим набором "
+        "из стольких организаций",
+    )
+    run_parser.add_argument("--output", default="benchmark-report.json")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="Сравнить два отчёта")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Допустимое ухудшение (0.1 = 10%%)",
+    )
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
 import os
 
+import pytest
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
+from app.api.endpoints import router as api_router
+from app.api.pagination import encode_cursor
+from app.cache.tiles import point_tiles
 from app.core.config import settings
-from app.database.session import get_db
+from app.database.executor import AsyncExecutor, SyncExecutor
+from app.database.query_counter import QueryCounter
+from app.database.session import get_db, get_executor
+from app.database.tiles import MVT_MEDIA_TYPE
 from app.main import app
 
 # Создаем тестовую базу данных
@@ -41,10 +51,55 @@ def override_get_db():
         db.close()
 
 
+async def override_get_executor():
+    executor = SyncExecutor(TestingSessionLocal())
+    try:
+        yield executor
+    finally:
+        await executor.close()
+
+
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_executor] = override_get_executor
 
 client = TestClient(app)
 
+# Приложение в режиме DATABASE_MODE=async: те же эндпоинты выполняют запросы
+# через AsyncSession. TestClient выполняет каждый запрос в своём цикле
+# событий, поэтому соединения asyncpg не переиспользуются
+async_engine = create_async_engine(
+    make_url(SQLALCHEMY_DATABASE_URL).set(drivername="postgresql+asyncpg"),
+    poolclass=NullPool,
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def override_get_async_executor():
+    async with TestingAsyncSessionLocal() as db:
+        yield AsyncExecutor(db)
+
+
+async_app = FastAPI()
+async_app.include_router(api_router, prefix=settings.API_V1_STR)
+async_app.dependency_overrides[get_db] = override_get_db
+async_app.dependency_overrides[get_executor] = override_get_async_executor
+
+async_client = TestClient(async_app)
+
+
+@pytest.fixture(params=["sync", "async"])
+def api_client(request):
+    """Клиент синхронной или асинхронной версии эндпоинтов."""
+    return client if request.param == "sync" else async_client
+
+
+# Бюджет SQL-запросов на чтение списка организаций: основной запрос со зданием,
+# телефоны, виды деятельности и по одному запросу на каждый уровень дочерних
+# категорий. Не должен зависеть от количества организаций в выборке.
+ORGANIZATIONS_QUERY_BUDGET = 6
+
 
 def test_create_building():
     """Тест создания здания с валидными данными."""
@@ -78,10 +133,10 @@ def test_create_building_invalid_coordinates():
     assert response.status_code == 422
 
 
-def test_create_organization():
+def test_create_organization(api_client):
     """Тест создания организации."""
     # Сначала создаем здание
-    building_response = client.post(
+    building_response = api_client.post(
         f"{settings.API_V1_STR}/buildings/",
         headers={"api_key": settings.API_KEY},
         json={
@@ -93,7 +148,7 @@ def test_create_organization():
     building_id = building_response.json()["id"]
 
     # Создаем организацию
-    response = client.post(
+    response = api_client.post(
         f"{settings.API_V1_STR}/organizations/",
         headers={"api_key": settings.API_KEY},
         json={
@@ -110,6 +165,13 @@ def test_create_organization():
     assert len(data["phones"]) == 1
     assert data["phones"][0]["number"] == "2-222-222"
 
+    detail = api_client.get(
+        f"{settings.API_V1_STR}/organizations/{data['id']}",
+        headers={"api_key": settings.API_KEY},
+    )
+    assert detail.status_code == 200
+    assert detail.json() == data
+
 
 def test_create_organization_invalid_phone():
     """Тест создания организации с невалидным номером телефона."""
@@ -168,3 +230,987 @@ def test_create_activity_max_level():
         json={"name": f"Тест Уровень 4 {timestamp}", "parent_id": level3_id},
     )
     assert response.status_code == 400
+
+
+def test_get_organizations_query_budget():
+    """Тест: чтение организаций укладывается в фиксированное число запросов."""
+    headers = {"api_key": settings.API_KEY}
+    building_id = client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={
+            "address": "г. Москва, ул. Бюджетная 1",
+            "latitude": 55.7558,
+            "longitude": 37.6173,
+        },
+    ).json()["id"]
+    root_id = client.post(
+        f"{settings.API_V1_STR}/activities/",
+        headers=headers,
+        json={"name": "Тест Бюджет"},
+    ).json()["id"]
+    child_id = client.post(
+        f"{settings.API_V1_STR}/activities/",
+        headers=headers,
+        json={"name": "Тест Бюджет Дочерний", "parent_id": root_id},
+    ).json()["id"]
+
+    def create_organization(index):
+        response = client.post(
+            f"{settings.API_V1_STR}/organizations/",
+            headers=headers,
+            json={
+                "name": f"ООО Бюджет {index}",
+                "building_id": building_id,
+                "phones": ["2-222-222", "3-333-333"],
+                "activities": [root_id, child_id],
+            },
+        )
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    def count_queries(url):
+        with QueryCounter(engine) as counter:
+            response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        return counter.count
+
+    list_url = f"{settings.API_V1_STR}/organizations/?building_id={building_id}"
+    organization_id = create_organization(1)
+    single_count = count_queries(list_url)
+    for index in range(2, 6):
+        create_organization(index)
+    many_count = count_queries(list_url)
+
+    assert many_count == single_count
+    assert many_count <= ORGANIZATIONS_QUERY_BUDGET
+    detail_url = f"{settings.API_V1_STR}/organizations/{organization_id}"
+    assert count_queries(detail_url) <= ORGANIZATIONS_QUERY_BUDGET
+
+
+def test_buildings_keyset_pagination():
+    """Тест постраничной выдачи зданий по курсору."""
+    headers = {"api_key": settings.API_KEY}
+    for index in range(3):
+        client.post(
+            f"{settings.API_V1_STR}/buildings/",
+            headers=headers,
+            json={
+                "address": f"г. Москва, ул. Страничная {index}",
+                "latitude": 55.7558,
+                "longitude": 37.6173,
+            },
+        )
+
+    first = client.get(f"{settings.API_V1_STR}/buildings/?limit=2", headers=headers)
+    assert first.status_code == 200
+    assert len(first.json()) == 2
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get(
+        f"{settings.API_V1_STR}/buildings/?limit=2&after={cursor}", headers=headers
+    )
+    assert second.status_code == 200
+    first_ids = [item["id"] for item in first.json()]
+    second_ids = [item["id"] for item in second.json()]
+    assert first_ids == sorted(first_ids)
+    assert min(second_ids) > max(first_ids)
+
+
+def test_pagination_invalid_cursor():
+    """Тест: некорректный курсор отклоняется с кодом 400."""
+    response = client.get(
+        f"{settings.API_V1_STR}/organizations/?after=not-a-cursor",
+        headers={"api_key": settings.API_KEY},
+    )
+    assert response.status_code == 400
+
+
+def test_get_organizations_by_activity_subtree(api_client):
+    """Тест фильтра по виду деятельности с учётом всех потомков."""
+    headers = {"api_key": settings.API_KEY}
+    building_id = api_client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={
+            "address": "г. Москва, ул. Древесная 1",
+            "latitude": 55.7558,
+            "longitude": 37.6173,
+        },
+    ).json()["id"]
+
+    def create_activity(name, parent_id=None):
+        response = api_client.post(
+            f"{settings.API_V1_STR}/activities/",
+            headers=headers,
+            json={"name": name, "parent_id": parent_id},
+        )
+        assert response.status_code == 201
+        return response.json()["id"]
+
+    root_id = create_activity("Тест Поддерево")
+    child_id = create_activity("Тест Поддерево 2", root_id)
+    grandchild_id = create_activity("Тест Поддерево 3", child_id)
+    sibling_id = create_activity("Тест Поддерево Соседний", root_id)
+
+    organization_id = api_client.post(
+        f"{settings.API_V1_STR}/organizations/",
+        headers=headers,
+        json={
+            "name": "ООО Поддерево",
+            "building_id": building_id,
+            "phones": [],
+            "activities": [grandchild_id],
+        },
+    ).json()["id"]
+
+    def found_ids(activity_id):
+        response = api_client.get(
+            f"{settings.API_V1_STR}/organizations/?activity_id={activity_id}",
+            headers=headers,
+        )
+        assert response.status_code == 200
+        return {item["id"] for item in response.json()}
+
+    assert organization_id in found_ids(root_id)
+    assert organization_id in found_ids(child_id)
+    assert organization_id not in found_ids(sibling_id)
+
+
+def test_get_activities_flat_and_tree():
+    """Тест плоского и древовидного режимов списка видов деятельности."""
+    headers = {"api_key": settings.API_KEY}
+    root_id = client.post(
+        f"{settings.API_V1_STR}/activities/",
+        headers=headers,
+        json={"name": "Тест Дерево"},
+    ).json()["id"]
+    child_id = client.post(
+        f"{settings.API_V1_STR}/activities/",
+        headers=headers,
+        json={"name": "Тест Дерево Дочерний", "parent_id": root_id},
+    ).json()["id"]
+    after = encode_cursor(root_id - 1)
+
+    flat = client.get(
+        f"{settings.API_V1_STR}/activities/?after={after}", headers=headers
+    ).json()
+    assert [item["id"] for item in flat[:2]] == [root_id, child_id]
+    assert all("children" not in item for item in flat)
+
+    tree = client.get(
+        f"{settings.API_V1_STR}/activities/?tree=true&after={after}", headers=headers
+    ).json()
+    assert all(item["level"] == 1 for item in tree)
+    assert tree[0]["id"] == root_id
+    assert [child["id"] for child in tree[0]["children"]] == [child_id]
+
+
+def test_activity_tree_cache_invalidated_on_create(monkeypatch):
+    """Тест: созданный вид деятельности виден сразу, без ожидания проверки
+    версии снимка дерева."""
+    from app.cache.activity_tree import activity_tree_cache
+
+    headers = {"api_key": settings.API_KEY}
+    # Снимок сверяется с базой редко: увидеть изменение позволяет только
+    # invalidate() в эндпоинте создания
+    monkeypatch.setattr(activity_tree_cache, "check_interval", 3600.0)
+    root_id = client.post(
+        f"{settings.API_V1_STR}/activities/",
+        headers=headers,
+        json={"name": "Тест Кэш Дерева"},
+    ).json()["id"]
+    url = f"{settings.API_V1_STR}/organizations/?activity_id={root_id}"
+    assert client.get(url, headers=headers).json() == []
+
+    child_id = client.post(
+        f"{settings.API_V1_STR}/activities/",
+        headers=headers,
+        json={"name": "Тест Кэш Дерева Дочерний", "parent_id": root_id},
+    ).json()["id"]
+    after = encode_cursor(root_id - 1)
+    tree = client.get(
+        f"{settings.API_V1_STR}/activities/?tree=true&after={after}", headers=headers
+    ).json()
+    assert [child["id"] for child in tree[0]["children"]] == [child_id]
+
+    building_id = client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={
+            "address": "г. Москва, ул. Кэшевая 1",
+            "latitude": 55.7558,
+            "longitude": 37.6173,
+        },
+    ).json()["id"]
+    organization_id = client.post(
+        f"{settings.API_V1_STR}/organizations/",
+        headers=headers,
+        json={
+            "name": "ООО Кэш Дерева",
+            "building_id": building_id,
+            "phones": [],
+            "activities": [child_id],
+        },
+    ).json()["id"]
+    assert [item["id"] for item in client.get(url, headers=headers).json()] == [
+        organization_id
+    ]
+
+
+def test_activity_tree_cache_follows_data_version():
+    """Тест: снимок дерева перестраивается при изменении версии данных в базе
+    (изменение другим процессом, без invalidate())."""
+    from app.cache.activity_tree import ActivityTreeCache
+    from app.database.versions import ACTIVITIES_VERSION, bump_data_version
+    from app.models import models
+
+    cache = ActivityTreeCache(check_interval=0.0)
+    with TestingSessionLocal() as db:
+        before = cache.get(db)
+        assert cache.get(db) is before
+
+        activity = models.Activity(name="Тест Версия Дерева", level=1)
+        db.add(activity)
+        db.flush()
+        activity.path = models.Activity.build_path(activity.id)
+        bump_data_version(db, ACTIVITIES_VERSION)
+        db.commit()
+
+        after = cache.get(db)
+        assert after.version == before.version + 1
+        assert after.subtree_ids(activity.id) == {activity.id}
+        assert before.subtree_ids(activity.id) == frozenset()
+
+
+def test_activity_tree_cache_follows_request_version():
+    """Тест: снимок старше версии, прочитанной запросом для ETag, перестраивается
+    без ожидания ACTIVITY_TREE_CHECK_INTERVAL."""
+    from app.cache.activity_tree import ActivityTreeCache
+    from app.database.versions import ACTIVITIES_VERSION, bump_data_version
+    from app.models import models
+
+    cache = ActivityTreeCache(check_interval=3600.0)
+    with TestingSessionLocal() as db:
+        before = cache.get(db)
+
+        activity = models.Activity(name="Тест Версия Запроса", level=1)
+        db.add(activity)
+        db.flush()
+        activity.path = models.Activity.build_path(activity.id)
+        version = bump_data_version(db, ACTIVITIES_VERSION)[ACTIVITIES_VERSION]
+        db.commit()
+
+        assert cache.get(db) is before
+        after = cache.get(db, version)
+        assert after.version == version
+        assert after.subtree_ids(activity.id) == {activity.id}
+        assert cache.get(db, version) is after
+
+
+def test_get_organizations_fuzzy_name():
+    """Тест нечёткого поиска по названию с опечаткой."""
+    headers = {"api_key": settings.API_KEY}
+    building_id = client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={
+            "address": "г. Москва, ул. Триграммная 1",
+            "latitude": 55.7558,
+            "longitude": 37.6173,
+        },
+    ).json()["id"]
+    organization_id = client.post(
+        f"{settings.API_V1_STR}/organizations/",
+        headers=headers,
+        json={
+            "name": "ООО Триграммный Поисковик",
+            "building_id": building_id,
+            "phones": [],
+            "activities": [],
+        },
+    ).json()["id"]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/organizations/",
+        headers=headers,
+        params={"name": "Триграмный Паисковик", "fuzzy": "true"},
+    )
+    assert response.status_code == 200
+    assert organization_id in [item["id"] for item in response.json()]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_nearest_organizations():
+    """Тест поиска ближайших организаций с расстоянием."""
+    import random
+
+    headers = {"api_key": settings.API_KEY}
+    # Своя точка на каждый запуск: организации прежних запусков остаются в базе
+    # и иначе совпадали бы по расстоянию с новыми
+    latitude = round(random.uniform(-60, 60), 4)
+    longitude = round(random.uniform(-170, 170), 4)
+    organization_ids = []
+    for index, offset in enumerate([0.001, 0.01]):
+        building_id = client.post(
+            f"{settings.API_V1_STR}/buildings/",
+            headers=headers,
+            json={
+                "address": f"Тестовый остров, дом {index}",
+                "latitude": latitude,
+                "longitude": longitude + offset,
+            },
+        ).json()["id"]
+        organization_ids.append(
+            client.post(
+                f"{settings.API_V1_STR}/organizations/",
+                headers=headers,
+                json={
+                    "name": f"ООО Ближайшая {index}",
+                    "building_id": building_id,
+                    "phones": [],
+                    "activities": [],
+                },
+            ).json()["id"]
+        )
+
+    response = client.get(
+        f"{settings.API_V1_STR}/organizations/nearest",
+        headers=headers,
+        params={"latitude": latitude, "longitude": longitude, "k": 2},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["id"] for item in data] == organization_ids
+    assert data[0]["distance"] < data[1]["distance"]
+
+    bbox = client.get(
+        f"{settings.API_V1_STR}/organizations/",
+        headers=headers,
+        params={
+            "bbox_min_lat": latitude - 0.1,
+            "bbox_min_lon": longitude,
+            "bbox_max_lat": latitude + 0.1,
+            "bbox_max_lon": longitude + 0.005,
+        },
+    )
+    assert organization_ids[0] in [item["id"] for item in bbox.json()]
+    assert organization_ids[1] not in [item["id"] for item in bbox.json()]
+
+
+def test_get_pool_metrics():
+    """Тест метрик пула соединений."""
+    response = client.get(
+        f"{settings.API_V1_STR}/metrics/pool", headers={"api_key": settings.API_KEY}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"sync", "async"}
+    assert data["sync"]["size"] == settings.DB_POOL_SIZE
+    assert data["sync"]["timeouts"] >= 0
+
+
+def test_import_organizations_ndjson():
+    """Тест массового импорта организаций с отчётом об ошибках."""
+    import json
+
+    headers = {"api_key": settings.API_KEY}
+    building_id = client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={
+            "address": "г. Москва, ул. Импортная 1",
+            "latitude": 55.7558,
+            "longitude": 37.6173,
+        },
+    ).json()["id"]
+    records = [
+        {
+            "name": "ООО Импорт 1",
+            "building_id": building_id,
+            "phones": ["2-222-222"],
+            "activities": [],
+        },
+        {"name": "ООО Импорт 2", "building_id": building_id, "phones": ["bad"]},
+        {
+            "name": "ООО Импорт 3",
+            "building_id": 0,
+            "phones": [],
+            "activities": [],
+        },
+    ]
+    payload = "\n".join(json.dumps(record) for record in records)
+
+    response = client.post(
+        f"{settings.API_V1_STR}/import/organizations?format=ndjson",
+        headers=headers,
+        files={"file": ("organizations.ndjson", payload.encode(), "text/plain")},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["rows"] == 3
+    assert report["imported"] == 1
+    assert [error["line"] for error in report["batches"][0]["errors"]] == [2, 3]
+
+    imported = client.get(
+        f"{settings.API_V1_STR}/organizations/?building_id={building_id}",
+        headers=headers,
+    ).json()
+    assert [item["name"] for item in imported] == ["ООО Импорт 1"]
+    assert imported[0]["phones"][0]["number"] == "2-222-222"
+
+
+def test_export_organizations_ndjson():
+    """Тест потоковой выгрузки организаций в NDJSON."""
+    import json
+
+    headers = {"api_key": settings.API_KEY}
+    response = client.get(
+        f"{settings.API_V1_STR}/export/organizations", headers=headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    organizations = [json.loads(line) for line in response.text.splitlines()]
+    ids = [organization["id"] for organization in organizations]
+    assert ids == sorted(ids)
+    assert len(ids) >= 2
+
+    single = client.get(
+        f"{settings.API_V1_STR}/organizations/{ids[0]}", headers=headers
+    ).json()
+    assert organizations[0] == single
+
+
+def test_conditional_get_etag():
+    """Тест ETag и ответа 304 без выполнения основного запроса."""
+    headers = {"api_key": settings.API_KEY}
+    url = f"{settings.API_V1_STR}/buildings/?limit=5"
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # Повторный запрос проверяет только версию данных
+    with QueryCounter(engine) as counter:
+        not_modified = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert not_modified.content == b""
+    assert counter.count == 1
+
+    # После создания здания версия меняется
+    client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={
+            "address": "г. Москва, ул. Версионная 1",
+            "latitude": 55.7558,
+            "longitude": 37.6173,
+        },
+    )
+    modified = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert modified.status_code == 200
+    assert modified.headers["ETag"] != etag
+
+
+def test_geo_search_cache():
+    """Тест кэша географического поиска: попадание и инвалидация."""
+    headers = {"api_key": settings.API_KEY}
+    url = f"{settings.API_V1_STR}/organizations/"
+    stats_url = f"{settings.API_V1_STR}/metrics/geo-cache"
+
+    import random
+    import time
+
+    # Своя точка на каждый запуск: тестовая база не очищается между запусками
+    latitude = round(random.uniform(-60, 60), 4)
+    longitude = round(random.uniform(-179, 179), 4)
+    name = f"ООО Кэш {int(time.time())}"
+
+    def search(shift=0.00001, radius=500):
+        params = {
+            "latitude": latitude + shift,
+            "longitude": longitude + shift,
+            "radius": radius,
+        }
+        response = client.get(url, headers=headers, params=params)
+        assert response.status_code == 200
+        return [item["name"] for item in response.json()]
+
+    before = search()
+    hits = client.get(stats_url, headers=headers).json()["hits"]
+    # Повторный запрос той же области - ответ берётся из кэша
+    assert search() == before
+    assert client.get(stats_url, headers=headers).json()["hits"] == hits + 1
+    # Соседний запрос попадает в ту же ячейку сетки и ту же запись
+    assert search(shift=0.00002, radius=510) == before
+    assert client.get(stats_url, headers=headers).json()["hits"] == hits + 2
+
+    building_id = client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={"address": "Океан, буй 1", "latitude": latitude, "longitude": longitude},
+    ).json()["id"]
+    client.post(
+        url,
+        headers=headers,
+        json={
+            "name": name,
+            "building_id": building_id,
+            "phones": [],
+            "activities": [],
+        },
+    )
+    assert search() == before + [name]
+
+
+def test_get_organizations_fast_serialization(monkeypatch, api_client):
+    """Тест быстрого пути сериализации: ответ совпадает с обычным."""
+    headers = {"api_key": settings.API_KEY}
+    url = f"{settings.API_V1_STR}/organizations/?limit=50"
+
+    def normalized(data):
+        for organization in data:
+            organization["phones"].sort(key=lambda phone: phone["id"])
+            organization["activities"].sort(key=lambda activity: activity["id"])
+        return data
+
+    regular = api_client.get(url, headers=headers)
+    monkeypatch.setattr(settings, "FAST_SERIALIZATION", True)
+    fast = api_client.get(url, headers=headers)
+
+    assert fast.status_code == 200
+    assert fast.headers["ETag"] == regular.headers["ETag"]
+    assert fast.headers.get("X-Next-Cursor") == regular.headers.get("X-Next-Cursor")
+    assert normalized(fast.json()) == normalized(regular.json())
+
+
+def test_prometheus_metrics():
+    """Тест метрик в формате Prometheus."""
+    headers = {"api_key": settings.API_KEY}
+    client.get(f"{settings.API_V1_STR}/organizations/?building_id=1", headers=headers)
+
+    response = client.get(f"{settings.API_V1_STR}/metrics", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    route = 'route="/api/v1/organizations/"'
+    assert f'http_requests_total{{method="GET",{route},status="200"}}' in body
+    assert f'http_request_db_statements_count{{method="GET",{route}}}' in body
+    assert 'organization_search_duration_seconds_count{filters="building_id"}' in body
+    assert "threadpool_queue_wait_seconds_count" in body
+
+
+def test_generate_directory():
+    """Тест генератора синтетического справочника (данные откатываются)."""
+    from app.bulk.generator import generate_directory
+    from app.models.models import MAX_ACTIVITY_LEVEL
+    from app.schemas.schemas import PhoneBase
+
+    connection = engine.raw_connection()
+    try:
+        counts = generate_directory(connection, organizations=40, seed=7)
+        assert counts["organizations"] == 40
+        assert counts["buildings"] == 10
+        assert counts["phones"] >= 40
+        assert counts["organization_activity"] >= 40
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT level, path, parent_id FROM activities "
+                "ORDER BY id DESC LIMIT %s",
+                (counts["activities"],),
+            )
+            activities = cursor.fetchall()
+            assert max(level for level, _, _ in activities) == MAX_ACTIVITY_LEVEL
+            assert all(path.count(".") == level for level, path, _ in activities)
+            cursor.execute("SELECT number FROM phones ORDER BY id DESC LIMIT 40")
+            assert all(
+                PhoneBase.validate_phone_format(number)
+                for (number,) in cursor.fetchall()
+            )
+    finally:
+        connection.rollback()
+        connection.close()
+
+
+def test_api_key_rate_limit():
+    """Тест ключей из таблицы api_keys и ограничения частоты запросов."""
+    import uuid
+
+    from app.auth.keys import api_key_store, create_api_key, revoke_api_key
+    from app.auth.rate_limit import rate_limiter
+
+    name = f"partner-{uuid.uuid4().hex[:8]}"
+    with TestingSessionLocal() as db:
+        api_key = create_api_key(db, name, rate_limit=0.5, burst=2)
+    api_key_store.invalidate()
+    rate_limiter.reset()
+
+    url = f"{settings.API_V1_STR}/activities/"
+    statuses = [client.get(url, headers={"api_key": api_key}).status_code]
+    statuses.append(client.get(url, headers={"api_key": api_key}).status_code)
+    limited = client.get(url, headers={"api_key": api_key})
+    assert statuses == [200, 200]
+    assert limited.status_code == 429
+    assert int(limited.headers["Retry-After"]) >= 1
+
+    # Лимит действует на ключ: остальные ключи не ограничены
+    assert client.get(url, headers={"api_key": settings.API_KEY}).status_code == 200
+
+    with TestingSessionLocal() as db:
+        assert revoke_api_key(db, name)
+    api_key_store.invalidate()
+    assert client.get(url, headers={"api_key": api_key}).status_code == 401
+
+
+def test_batch_get_organizations():
+    """Тест получения организаций по списку ID."""
+    headers = {"api_key": settings.API_KEY}
+    building_id = client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={
+            "address": "г. Москва, ул. Пакетная 1",
+            "latitude": 55.7558,
+            "longitude": 37.6173,
+        },
+    ).json()["id"]
+    ids = [
+        client.post(
+            f"{settings.API_V1_STR}/organizations/",
+            headers=headers,
+            json={
+                "name": f"ООО Пакет {index}",
+                "building_id": building_id,
+                "phones": ["2-222-222"],
+                "activities": [1],
+            },
+        ).json()["id"]
+        for index in range(3)
+    ]
+    missing_id = ids[-1] + 1_000_000
+
+    requested = [ids[2], missing_id, ids[0], ids[2], ids[1]]
+    with QueryCounter(engine) as counter:
+        response = client.post(
+            f"{settings.API_V1_STR}/organizations/batch-get",
+            headers=headers,
+            json={"ids": requested},
+        )
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["id"] for item in data["organizations"]] == [ids[2], ids[0], ids[1]]
+    assert data["organizations"][0]["activities"][0]["id"] == 1
+    assert data["missing"] == [missing_id]
+    assert counter.count <= ORGANIZATIONS_QUERY_BUDGET
+
+    response = client.get(
+        f"{settings.API_V1_STR}/organizations/?ids={ids[1]},{ids[0]}&ids={missing_id}",
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [ids[0], ids[1]]
+
+    response = client.post(
+        f"{settings.API_V1_STR}/organizations/batch-get",
+        headers=headers,
+        json={"ids": list(range(1, settings.MAX_BATCH_SIZE + 2))},
+    )
+    assert response.status_code == 422
+
+
+def test_batch_create():
+    """Тест пакетного создания зданий, видов деятельности и организаций."""
+    headers = {"api_key": settings.API_KEY}
+    response = client.post(
+        f"{settings.API_V1_STR}/buildings/batch",
+        headers=headers,
+        json=[
+            {
+                "address": f"г. Москва, ул. Пакетная {index}",
+                "latitude": 55.75 + index / 1000,
+                "longitude": 37.61,
+            }
+            for index in range(3)
+        ],
+    )
+    assert response.status_code == 201
+    buildings = response.json()["created"]
+    assert [building["address"] for building in buildings] == [
+        f"г. Москва, ул. Пакетная {index}" for index in range(3)
+    ]
+
+    response = client.post(
+        f"{settings.API_V1_STR}/activities/batch",
+        headers=headers,
+        json=[
+            {"name": "Пакетная категория", "parent_id": 1},
+            {"name": "Без родителя", "parent_id": 0},
+            {"name": "Слишком глубоко", "parent_id": 7},
+        ],
+    )
+    assert response.status_code == 201
+    data = response.json()
+    assert [activity["level"] for activity in data["created"]] == [2]
+    assert [error["index"] for error in data["errors"]] == [1, 2]
+    activity_id = data["created"][0]["id"]
+
+    organizations = [
+        {
+            "name": f"ООО Пакетное создание {index}",
+            "building_id": buildings[index]["id"],
+            "phones": ["2-222-222", "8-923-666-13-13"],
+            "activities": [activity_id, 1],
+        }
+        for index in range(3)
+    ]
+    organizations.insert(
+        1,
+        {"name": "ООО Нет здания", "building_id": 0, "phones": [], "activities": []},
+    )
+    with QueryCounter(engine) as counter:
+        response = client.post(
+            f"{settings.API_V1_STR}/organizations/batch",
+            headers=headers,
+            json=organizations,
+        )
+    assert response.status_code == 201
+    data = response.json()
+    assert [item["name"] for item in data["created"]] == [
+        f"ООО Пакетное создание {index}" for index in range(3)
+    ]
+    assert len(data["created"][0]["phones"]) == 2
+    assert {item["id"] for item in data["created"][0]["activities"]} == {
+        activity_id,
+        1,
+    }
+    assert data["errors"] == [{"index": 1, "error": "Здание не найдено"}]
+    # Проверка ссылок, вставки, версия данных и чтение графа ответа не
+    # зависят от размера пачки
+    assert counter.count <= 8 + ORGANIZATIONS_QUERY_BUDGET
+
+
+def test_batch_create_chunks_inserts(monkeypatch):
+    """Тест: телефоны и виды деятельности пачки вставляются несколькими
+    INSERT, если не помещаются в предел параметров одного запроса."""
+    import app.bulk.batch
+
+    headers = {"api_key": settings.API_KEY}
+    # Две строки по два столбца на запрос
+    monkeypatch.setattr(app.bulk.batch, "MAX_BIND_PARAMETERS", 4)
+    building_id = client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={
+            "address": "г. Москва, ул. Порционная 1",
+            "latitude": 55.7558,
+            "longitude": 37.6173,
+        },
+    ).json()["id"]
+    response = client.post(
+        f"{settings.API_V1_STR}/organizations/batch",
+        headers=headers,
+        json=[
+            {
+                "name": f"ООО Порционная вставка {index}",
+                "building_id": building_id,
+                "phones": ["2-222-222", "3-333-333", "8-923-666-13-13"],
+                "activities": [1, 2, 3],
+            }
+            for index in range(3)
+        ],
+    )
+    assert response.status_code == 201
+    created = response.json()["created"]
+    assert [len(item["phones"]) for item in created] == [3, 3, 3]
+    assert [len(item["activities"]) for item in created] == [3, 3, 3]
+
+
+def test_organization_facets():
+    """Тест счётчиков организаций по видам деятельности и зданиям."""
+    from app.database.facets import facet_refresher
+
+    headers = {"api_key": settings.API_KEY}
+    url = f"{settings.API_V1_STR}/organizations/facets"
+
+    def facets(building_id):
+        # Обновление в запросе идёт в фоне, здесь - синхронно
+        facet_refresher.refresh()
+        response = client.get(
+            f"{url}?activity_id=1&activity_id=2&building_id={building_id}",
+            headers=headers,
+        )
+        assert response.status_code == 200
+        data = response.json()
+        activities = {
+            item["activity_id"]: item["organizations"] for item in data["activities"]
+        }
+        buildings = {
+            item["building_id"]: item["organizations"] for item in data["buildings"]
+        }
+        return activities, buildings
+
+    building_id = client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={
+            "address": "г. Москва, ул. Фасетная 1",
+            "latitude": 55.7558,
+            "longitude": 37.6173,
+        },
+    ).json()["id"]
+    activities_before, buildings_before = facets(building_id)
+    assert buildings_before == {building_id: 0}
+
+    # Организация в подкатегории 2 учитывается и в корневой категории 1
+    client.post(
+        f"{settings.API_V1_STR}/organizations/",
+        headers=headers,
+        json={
+            "name": "ООО Фасет",
+            "building_id": building_id,
+            "phones": [],
+            "activities": [1, 2],
+        },
+    )
+    activities_after, buildings_after = facets(building_id)
+    assert buildings_after == {building_id: 1}
+    assert activities_after[1] == activities_before[1] + 1
+    assert activities_after[2] == activities_before[2] + 1
+
+    response = client.get(f"{url}?facet=buildings&building_id=0", headers=headers)
+    assert response.json() == {"activities": [], "buildings": []}
+
+    # Фасеты зданий выдаются страницами по building_id
+    response = client.get(f"{url}?facet=buildings&limit=1", headers=headers)
+    first = response.json()["buildings"]
+    assert len(first) == 1
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(
+        f"{url}?facet=buildings&limit=1&after={cursor}", headers=headers
+    )
+    assert response.json()["buildings"][0]["building_id"] > first[0]["building_id"]
+
+
+def test_get_organizations_projection(api_client):
+    """Тест выборки полей и связанных записей организаций (fields, include)."""
+    headers = {"api_key": settings.API_KEY}
+    url = f"{settings.API_V1_STR}/organizations/"
+
+    response = api_client.get(f"{url}?limit=5&fields=name", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data
+    assert all(set(item) == {"id", "name"} for item in data)
+
+    response = api_client.get(
+        f"{url}?limit=5&fields=name&include=phones", headers=headers
+    )
+    assert all(set(item) == {"id", "name", "phones"} for item in response.json())
+
+    organization_id = data[0]["id"]
+    full = api_client.get(f"{url}{organization_id}", headers=headers).json()
+    response = api_client.get(
+        f"{url}{organization_id}?include=building,activities", headers=headers
+    )
+    assert response.status_code == 200
+    partial = response.json()
+    assert partial["building"] == full["building"]
+    assert sorted(partial["activities"], key=lambda item: item["id"]) == sorted(
+        full["activities"], key=lambda item: item["id"]
+    )
+    assert "phones" not in partial
+
+    response = api_client.get(f"{url}?fields=address", headers=headers)
+    assert response.status_code == 422
+
+
+def test_organization_clusters():
+    """Тест кластеров организаций видимой области карты."""
+    headers = {"api_key": settings.API_KEY}
+    building_id = client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={
+            "address": "г. Москва, ул. Кластерная 1",
+            "latitude": 10.0005,
+            "longitude": 20.0005,
+        },
+    ).json()["id"]
+    for index in range(settings.CLUSTER_POINTS_THRESHOLD + 1):
+        client.post(
+            f"{settings.API_V1_STR}/organizations/",
+            headers=headers,
+            json={
+                "name": f"ООО Кластер {index}",
+                "building_id": building_id,
+                "phones": [],
+                "activities": [1],
+            },
+        )
+    url = (
+        f"{settings.API_V1_STR}/organizations/clusters"
+        "?bbox_min_lat=10&bbox_min_lon=20&bbox_max_lat=10.001&bbox_max_lon=20.001"
+    )
+
+    response = client.get(f"{url}&zoom=10", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["points"] == []
+    [cluster] = data["clusters"]
+    assert cluster["organizations"] >= settings.CLUSTER_POINTS_THRESHOLD + 1
+    assert abs(cluster["latitude"] - 10.0005) < 1e-6
+    assert cluster["activities"][0]["activity_id"] == 1
+
+    response = client.get(
+        f"{settings.API_V1_STR}/organizations/clusters?zoom=0"
+        "&bbox_min_lat=-90&bbox_min_lon=-180&bbox_max_lat=90&bbox_max_lon=180",
+        headers=headers,
+    )
+    data = response.json()
+    assert len(data["clusters"]) + len(data["points"]) <= (
+        settings.CLUSTER_MAX_CELLS * settings.CLUSTER_POINTS_THRESHOLD
+    )
+
+
+def test_vector_tiles():
+    """Тест векторных тайлов и их инвалидации при создании организации."""
+    headers = {"api_key": settings.API_KEY}
+    longitude, latitude = 30.0005, 40.0005
+    building_id = client.post(
+        f"{settings.API_V1_STR}/buildings/",
+        headers=headers,
+        json={
+            "address": "г. Москва, ул. Тайловая 1",
+            "latitude": latitude,
+            "longitude": longitude,
+        },
+    ).json()["id"]
+    [(z, x, y)] = point_tiles(12, longitude, latitude)
+    url = f"{settings.API_V1_STR}/tiles/{z}/{x}/{y}.mvt"
+
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == MVT_MEDIA_TYPE
+    assert "Тайловая".encode() in response.content
+    etag = response.headers["ETag"]
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.post(
+        f"{settings.API_V1_STR}/organizations/",
+        headers=headers,
+        json={
+            "name": "ООО Тайл",
+            "building_id": building_id,
+            "phones": [],
+            "activities": [1],
+        },
+    )
+    response = client.get(url, headers=headers)
+    assert response.headers["ETag"] != etag
+    assert "ООО Тайл".encode() in response.content
+
+    response = client.get(f"{settings.API_V1_STR}/tiles/1/2/0.mvt", headers=headers)
+    assert response.status_code == 404